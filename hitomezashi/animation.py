@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming animation output for hitomezashi patterns
+
+Frames are taken straight from the canvas (or from raw pixel arrays) and
+written to the animation file as they arrive, rather than saved as JPEGs and
+collated at the end. Only a handful of frames are held at any one time
+
+gif and apng frames are encoded in a pool of worker processes, and with
+delta=True only the box of pixels which changed since the previous frame is
+stored. Frames can also be added as patches, just the rectangle which
+changed, as hitomezashi.stitchFrames produces. webp frames are handed to
+libwebp one at a time, which finds the changed region itself
+"""
+import io
+import os
+import queue
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+FORMATS = ('gif', 'apng', 'webp')
+
+def _chunk_(kind, data):
+    """
+    Internal function to build one png chunk
+
+    Parameters
+    ----------
+    kind : bytes
+        Four letter chunk type.
+    data : bytes
+        Chunk contents.
+
+    Returns
+    -------
+    bytes
+        Length, type, contents and crc of the chunk.
+
+    """
+    return struct.pack('>I', len(data)) + kind + data + \
+        struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def _encodeGif_(pixels, offset, duration, colours, first, loop):
+    """
+    Internal function, run in the worker processes, to quantize one frame and
+    encode it as gif image blocks with its own colour table
+
+    Parameters
+    ----------
+    pixels : numpy array
+        (height, width, 3) uint8 pixels of the frame, or of the changed box.
+    offset : tuple
+        (x, y) position of the pixels within the animation.
+    duration : int
+        Display time of the frame in milliseconds.
+    colours : int
+        Maximum number of palette entries.
+    first : bool
+        Whether this is the first frame, which also carries the file header.
+    loop : int
+        Number of loops, 0 for forever. Only used on the first frame.
+
+    Returns
+    -------
+    bytes
+        The encoded frame.
+
+    """
+    image = Image.fromarray(pixels).quantize(colours, dither=Image.Dither.NONE)
+
+    blocks = []
+    if first:
+        header, _ = GifImagePlugin.getheader(image, info={'loop': loop,
+                                                          'duration': duration})
+        blocks.extend(header)
+    # disposal=1 leaves the previous frame in place under a delta frame
+    blocks.extend(GifImagePlugin.getdata(image, offset, duration=duration,
+                                         disposal=1, include_color_table=True))
+    return b''.join(bytes(block) for block in blocks)
+
+def _encodePng_(pixels):
+    """
+    Internal function, run in the worker processes, to compress one frame
+    into the image data of a png
+
+    Parameters
+    ----------
+    pixels : numpy array
+        (height, width, 3) uint8 pixels of the frame, or of the changed box.
+
+    Returns
+    -------
+    list of bytes
+        The contents of each IDAT chunk.
+
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    data = buffer.getvalue()
+
+    # Walk the chunks after the 8 byte signature, keeping the image data
+    idat = []
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos+8])
+        if kind == b'IDAT':
+            idat.append(data[pos+8:pos+8+length])
+        pos += 12 + length
+    return idat
+
+def changedBox(previous, current):
+    """
+    Finds the smallest box containing every pixel which differs between two
+    frames
+
+    Parameters
+    ----------
+    previous : numpy array
+        (height, width, 3) pixels of the previous frame.
+    current : numpy array
+        (height, width, 3) pixels of the current frame.
+
+    Returns
+    -------
+    tuple or None
+        (x0, y0, x1, y1) of the changed pixels, or None if nothing changed.
+
+    """
+    changed = (previous != current).any(axis=2)
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+
+class animationWriter(object):
+
+    def __init__(self,
+                 path,
+                 fmt=None,
+                 duration=100,
+                 loop=0,
+                 delta=True,
+                 colours=256,
+                 workers=None):
+        """
+        Writes an animation a frame at a time. Use as a context manager, or
+        call close once the last frame has been added
+
+        Parameters
+        ----------
+        path : string
+            File to write the animation to.
+        fmt : string, optional
+            gif, apng or webp. The default is None, which takes the format
+            from the file extension (.png gives apng).
+        duration : int, optional
+            Display time of each frame in milliseconds. The default is 100.
+        loop : int, optional
+            Number of loops, 0 for forever. The default is 0.
+        delta : bool, optional
+            Only store the box of pixels which changed since the previous
+            frame. Frames with no changes extend the previous frame instead.
+            The default is True.
+        colours : int, optional
+            Maximum palette size of each gif frame. The default is 256.
+        workers : int, optional
+            Number of encoding processes for gif and apng. The default is
+            None, which uses one per cpu. 0 encodes in this process.
+
+        Returns
+        -------
+        None.
+
+        """
+        if fmt is None:
+            fmt = os.path.splitext(path)[1].lstrip('.').lower()
+            fmt = 'apng' if fmt == 'png' else fmt
+        if fmt not in FORMATS:
+            raise ValueError(f'Animation format must be one of {FORMATS}, not {fmt}')
+
+        self.path = path
+        self.fmt = fmt
+        self.duration = duration
+        self.loop = loop
+        self.delta = delta
+        self.colours = colours
+        self.frames = 0
+
+        # Last full frame, and the frame waiting on its final duration
+        self._previous = None
+        self._held = None
+
+        if fmt == 'webp':
+            # libwebp pulls frames from an iterator, so feed it from a thread
+            self._queue = queue.Queue(maxsize=2)
+            self._error = None
+            self._thread = threading.Thread(target=self._writeWebp_, daemon=True)
+            self._thread.start()
+            return
+
+        if workers is None:
+            workers = os.cpu_count()
+        self._pool = ProcessPoolExecutor(workers) if workers else None
+        self._pending = deque()
+        self._maxPending = 2*max(1, workers)
+        self._file = open(path, 'wb')
+        self._sequence = 0
+
+        if fmt == 'apng':
+            self._actl = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def addFrame(self, frame):
+        """
+        Adds the next frame to the animation
+
+        Parameters
+        ----------
+        frame : PIL.Image or numpy array
+            The frame, e.g. from hitomezashi.getImage. Every frame must have
+            the same size.
+
+        Returns
+        -------
+        None.
+
+        """
+        # Keep a copy of our own, since patches are written into it
+        if isinstance(frame, Image.Image):
+            frame = frame.convert('RGB')
+        pixels = np.array(frame, dtype=np.uint8)
+        if self._previous is not None and pixels.shape != self._previous.shape:
+            raise ValueError('Every frame of an animation must be the same size')
+
+        if self._previous is None or not self.delta:
+            box = (0, 0, pixels.shape[1], pixels.shape[0])
+        else:
+            box = changedBox(self._previous, pixels)
+
+        self._pushFrame_(pixels, box)
+
+    def addPatch(self, patch, offset):
+        """
+        Adds the next frame to the animation as a change to part of the
+        previous frame, so the rest of the frame is never compared or copied
+
+        Parameters
+        ----------
+        patch : numpy array
+            (height, width, 3) uint8 pixels of the changed rectangle, e.g.
+            from hitomezashi.stitchFrames.
+        offset : tuple
+            (x, y) position of the patch within the frame.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._previous is None:
+            raise ValueError('The first frame must be added whole, with addFrame')
+
+        x0, y0 = (int(v) for v in offset)
+        patch = np.asarray(patch, dtype=np.uint8)
+        area = self._previous[y0:y0+patch.shape[0], x0:x0+patch.shape[1]]
+        if area.shape != patch.shape:
+            raise ValueError('The patch must lie within the frame')
+
+        if self.delta:
+            box = changedBox(area, patch)
+            if box is not None:
+                box = (x0 + box[0], y0 + box[1], x0 + box[2], y0 + box[3])
+        else:
+            box = (x0, y0, x0 + patch.shape[1], y0 + patch.shape[0])
+
+        area[...] = patch
+        self._pushFrame_(self._previous, box)
+
+    def _pushFrame_(self, pixels, box):
+        """
+        Internal method to hold the changed box of a frame until its duration
+        is known, passing the previously held frame on to the encoders
+
+        Parameters
+        ----------
+        pixels : numpy array
+            The whole frame, which becomes the previous frame.
+        box : tuple or None
+            (x0, y0, x1, y1) of the pixels to be stored, or None if nothing
+            changed.
+
+        Returns
+        -------
+        None.
+
+        """
+        first = self._previous is None
+        self._previous = pixels
+
+        if self.fmt == 'webp':
+            # libwebp merges unchanged frames into the one before, as below
+            self._putWebp_(pixels.copy())
+            if box is not None:
+                self.frames += 1
+            return
+
+        if box is None:
+            # Nothing changed, so show the previous frame for longer
+            self._held[1] += self.duration
+            return
+
+        # A frame's duration is only final once the next frame arrives
+        self._flushHeld_()
+        x0, y0, x1, y1 = (int(v) for v in box)
+        self._held = [pixels[y0:y1, x0:x1].copy(), self.duration, (x0, y0), first]
+        self.frames += 1
+
+    def _flushHeld_(self):
+        """
+        Internal method to pass the held frame to the encoders, writing out
+        the oldest encoded frames once enough are in flight
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._held is None:
+            return
+        pixels, duration, offset, first = self._held
+        self._held = None
+
+        if self.fmt == 'gif':
+            args = (_encodeGif_, pixels, offset, duration, self.colours, first, self.loop)
+        else:
+            args = (_encodePng_, pixels)
+        if self._pool is None:
+            result = args[0](*args[1:])
+        else:
+            result = self._pool.submit(*args)
+        self._pending.append((result, pixels.shape, duration, offset, first))
+
+        while len(self._pending) > self._maxPending:
+            self._writePending_()
+
+    def _writePending_(self):
+        """
+        Internal method to write the oldest encoded frame to the file
+
+        Returns
+        -------
+        None.
+
+        """
+        result, shape, duration, offset, first = self._pending.popleft()
+        if self._pool is not None:
+            result = result.result()
+
+        if self.fmt == 'gif':
+            self._file.write(result)
+            return
+
+        if first:
+            width, height = self._previous.shape[1], self._previous.shape[0]
+            self._file.write(b'\x89PNG\r\n\x1a\n')
+            self._file.write(_chunk_(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                          8, 2, 0, 0, 0)))
+            # Frame count is not known yet, so leave room and fill it in on close
+            self._actl = self._file.tell()
+            self._file.write(_chunk_(b'acTL', struct.pack('>II', 0, self.loop)))
+
+        # Frame control, then the image data. The first frame's data doubles as
+        # the default image for viewers without apng support
+        self._file.write(_chunk_(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence,
+                                                      shape[1], shape[0],
+                                                      offset[0], offset[1],
+                                                      duration, 1000, 0, 0)))
+        self._sequence += 1
+        for data in result:
+            if first:
+                self._file.write(_chunk_(b'IDAT', data))
+            else:
+                self._file.write(_chunk_(b'fdAT', struct.pack('>I', self._sequence) + data))
+                self._sequence += 1
+
+    def _putWebp_(self, pixels):
+        """
+        Internal method to queue a frame for the webp thread, raising any
+        error it stopped with rather than waiting on it forever
+
+        Parameters
+        ----------
+        pixels : numpy array or None
+            The frame, or None to mark the end of the animation.
+
+        Returns
+        -------
+        None.
+
+        """
+        while True:
+            if self._error is not None:
+                raise self._error
+            if not self._thread.is_alive():
+                return
+            try:
+                self._queue.put(pixels, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _writeWebp_(self):
+        """
+        Internal method, run on a thread, to save the queued frames as webp
+
+        Returns
+        -------
+        None.
+
+        """
+        def frames():
+            pixels = self._queue.get()
+            while pixels is not None:
+                yield Image.fromarray(pixels)
+                pixels = self._queue.get()
+
+        try:
+            queued = frames()
+            first = next(queued, None)
+            if first is not None:
+                first.save(self.path, format='WEBP', save_all=True, append_images=queued,
+                           duration=self.duration, loop=self.loop, lossless=True)
+        except Exception as error:
+            self._error = error
+
+    def close(self):
+        """
+        Writes out any remaining frames and finishes the file
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.fmt == 'webp':
+            self._putWebp_(None)
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+            return
+
+        if self._file.closed:
+            return
+
+        self._flushHeld_()
+        while self._pending:
+            self._writePending_()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+        if self.fmt == 'gif':
+            self._file.write(b';')
+        elif self._actl is not None:
+            self._file.write(_chunk_(b'IEND', b''))
+            self._file.seek(self._actl)
+            self._file.write(_chunk_(b'acTL', struct.pack('>II', self.frames, self.loop)))
+        self._file.close()
+
+def writeAnimation(path, frames, **kwargs):
+    """
+    Writes an iterable of frames to an animation file, see animationWriter
+
+    Parameters
+    ----------
+    path : string
+        File to write the animation to.
+    frames : iterable
+        PIL.Images or numpy arrays, e.g. from a generator, so they need not
+        all be held at once.
+    **kwargs : keyword arguments
+        Passed to animationWriter.
+
+    Returns
+    -------
+    int
+        Number of frames written.
+
+    """
+    with animationWriter(path, **kwargs) as writer:
+        for frame in frames:
+            writer.addFrame(frame)
+    return writer.frames
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Batch rendering of many hitomezashi patterns across a pool of processes
+
+Each pattern is described by a spec dictionary, which holds everything
+needed to build and draw one cloth:
+
+    geometry : 'square', 'triangle', 'hex' or 'mosaic'
+    output : file path of the image to be saved. A .svg output is written
+        as vector stitches, and a .hzp output as a pattern file, see
+        patternfile.py
+    logic : 'rand', 'pattern' or 'alternate'. The default is 'rand'
+    thresh : thresholds for 'rand' logic
+    starts : dict of start arrays, e.g. {'rowStarts': [...]}. Each entry may
+        instead be a dict of utils.genStarts arguments,
+        e.g. {'rowStarts': {'sideLen': 50, 'modulo': 3, 'cutOff': 0}}
+    seed : seed for the random start states of 'rand' logic, an int or
+        numpy SeedSequence. The same seed gives the same pattern in any process
+    grid, quant, slope, backend, fill : passed on to the cloth
+    canvasMode : 'RGB', 'P' or '1', how the cloth holds its pixels, see
+        hitomezashi.hitomezashi. P and 1 take a third of the memory, and
+        are only expanded to RGB for jpg outputs. The default is 'RGB'
+    cache : folder of a cache.renderCache. Patterns already in it are copied
+        to the output without being drawn, and new ones are added to it
+    cacheBytes : size limit of the cache. The default is 2**30
+    workers : number of processes rendering this one pattern, into a canvas
+        in shared memory, see parallel.renderShared. The default is 1, as
+        the batch is already spread across processes
+
+Mosaic specs hold a list of tiles in place of grid and starts, each a dict of
+geometry, grid, slope, linergb, logic, thresh, seed, fill and starts, see
+geometries.mosaicCloth. thresh, seed and fill apply to tiles without their
+own. columns and gap set the layout. With workers, the tiles are shared out
+between the processes
+"""
+import os
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import geometries
+from cache import renderCache
+from frames import formatImage, writeFrame
+from parallel import renderShared
+from patternfile import EXTENSION, savePattern
+from utils import genStarts
+
+def specStarts(spec):
+    """
+    Reads the start arrays of a spec, which are given outright, or as
+    genStarts arguments
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec, or mosaic tile.
+
+    Returns
+    -------
+    dict
+        Start array per side, e.g. {'rowStarts': [...]}.
+
+    """
+    starts = {}
+    for key, value in spec.get('starts', {}).items():
+        starts[key] = genStarts(**value) if isinstance(value, dict) else value
+    return starts
+
+def buildCloth(spec):
+    """
+    Creates the cloth described by a spec and draws its pattern, without
+    saving anything. With a cache, a pattern already in the cache is not
+    drawn, and cloth.cachePath points to the cached file instead. With
+    workers, the cloth is left tiled, for parallel.renderShared to draw
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec, see the module docstring.
+
+    Returns
+    -------
+    hitomezashi.hitomezashi
+        The drawn cloth.
+
+    """
+    geometry = spec.get('geometry', 'square')
+    name = spec.get('name', os.path.splitext(os.path.basename(spec['output']))[0])
+
+    clothArgs = {'quant': spec.get('quant', 20),
+                 'canvasMode': spec.get('canvasMode', 'RGB'),
+                 'savePathBase': os.path.dirname(spec['output'])}
+    if 'grid' in spec and geometry != 'mosaic':
+        clothArgs['grid'] = tuple(spec['grid'])
+    if 'backend' in spec:
+        clothArgs['backend'] = spec['backend']
+
+    # Patterns rendered by several processes, or saved as pattern files,
+    # need no canvas of their own
+    if spec.get('workers', 1) != 1 or spec['output'].lower().endswith(EXTENSION):
+        clothArgs['tiled'] = True
+
+    if geometry == 'square':
+        cloth = geometries.squareCloth(name, **clothArgs)
+    elif geometry == 'triangle':
+        cloth = geometries.triangleCloth(name, slope=spec.get('slope', 0.5), **clothArgs)
+    elif geometry == 'hex':
+        cloth = geometries.hexCloth(name, **clothArgs)
+    elif geometry == 'mosaic':
+        tiles = [dict(tile, **specStarts(tile)) for tile in spec['tiles']]
+        cloth = geometries.mosaicCloth(name, tiles, columns=spec.get('columns'),
+                                       gap=spec.get('gap', 1), **clothArgs)
+    else:
+        raise ValueError(f'Unknown geometry {geometry}')
+
+    modeArgs = specStarts(spec)
+    if geometry == 'mosaic':
+        modeArgs['workers'] = 1
+    for key in ('thresh', 'seed', 'fill'):
+        if spec.get(key) is not None:
+            modeArgs[key] = spec[key]
+
+    # The file type and save arguments change the output, so key on them too
+    if spec.get('cache') is not None:
+        modeArgs['cache'] = renderCache(spec['cache'], spec.get('cacheBytes', 2**30))
+        modeArgs['cacheOptions'] = {
+            'ext': os.path.splitext(spec['output'])[1].lstrip('.').lower(),
+            'saveArgs': tuple(sorted(spec.get('saveArgs', {}).items())),
+            }
+
+    cloth.defineMode(logic=spec.get('logic', 'rand'), modeName=name, save=False, **modeArgs)
+
+    return cloth
+
+def renderSpec(spec):
+    """
+    Renders a single pattern spec and saves it to its output path. Any error
+    is caught and reported in the result, so that one bad spec does not stop
+    a batch
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec, see the module docstring.
+
+    Returns
+    -------
+    dict
+        output: the output path, ok: whether the render succeeded, error: the
+        traceback if it did not.
+
+    """
+    try:
+        cloth = buildCloth(spec)
+        folder, base = os.path.split(spec['output'])
+        stem, ext = os.path.splitext(base)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # Write alongside and rename, so an interrupted batch never leaves a
+        # partial output behind
+        temp = os.path.join(folder, f'.{stem}.part{ext}')
+        try:
+            if cloth.cachePath is not None:
+                shutil.copyfile(cloth.cachePath, temp)
+            elif ext.lower() == '.svg':
+                cloth.writeSVG(temp)
+            elif ext.lower() == EXTENSION:
+                savePattern(cloth, temp)
+            elif cloth.tiled:
+                by = 'block' if spec.get('geometry') == 'mosaic' else 'band'
+                with renderShared(cloth, spec['workers'], by=by) as canvas:
+                    canvas.save(temp, **spec.get('saveArgs', {}))
+            elif ext.lower() in ('.png', '.webp'):
+                # Palette png, exact for patterns of up to 256 colours, or
+                # lossless webp, as frames are saved
+                writeFrame(cloth.getImage(), temp, ext.lower().lstrip('.'), **spec.get('saveArgs', {}))
+            else:
+                formatImage(cloth.getImage(), ext.lstrip('.')).save(temp, **spec.get('saveArgs', {}))
+            os.replace(temp, spec['output'])
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+        if cloth.cachePath is None and cloth.cache is not None:
+            cloth.cache.put(cloth.cacheKey, spec['output'], cloth.cacheOptions['ext'])
+    except Exception:
+        return {'output': spec.get('output'), 'ok': False, 'error': traceback.format_exc()}
+
+    return {'output': spec['output'], 'ok': True, 'error': None}
+
+def iterBatch(specs, workers=None, chunksize=1):
+    """
+    Renders pattern specs across a pool of processes, yielding each result
+    in the order of the specs as soon as it is ready
+
+    Parameters
+    ----------
+    specs : iterable of dict
+        Pattern specs, see the module docstring.
+    workers : int, optional
+        Number of worker processes. The default is None, one per core.
+    chunksize : int, optional
+        Number of specs sent to a worker at a time. Larger chunks cut the
+        overhead for many small patterns. The default is 1.
+
+    Yields
+    ------
+    dict
+        Result of renderSpec for each spec.
+
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(renderSpec, specs, chunksize=chunksize)
+
+def renderBatch(specs, workers=None, chunksize=1):
+    """
+    Renders pattern specs across a pool of processes
+
+    Parameters
+    ----------
+    specs : iterable of dict
+        Pattern specs, see the module docstring.
+    workers : int, optional
+        Number of worker processes. The default is None, one per core.
+    chunksize : int, optional
+        Number of specs sent to a worker at a time. The default is 1.
+
+    Returns
+    -------
+    list of dict
+        Result of renderSpec for each spec, in order.
+
+    """
+    return list(iterBatch(specs, workers=workers, chunksize=chunksize))
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the drawing and saving of hitomezashi patterns
+
+Sweeps grid size, geometry and backend over each operation:
+
+    stitches : drawStitches on the block
+    rect : drawRect, one outlined rectangle per grid cell (pil, square only)
+    trapezoid : drawTrapezoid, one polygon per grid cell (pil only)
+    save : saveFrame of the drawn canvas
+    gif : a 20 frame animation, toggling one row line per frame
+
+Every case runs in a fresh process, so that its peak RSS is its own. Start
+states come from fixed seeds, so runs are comparable across commits. Results
+are written as JSON, and an earlier results file can be passed to compare
+against, e.g.
+
+    python benchmark.py --out before.json
+    python benchmark.py --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import PIL
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak RSS is left out
+    resource = None
+
+SIZES = (50, 200, 1000, 5000)
+GEOMETRIES = ('square', 'triangle', 'hex')
+BACKENDS = ('pil', 'numpy')
+OPERATIONS = ('stitches', 'rect', 'trapezoid', 'save', 'gif')
+
+# Operations which loop over every cell in python, and are skipped on larger
+# grids unless asked for
+CELL_LIMIT = {'rect': 1000**2, 'trapezoid': 1000**2, 'gif': 1000**2}
+
+def peakRSS():
+    """
+    Peak resident memory of this process so far
+
+    Returns
+    -------
+    float or None
+        Peak RSS in MiB, or None where it cannot be measured.
+
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kiB, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def buildCloth(geometry, size, backend, quant, seed, folder):
+    """
+    Creates a cloth with one block of random start states, without drawing
+    anything on it
+
+    Parameters
+    ----------
+    geometry : string
+        square, triangle or hex.
+    size : int
+        Number of points along each side of the grid.
+    backend : string
+        pil or numpy.
+    quant : int
+        Unit size of a grid element in pixels.
+    seed : int
+        Seed of the start states.
+    folder : string
+        Directory for any saved output.
+
+    Returns
+    -------
+    cloth : hitomezashi.hitomezashi
+        The cloth.
+    block : hitomezashi.stitch_block
+        Its block.
+
+    """
+    import geometries
+
+    if geometry == 'square':
+        cloth = geometries.squareCloth('bench', quant=quant, grid=(size, size),
+                                       savePathBase=folder, backend=backend)
+        cloth.addBlock('A', size=cloth.sizes['A'], start=cloth.starts['A'],
+                       grid=cloth.grids['A'], linergb=(0, 0, 255), logic='rand',
+                       thresh=(50, 50), seed=seed)
+    elif geometry == 'hex':
+        cloth = geometries.hexCloth('bench', quant=quant, grid=(size, size),
+                                    savePathBase=folder, backend=backend)
+        cloth.addBlock('A', size=cloth.sizes['A'], start=cloth.starts['A'],
+                       grid=cloth.grids['A'], linergb=(0, 0, 255), logic='rand',
+                       shape='isometric', thresh=(50, 50, 50), seed=seed)
+    else:
+        cloth = geometries.triangleCloth('bench', quant=quant, grid=(size, size),
+                                         savePathBase=folder, backend=backend)
+        cloth.addBlock('A', size=cloth.sizes['A'], start=cloth.starts['A'],
+                       grid=cloth.grids['A'], linergb=(0, 0, 255), logic='rand',
+                       slope=(cloth.slope, cloth.slope), shape='triangle',
+                       thresh=(50, 50, 50), seed=seed)
+
+    cloth.addMode('bench', basePath=folder)
+    os.makedirs(cloth.modes['bench'].saveFolder, exist_ok=True)
+    return cloth, cloth.blocks['A']
+
+def runOperation(cloth, block, operation):
+    """
+    Runs one benchmarked operation on a fresh cloth
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth, with nothing drawn yet.
+    block : hitomezashi.stitch_block
+        Its block.
+    operation : string
+        One of OPERATIONS.
+
+    Returns
+    -------
+    float
+        Wall time of the operation in seconds.
+
+    """
+    mode = cloth.modes['bench']
+
+    # Drawing the pattern is set up, not timed, for the saving operations
+    if operation in ('save', 'gif'):
+        cloth.drawStitches(block)
+
+    start = time.perf_counter()
+    if operation == 'stitches':
+        cloth.drawStitches(block)
+    elif operation == 'rect':
+        cloth.drawRect(block)
+    elif operation == 'trapezoid':
+        cloth.drawTrapezoid(block)
+    elif operation == 'save':
+        cloth.saveFrame(mode)
+    elif operation == 'gif':
+        mode.startAnimation('gif')
+        cloth.saveFrame(mode)
+        for line in range(19):
+            if block.shape == 'triangle':
+                cloth.toggleBaseStart(block, line % (block.grid[0] - 1))
+            else:
+                cloth.toggleRowStart(block, line % (block.grid[1] - 1))
+            cloth.saveFrame(mode)
+        mode.makeGif()
+    return time.perf_counter() - start
+
+def runCase(case):
+    """
+    Times one case, meant to be run in a process of its own
+
+    Parameters
+    ----------
+    case : dict
+        geometry, size, backend, operation, quant, seed and repeat.
+
+    Returns
+    -------
+    dict
+        The case, with its best and median wall times in seconds, the peak
+        RSS in MiB before the first run and after the last, the number of
+        stitches and, for the stitches operation, stitches drawn per second.
+
+    """
+    # Run from this folder, so the flat modules import in the child process
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    times = []
+    baseRSS = None
+    with tempfile.TemporaryDirectory() as folder:
+        for _ in range(case['repeat']):
+            # Peak RSS only ever grows, so the base is taken before the first
+            # run, and each cloth is let go before the next is built
+            cloth = block = None
+            cloth, block = buildCloth(case['geometry'], case['size'], case['backend'],
+                                      case['quant'], case['seed'], folder)
+            if baseRSS is None:
+                baseRSS = peakRSS()
+            times.append(runOperation(cloth, block, case['operation']))
+
+        segments = int(sum(len(segs) for segs in cloth.stitchSegments(block)))
+
+    best = min(times)
+    result = dict(case)
+    result.update({
+        'status': 'ok',
+        'best': best,
+        'median': float(np.median(times)),
+        'baseRSS': baseRSS,
+        'peakRSS': peakRSS(),
+        'segments': segments,
+        'segmentsPerSecond': segments / best if case['operation'] == 'stitches' and best > 0 else None,
+        })
+    return result
+
+def sweep(sizes=SIZES, geometries=GEOMETRIES, backends=BACKENDS,
+          operations=OPERATIONS, quant=2, seed=0, repeat=3, full=False):
+    """
+    Lists the cases of a benchmark run, marking those which are skipped
+
+    Parameters
+    ----------
+    sizes, geometries, backends, operations : iterables
+        The values to sweep over.
+    quant : int, optional
+        Unit size of a grid element in pixels. The default is 2.
+    seed : int, optional
+        Seed of the start states. The default is 0.
+    repeat : int, optional
+        Number of timed runs per case. The default is 3.
+    full : bool, optional
+        Also run the per-cell operations on grids over CELL_LIMIT. The
+        default is False.
+
+    Yields
+    ------
+    dict
+        One case, with a skip reason if it is not to be run.
+
+    """
+    for geometry in geometries:
+        for size in sizes:
+            for backend in backends:
+                for operation in operations:
+                    case = {'geometry': geometry, 'size': size, 'backend': backend,
+                            'operation': operation, 'quant': quant, 'seed': seed,
+                            'repeat': repeat}
+                    if operation in ('rect', 'trapezoid') and backend != 'pil':
+                        case['skip'] = 'needs the pil backend'
+                    elif operation == 'rect' and geometry != 'square':
+                        case['skip'] = 'rectangles only tile square grids'
+                    elif not full and size**2 > CELL_LIMIT.get(operation, np.inf):
+                        case['skip'] = 'grid over the cell limit, see --full'
+                    yield case
+
+def caseName(case):
+    """
+    Identifies a case across results files
+
+    Parameters
+    ----------
+    case : dict
+        A case or result.
+
+    Returns
+    -------
+    string
+        geometry/size/backend/operation.
+
+    """
+    return '{geometry}/{size}/{backend}/{operation}'.format(**case)
+
+def runSweep(cases, log=print):
+    """
+    Runs each case in a fresh process
+
+    Parameters
+    ----------
+    cases : iterable of dict
+        Cases from sweep.
+    log : callable, optional
+        Called with a line of progress per case. The default is print.
+
+    Returns
+    -------
+    list of dict
+        One result per case.
+
+    """
+    results = []
+    context = get_context('spawn')
+    for case in cases:
+        if 'skip' in case:
+            result = dict(case, status='skipped')
+        else:
+            try:
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    result = pool.submit(runCase, case).result()
+            except Exception as error:
+                result = dict(case, status='failed', error=repr(error))
+        results.append(result)
+
+        if result['status'] == 'ok':
+            line = f"{caseName(case):32} {result['best']:10.4f}s"
+            if result['peakRSS'] is not None:
+                line += f" {result['peakRSS']:9.1f}MiB"
+            if result['segmentsPerSecond'] is not None:
+                line += f" {result['segmentsPerSecond']:14.0f} stitches/s"
+            log(line)
+        else:
+            log(f"{caseName(case):32} {result['status']}: {result.get('skip', result.get('error'))}")
+    return results
+
+def metadata():
+    """
+    Describes the environment of a run, so that results files can be told
+    apart
+
+    Returns
+    -------
+    dict
+        Commit, versions, platform and time.
+
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+
+def compare(results, baseline, log=print):
+    """
+    Prints the change in best time and peak RSS of each case against an
+    earlier run
+
+    Parameters
+    ----------
+    results : list of dict
+        Results of this run.
+    baseline : list of dict
+        Results of the earlier run.
+    log : callable, optional
+        Called with each line. The default is print.
+
+    Returns
+    -------
+    None.
+
+    """
+    before = {caseName(result): result for result in baseline if result['status'] == 'ok'}
+    for result in results:
+        old = before.get(caseName(result))
+        if result['status'] != 'ok' or old is None:
+            continue
+        line = f"{caseName(result):32} time x{result['best'] / old['best']:6.2f}"
+        if result['peakRSS'] and old['peakRSS']:
+            line += f"   rss x{result['peakRSS'] / old['peakRSS']:6.2f}"
+        log(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--geometries', nargs='+', choices=GEOMETRIES, default=GEOMETRIES)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument('--quant', type=int, default=2, help='pixels per grid element')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--full', action='store_true',
+                        help='run per-cell operations on every grid size')
+    parser.add_argument('--out', default='benchmark.json', help='results file to write')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    cases = sweep(args.sizes, args.geometries, args.backends, args.operations,
+                  args.quant, args.seed, args.repeat, args.full)
+    results = runSweep(cases)
+
+    with open(args.out, 'w') as file:
+        json.dump({'meta': metadata(), 'results': results}, file, indent=1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)['results'])
+
+if __name__ == '__main__':
+    main()
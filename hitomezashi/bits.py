@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Packed bit arrays of start states and stitch parity
+
+Only the parity of a start state decides a line of stitches, so each side of
+a block keeps its start states as a packedStarts, one bit per line in 64 bit
+words. Stitch n along a line is 'on' when (start + n) % 2 == 1, so the stitch
+mask of a whole line is one fixed alternating word, inverted for lines which
+start 'on'. Masks of many lines are made with a single XOR, 64 stitches at a
+time, and a million stitch line takes 125kB
+
+Bits are numbered from the least significant bit of the first word, the
+same as np.packbits(..., bitorder='little'), and the packed bytes are what
+gets hashed and saved, see cache.clothKey
+"""
+import numpy as np
+
+WORD = 64
+
+# Stitches 1, 3, 5 ... of a line starting 'off' are 'on'
+ALTERNATE = np.uint64(0xAAAAAAAAAAAAAAAA)
+
+def unpackMasks(masks, count):
+    """
+    Expands packed stitch masks into one bool per stitch
+
+    Parameters
+    ----------
+    masks : numpy array of uint64
+        (lines, words) masks, see packedStarts.lineMasks.
+    count : int
+        Number of stitches along each line.
+
+    Returns
+    -------
+    numpy array of bool
+        (lines, count) array, True where a stitch is 'on'.
+
+    """
+    octets = np.ascontiguousarray(masks, dtype='<u8').view(np.uint8)
+    return np.unpackbits(octets, axis=-1, count=count, bitorder='little').view(bool)
+
+class packedStarts(object):
+
+    def __init__(self, values=()):
+        """
+        The start states of one side of a block, packed one bit per line.
+        Behaves like a sequence of 0s and 1s: it can be indexed, set, sliced,
+        iterated and passed to np.asarray
+
+        Parameters
+        ----------
+        values : sequence of int or packedStarts, optional
+            Start states. Only their parity is kept. The default is (), no
+            lines.
+
+        Returns
+        -------
+        None.
+
+        """
+        if isinstance(values, packedStarts):
+            self.length = values.length
+            self.words = values.words.copy()
+            return
+
+        parity = (np.asarray(values).astype(np.int64, copy=False) % 2).astype(np.uint8).ravel()
+        self.length = len(parity)
+
+        # Pad out to whole words, so the padding bits are always 0
+        octets = np.zeros(-(-self.length // WORD)*8, dtype=np.uint8)
+        packed = np.packbits(parity, bitorder='little')
+        octets[:len(packed)] = packed
+        self.words = octets.view('<u8').astype(np.uint64)
+
+    @classmethod
+    def fromBytes(cls, data, length):
+        """
+        Rebuilds start states from their packed bytes, see tobytes
+
+        Parameters
+        ----------
+        data : bytes-like
+            At least ceil(length/8) packed bytes.
+        length : int
+            Number of lines.
+
+        Returns
+        -------
+        bits.packedStarts
+            The start states.
+
+        """
+        starts = cls()
+        octets = np.zeros(-(-length // WORD)*8, dtype=np.uint8)
+        octets[:-(-length // 8)] = np.frombuffer(data, dtype=np.uint8, count=-(-length // 8))
+        starts.length = length
+        starts.words = octets.view('<u8').astype(np.uint64)
+
+        # Clear any stray bits past the last line
+        if length % WORD:
+            starts.words[-1] &= np.uint64((1 << (length % WORD)) - 1)
+        return starts
+
+    @classmethod
+    def fromWords(cls, words, length):
+        """
+        Wraps existing words without copying them, e.g. a numpy memmap of a
+        pattern file, see patternfile.py
+
+        Parameters
+        ----------
+        words : numpy array of uint64
+            At least ceil(length/64) words, with any bits past length 0.
+        length : int
+            Number of lines.
+
+        Returns
+        -------
+        bits.packedStarts
+            The start states, sharing the words' memory.
+
+        """
+        starts = cls()
+        starts.length = length
+        starts.words = words[:-(-length // WORD)]
+        return starts
+
+    def tobytes(self):
+        """
+        The packed start states, ceil(length/8) bytes
+
+        Returns
+        -------
+        bytes
+            The bits, lowest first.
+
+        """
+        return self.words.astype('<u8').tobytes()[:-(-self.length // 8)]
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def unpack(self, start=0, stop=None):
+        """
+        Expands a run of lines into one byte per line
+
+        Parameters
+        ----------
+        start : int, optional
+            First line. The default is 0.
+        stop : int, optional
+            Last line + 1. The default is None, for the end.
+
+        Returns
+        -------
+        numpy array of uint8
+            0s and 1s.
+
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        stop = max(start, stop)
+
+        # Only the words holding the run are read, so starts mapped from a
+        # file are paged in as they are needed
+        first = start // WORD
+        octets = self.words[first:-(-stop // WORD)].astype('<u8').view(np.uint8)
+        return np.unpackbits(octets, count=stop - first*WORD, bitorder='little')[start - first*WORD:]
+
+    def lineMasks(self, start=0, stop=None, first=0, count=0):
+        """
+        Stitch masks of a run of lines, built a word at a time
+
+        Parameters
+        ----------
+        start : int, optional
+            First line. The default is 0.
+        stop : int, optional
+            Last line + 1. The default is None, for the end.
+        first : int, optional
+            Number of the first stitch along each line. The default is 0.
+        count : int, optional
+            Number of stitches along each line. The default is 0.
+
+        Returns
+        -------
+        numpy array of uint64
+            (lines, ceil(count/64)) masks. Bit n is set where stitch
+            first + n is 'on'. Bits past count are 0.
+
+        """
+        # Lines starting 'on', or counted from an odd stitch, are the
+        # inverse of the alternating word
+        flip = self.unpack(start, stop).astype(np.uint64) ^ np.uint64(first % 2)
+        masks = ALTERNATE ^ (np.uint64(0) - flip)[:, None] + np.zeros(-(-count // WORD), dtype=np.uint64)
+
+        if count % WORD:
+            masks[:, -1] &= np.uint64((1 << (count % WORD)) - 1)
+        return masks
+
+    def onStitches(self, start=0, stop=None, first=0, count=0):
+        """
+        Indices of the 'on' stitches of a run of lines, without building a
+        mask of every stitch. Each line's 'on' stitches are every other one,
+        from its first or second stitch depending on its start state
+
+        Parameters
+        ----------
+        start : int, optional
+            First line. The default is 0.
+        stop : int, optional
+            Last line + 1. The default is None, for the end.
+        first : int, optional
+            Number of the first stitch along each line. The default is 0.
+        count : int, optional
+            Number of stitches along each line. The default is 0.
+
+        Returns
+        -------
+        line : numpy array of int
+            Line of each 'on' stitch, counted from start.
+        stitch : numpy array of int
+            Position of each 'on' stitch along its line, counted from first.
+            Stitches are in the order of np.nonzero on the unpacked masks.
+
+        """
+        # Offset of the first 'on' stitch, and the number on each line
+        offset = (self.unpack(start, stop).astype(np.int64) + first + 1) % 2
+        number = np.maximum(0, (count - offset + 1) // 2)
+
+        # Stitches of each line follow on from those of the line before
+        before = np.cumsum(number) - number
+        line = np.repeat(np.arange(len(offset)), number)
+        stitch = np.repeat(offset - 2*before, number) + 2*np.arange(number.sum())
+        return line, stitch
+
+    def __len__(self):
+        return self.length
+
+    def _index_(self, index):
+        """
+        Internal method checking an index and counting it from the start
+
+        Parameters
+        ----------
+        index : int
+            Line number, negative from the end.
+
+        Returns
+        -------
+        int
+            Line number from the start.
+
+        """
+        index = int(index)
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f'line {index} of {self.length}')
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.unpack()[index]
+        index = self._index_(index)
+        return int(self.words[index // WORD] >> np.uint64(index % WORD)) & 1
+
+    def __setitem__(self, index, value):
+        index = self._index_(index)
+        bit = np.uint64(1 << (index % WORD))
+        if int(value) % 2:
+            self.words[index // WORD] |= bit
+        else:
+            self.words[index // WORD] &= ~bit
+
+    def toggle(self, index):
+        """
+        Flips the start state of one line
+
+        Parameters
+        ----------
+        index : int
+            The line.
+
+        Returns
+        -------
+        None.
+
+        """
+        index = self._index_(index)
+        self.words[index // WORD] ^= np.uint64(1 << (index % WORD))
+
+    def __iter__(self):
+        return iter(self.unpack().tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.unpack().astype(dtype or np.uint8, copy=False)
+
+    def tolist(self):
+        return self.unpack().tolist()
+
+    def __eq__(self, other):
+        if isinstance(other, packedStarts):
+            return self.length == other.length and np.array_equal(self.words, other.words)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        shown = ''.join(map(str, self.unpack(0, 64).tolist()))
+        return f"packedStarts('{shown}{'...' if self.length > 64 else ''}', length={self.length})"
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of rendered hitomezashi patterns
+
+The same blocks always stitch the same image, so each rendered file is stored
+under a hash of everything which decides how it looks: the geometry, colours
+and start states of every block on the cloth, the canvas size, and any render
+options such as fill. Hits are served straight from the file, without drawing
+anything. Once the cache grows past its size limit the least recently used
+files are removed
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from bits import packedStarts
+
+def clothKey(cloth, **options):
+    """
+    Stable hash of everything which decides how a cloth renders
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth, with all of its blocks added.
+    **options : keyword arguments
+        Any render options which change the output, e.g. fill or the file
+        format. Values must have a stable repr.
+
+    Returns
+    -------
+    string
+        Hex digest identifying the rendered image.
+
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((type(cloth).__name__,
+                        float(cloth.drawWidth), float(cloth.drawHeight),
+                        cloth.canvasMode, sorted(options.items()))).encode())
+
+    for name in sorted(cloth.blocks):
+        block = cloth.blocks[name]
+        digest.update(repr((name, tuple(np.ravel(block.size).tolist()),
+                            tuple(np.ravel(block.start).tolist()), tuple(block.grid),
+                            tuple(block.linergb), tuple(block.skip), block.shape,
+                            tuple(np.ravel(block.slope).tolist()), block.lineWidth)).encode())
+
+        # Only the parity of a start state matters, so equivalent starts share
+        # a key. The packed bits are hashed, one byte per 8 lines
+        for key in sorted(k for k in vars(block) if k.endswith('Starts')):
+            if getattr(block, key) is None:
+                continue
+            starts = packedStarts(getattr(block, key))
+            digest.update(f'{key}{len(starts)}'.encode())
+            digest.update(starts.tobytes())
+
+        if block.regions is not None:
+            digest.update(block.maskPalette.tobytes())
+            digest.update(block.mask.tobytes())
+
+    return digest.hexdigest()
+
+class renderCache(object):
+
+    def __init__(self,
+                 folder,
+                 maxBytes=2**30):
+        """
+        A folder of rendered files, addressed by the hash of what they show
+
+        Parameters
+        ----------
+        folder : string
+            Directory holding the cache. Created if it does not exist.
+        maxBytes : int, optional
+            Size limit of the cache. The least recently used files are
+            removed to keep within it. The default is 2**30, i.e. 1GiB.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.folder = folder
+        self.maxBytes = maxBytes
+        os.makedirs(folder, exist_ok=True)
+
+    def _path_(self, key, ext):
+        """
+        Internal method giving the cache file for a key, spread over
+        subfolders by the first two characters
+
+        Parameters
+        ----------
+        key : string
+            Hex digest, see clothKey.
+        ext : string
+            File extension, without the dot.
+
+        Returns
+        -------
+        string
+            Path of the cache file.
+
+        """
+        return os.path.join(self.folder, key[:2], f'{key}.{ext}')
+
+    def get(self, key, ext='jpg'):
+        """
+        Looks a render up in the cache, marking it as recently used
+
+        Parameters
+        ----------
+        key : string
+            Hex digest, see clothKey.
+        ext : string, optional
+            File extension of the render. The default is 'jpg'.
+
+        Returns
+        -------
+        string or None
+            Path of the cached file, or None if it is not cached.
+
+        """
+        path = self._path_(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def getBytes(self, key, ext='jpg'):
+        """
+        Reads a render's file contents from the cache
+
+        Parameters
+        ----------
+        key : string
+            Hex digest, see clothKey.
+        ext : string, optional
+            File extension of the render. The default is 'jpg'.
+
+        Returns
+        -------
+        bytes or None
+            The encoded file, or None if it is not cached.
+
+        """
+        path = self.get(key, ext)
+        if path is None:
+            return None
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def put(self, key, source, ext='jpg'):
+        """
+        Adds a render to the cache, then trims the cache to its size limit
+
+        Parameters
+        ----------
+        key : string
+            Hex digest, see clothKey.
+        source : string or bytes
+            Path of the rendered file to copy in, or its encoded contents.
+        ext : string, optional
+            File extension of the render. The default is 'jpg'.
+
+        Returns
+        -------
+        string
+            Path of the cached file.
+
+        """
+        path = self._path_(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write alongside and rename, so readers never see half a file
+        temp = f'{path}.{os.getpid()}.tmp'
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            with open(temp, 'wb') as file:
+                file.write(source)
+        else:
+            shutil.copyfile(source, temp)
+        os.replace(temp, path)
+
+        self.evict()
+        return path
+
+    def evict(self):
+        """
+        Removes the least recently used files until the cache is within its
+        size limit
+
+        Returns
+        -------
+        None.
+
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Command line batch renderer of hitomezashi patterns
+
+Reads a manifest of pattern specs (see batch.py) and renders each one, e.g.
+
+    python cli.py patterns.json --jobs 4 --format png --resume
+
+Manifests may be:
+
+    .json : a list of specs, or {"patterns": [...]}
+    .jsonl : one spec per line
+    .yaml / .yml : as .json, needs PyYAML
+    .csv : a header row of spec keys, then one spec per row. Cells holding
+        JSON, e.g. [34, 46], are parsed as such, and empty cells are left out
+
+Relative output paths are taken from --out-dir, or else the folder of the
+manifest. Rendering modules are only imported once there is something to
+render, so --help and --check return at once
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+GEOMETRIES = ('square', 'triangle', 'hex')
+LOGICS = ('rand', 'pattern', 'alternate')
+FORMATS = ('jpg', 'png', 'webp', 'svg', 'hzp')
+
+def _parseCell_(cell):
+    """
+    Internal function reading a csv cell as JSON where it can be, else as
+    the string itself
+
+    Parameters
+    ----------
+    cell : string
+        The cell.
+
+    Returns
+    -------
+    object
+        The parsed value.
+
+    """
+    try:
+        return json.loads(cell)
+    except ValueError:
+        return cell
+
+def loadManifest(path):
+    """
+    Reads the pattern specs of a manifest file
+
+    Parameters
+    ----------
+    path : string
+        Manifest path. Its extension picks the format.
+
+    Returns
+    -------
+    list of dict
+        The specs, in order.
+
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as file:
+        if ext == '.jsonl':
+            return [json.loads(line) for line in file if line.strip()]
+        if ext == '.csv':
+            return [{key: _parseCell_(cell) for key, cell in row.items() if cell not in ('', None)}
+                    for row in csv.DictReader(file)]
+        if ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError('YAML manifests need PyYAML, pip install pyyaml') from None
+            data = yaml.safe_load(file)
+        elif ext == '.json':
+            data = json.load(file)
+        else:
+            raise ValueError(f'Unknown manifest type {ext}, use .json, .jsonl, .yaml or .csv')
+
+    if isinstance(data, dict):
+        data = data.get('patterns')
+    if not isinstance(data, list):
+        raise ValueError('A manifest holds a list of specs, or {"patterns": [...]}')
+    return data
+
+def validateSpec(spec):
+    """
+    Checks a spec for mistakes which would stop it rendering, without
+    building anything
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec, see batch.py.
+
+    Returns
+    -------
+    list of string
+        The problems found, empty if there are none.
+
+    """
+    if not isinstance(spec, dict):
+        return ['spec is not a mapping']
+
+    problems = []
+    if not spec.get('output'):
+        problems.append('no output path')
+    elif os.path.splitext(spec['output'])[1].lower().lstrip('.') not in FORMATS + ('jpeg',):
+        problems.append(f"output {spec['output']} is not one of {', '.join(FORMATS)}")
+    if spec.get('geometry', 'square') not in GEOMETRIES + ('mosaic',):
+        problems.append(f"unknown geometry {spec['geometry']}")
+
+    # Each tile of a mosaic is a pattern of its own, defaulting to the spec
+    patterns = [('', spec)]
+    if spec.get('geometry') == 'mosaic':
+        if not isinstance(spec.get('tiles'), list) or not spec['tiles']:
+            return problems + ['mosaic needs a list of tiles']
+        if not all(isinstance(tile, dict) for tile in spec['tiles']):
+            return problems + ['tile is not a mapping']
+        patterns = [(f'tile {i}: ', {**spec, 'geometry': 'square', **tile})
+                    for i, tile in enumerate(spec['tiles'], 1)]
+
+    for where, pattern in patterns:
+        if where and pattern['geometry'] not in GEOMETRIES:
+            problems.append(f"{where}unknown geometry {pattern['geometry']}")
+        if pattern.get('logic', 'rand') not in LOGICS:
+            problems.append(f"{where}unknown logic {pattern['logic']}")
+        if pattern.get('logic', 'rand') == 'rand' and pattern.get('thresh') is None:
+            problems.append(f'{where}rand logic needs thresh')
+        if not isinstance(pattern.get('starts', {}), dict):
+            problems.append(f'{where}starts is not a mapping')
+
+    # Regions are only found on square grids. A mosaic's own fill only goes
+    # on its square tiles, so only a tile's fill can be misplaced
+    if spec.get('geometry') == 'mosaic':
+        for i, tile in enumerate(spec['tiles'], 1):
+            if tile.get('fill') is not None and tile.get('geometry', 'square') != 'square':
+                problems.append(f"tile {i}: fill needs a square geometry, not {tile['geometry']}")
+    elif spec.get('fill') is not None and spec.get('geometry', 'square') != 'square':
+        problems.append(f"fill needs a square geometry, not {spec['geometry']}")
+    return problems
+
+def prepareSpecs(specs, outDir, fmt=None):
+    """
+    Resolves the output path of each spec, and changes its file type if asked
+
+    Parameters
+    ----------
+    specs : list of dict
+        Pattern specs.
+    outDir : string
+        Folder which relative outputs are taken from.
+    fmt : string, optional
+        One of FORMATS, replacing the extension of every output. The default
+        is None, leaving the outputs as they are.
+
+    Returns
+    -------
+    list of dict
+        Copies of the specs.
+
+    """
+    prepared = []
+    for spec in specs:
+        spec = dict(spec)
+        output = spec.get('output')
+        if output:
+            output = os.path.join(outDir, os.path.expanduser(output))
+            if fmt is not None:
+                output = f'{os.path.splitext(output)[0]}.{fmt}'
+            spec['output'] = output
+        prepared.append(spec)
+    return prepared
+
+def isRendered(spec):
+    """
+    Whether a spec's output already exists, for --resume. Renders are moved
+    into place once complete, so any file found is whole
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec.
+
+    Returns
+    -------
+    bool
+        True if the output is a non-empty file.
+
+    """
+    try:
+        return os.path.getsize(spec['output']) > 0
+    except OSError:
+        return False
+
+def iterRender(specs, jobs=1):
+    """
+    Renders specs, in process for one job or else across a pool
+
+    Parameters
+    ----------
+    specs : list of dict
+        Pattern specs.
+    jobs : int, optional
+        Number of worker processes. The default is 1.
+
+    Yields
+    ------
+    dict
+        Result of batch.renderSpec for each spec, in order.
+
+    """
+    import batch
+
+    if jobs == 1:
+        for spec in specs:
+            yield batch.renderSpec(spec)
+    else:
+        yield from batch.iterBatch(specs, workers=jobs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', help='file of pattern specs')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='worker processes, 0 for one per core')
+    parser.add_argument('--format', choices=FORMATS, help='file type of every output')
+    parser.add_argument('--out-dir', help='folder for relative outputs')
+    parser.add_argument('--resume', action='store_true', help='skip outputs which already exist')
+    parser.add_argument('--check', action='store_true', help='validate the manifest and stop')
+    parser.add_argument('--quiet', '-q', action='store_true', help='only report failures')
+    args = parser.parse_args(argv)
+
+    try:
+        specs = loadManifest(args.manifest)
+    except (OSError, ValueError) as error:
+        print(f'{args.manifest}: {error}', file=sys.stderr)
+        return 2
+
+    outDir = args.out_dir or os.path.dirname(os.path.abspath(args.manifest))
+    specs = prepareSpecs(specs, outDir, args.format)
+
+    invalid = 0
+    for i, spec in enumerate(specs, 1):
+        for problem in validateSpec(spec):
+            print(f'spec {i}: {problem}', file=sys.stderr)
+            invalid += 1
+    if invalid or args.check:
+        if not args.quiet:
+            print(f'{len(specs)} specs, {invalid} problems')
+        return 1 if invalid else 0
+
+    todo = [spec for spec in specs if not (args.resume and isRendered(spec))]
+    skipped = len(specs) - len(todo)
+    if skipped and not args.quiet:
+        print(f'{skipped} of {len(specs)} already rendered')
+
+    start = time.perf_counter()
+    failed = 0
+    for i, result in enumerate(iterRender(todo, args.jobs or None), 1):
+        if not result['ok']:
+            failed += 1
+            print(f"[{i}/{len(todo)}] FAILED {result['output']}\n{result['error']}",
+                  file=sys.stderr, flush=True)
+        elif not args.quiet:
+            print(f"[{i}/{len(todo)}] ok {result['output']}", flush=True)
+
+    if not args.quiet:
+        print(f'{len(todo) - failed} rendered, {failed} failed, {skipped} skipped '
+              f'in {time.perf_counter() - start:.1f}s')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
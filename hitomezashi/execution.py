@@ -3,91 +3,52 @@
 Created on Thu Jul 21 07:33:16 2022
 
 Execution of some hitzomezashi patterns
- 
- 
-@author: IREAD
-"""
-import os
-import geometries
-import numpy as np
-
-# TODO:: Make a utils directory and add genStarts to it
-
-def genStarts(sideLen=50, modulo=7, cutOff=4):
-    """
-    
-
-    Parameters
-    ----------
-    sideLen : int, optional
-        The number of points per side. The default is 50.
-    modulo : int, optional
-        Numerical base. The default is 7.
-    cutOff : int, optional
-        Threshold to choose 1 or 0.
-        If cutOff >= modulo then none will be set to 1
-        The default is 4.
 
-    Returns
-    -------
-    None.
+Renders two example patterns into a folder, by default the current one, e.g.
 
-    """
-    
-    # Create a pattern of numbers
-    starts = np.linspace(1, sideLen, sideLen)%modulo
+    python execution.py outputs
 
-    # Convert to boolean according to some rule
-    starts = starts > cutOff
+Any other set of patterns can be written as a manifest for cli.py
 
-    # Convert to int for 1s and 0s
-    return(starts.astype(int))
-
-choice = 'triangle'
-
-if choice == 'square':
-    
-    # Create patterns of starts according to some numerical rules
-    rowStarts = genStarts(50, 3, 0)
-    colStarts = genStarts(50, 6, 4)
-    
-    # Choose a save folder
-    savePathBase = r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi"
-    
-    # Name the patterna and define a save path
-    modeName = "First Pattern"
-    savePath = os.path.join(savePathBase, modeName)
-    
-    # Create image directory
-    if os.path.isdir(savePath) is False:
-        os.mkdir(savePath)
-    
-    # Instantiate a cloth, then do some drawing
-    square = geometries.squareCloth('myFirst', savePathBase=savePathBase)
-    
-    square.defineMode(logic='rand', rowStarts=rowStarts, colStarts=colStarts, modeName='First Pattern', thresh=[34, 46])
-
-elif choice == 'triangle':
-    
-    num_rows = 50
-    # Generate patterns of starts
-    baseStarts = genStarts(num_rows, 6, 2)
-    leftStarts = genStarts(num_rows, 17, 6)
-    rightStarts = genStarts(num_rows, 19, 9)
-    
-    
-    # Choose a save folder
-    savePathBase = r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi"
-    
-    # Name the pattern and define a save path
-    modeName = "First Tri Pattern"
-    savePath = os.path.join(savePathBase, modeName)
-    
-    # Create image directory
-    if os.path.isdir(savePath) is False:
-        os.mkdir(savePath)
-    
-    # Instantiate a cloth, then do some drawing
-    tri = geometries.triangleCloth('myFirst', grid = (num_rows, int(np.ceil(num_rows*(17.885/20)))), slope = 0.5, savePathBase=savePathBase)
-    
-    tri.defineMode(logic='rand', baseStarts=baseStarts, leftStarts=leftStarts, rightStarts=rightStarts, modeName='First Tri Pattern', thresh=[17, 67, 50])
\ No newline at end of file
+@author: IREAD
+"""
+import math
+import os
+import sys
+
+# Square pattern, with starts following some numerical rules
+SQUARE = {'geometry': 'square',
+          'output': 'First Pattern.jpg',
+          'logic': 'rand',
+          'starts': {'rowStarts': {'sideLen': 50, 'modulo': 3, 'cutOff': 0},
+                     'colStarts': {'sideLen': 50, 'modulo': 6, 'cutOff': 4}},
+          'thresh': [34, 46]}
+
+num_rows = 50
+
+# Triangle pattern, on a grid of roughly equilateral triangles
+TRIANGLE = {'geometry': 'triangle',
+            'output': 'First Tri Pattern.jpg',
+            'grid': [num_rows, math.ceil(num_rows*(17.885/20))],
+            'slope': 0.5,
+            'logic': 'rand',
+            'starts': {'baseStarts': {'sideLen': num_rows, 'modulo': 6, 'cutOff': 2},
+                       'leftStarts': {'sideLen': num_rows, 'modulo': 17, 'cutOff': 6},
+                       'rightStarts': {'sideLen': num_rows, 'modulo': 19, 'cutOff': 9}},
+            'thresh': [17, 67, 50]}
+
+def main(savePathBase='.'):
+    import cli
+
+    specs = cli.prepareSpecs([SQUARE, TRIANGLE], savePathBase)
+    failed = 0
+    for result in cli.iterRender(specs):
+        if result['ok']:
+            print(f"saved {result['output']}")
+        else:
+            failed += 1
+            print(result['error'], file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else os.getcwd()))
@@ -18,10 +18,14 @@ class squareCloth(hit.hitomezashi):
 
     def __init__(self,
                  hName,
-                 blocks = {},
-                 modes = {},
+                 blocks = None,
+                 modes = None,
                  quant=20,
-                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi"):
+                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi",
+                 backend='numpy',
+                 grid=(50, 50),
+                 tiled=False,
+                 canvasMode='RGB'):
         
         """
         A square 'cloth' onto which a pattern is to be stitched
@@ -31,13 +35,25 @@ class squareCloth(hit.hitomezashi):
         hName : String
             Name of this instance
         blocks : dictionary, optional
-            Dict of hitomezashi.stitch_blocks. The default is {}.
+            Dict of hitomezashi.stitch_blocks. The default is None, which
+            gives this cloth its own empty dict.
         modes : dictionary, optional
-            Dict of hitomezashi.operatingModes. The default is {}.
+            Dict of hitomezashi.operatingModes. The default is None, which
+            gives this cloth its own empty dict.
         quant : int, optional
             Unit size of grid element. The default is 20.
         savePathBase : String, optional
             Base save location for output files
+        backend : String, optional
+            pil or numpy, see hitomezashi.hitomezashi. Both draw the same
+            pixels, numpy several times faster. The default is 'numpy'.
+        grid : tuple, optional
+            The number of columns and rows. The default is (50, 50).
+        tiled : bool, optional
+            Render region by region rather than onto one canvas, see
+            hitomezashi.hitomezashi. The default is False.
+        canvasMode : String, optional
+            RGB, P or 1, see hitomezashi.hitomezashi. The default is 'RGB'.
 
         Returns
         -------
@@ -46,11 +62,12 @@ class squareCloth(hit.hitomezashi):
         """
         
         # Inherit the rest of the init method from hitomezashi.hitomezashi
-        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant)
+        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant,
+                         backend=backend, tiled=tiled, canvasMode=canvasMode)
         
         # Define the inputs for however many blocks to be included on the cloth
         self.grids = {
-            'A': (50, 50),
+            'A': grid,
         }
  
         # Dictionary of pixel sizes per block in (w, h)
@@ -65,8 +82,9 @@ class squareCloth(hit.hitomezashi):
  
         self.starts['A'] = (0, 0)
         self.quant= quant
-        self.blocks = blocks
-        self.modes = modes
+        # Fresh dicts per cloth, so that cloths never share blocks or modes
+        self.blocks = {} if blocks is None else blocks
+        self.modes = {} if modes is None else modes
         self.savePathBase = savePathBase
         
         
@@ -83,7 +101,14 @@ class squareCloth(hit.hitomezashi):
             The name for this mode
         **kwargs : keyword arguments
             Keyword args to instantiate other classes and call lower level
-            methods
+            methods. Passing seed makes 'rand' logic repeatable, see
+            hitomezashi.stitch_block. Passing fill, a pair of RGB colours, colours in the
+            regions enclosed by the stitches. Passing save=False skips
+            saving the frame. Passing animate as row, column or region saves
+            an animation of the stitches being added instead, see
+            hitomezashi.stitchFrames. Passing cache, a cache.renderCache,
+            takes patterns drawn before from the cache rather than drawing
+            them, with any extra key options in the dict cacheOptions
 
         Returns
         -------
@@ -97,6 +122,13 @@ class squareCloth(hit.hitomezashi):
             'rowStarts': None,
             'colStarts': None,
             'thresh': None,
+            'seed': None,
+            'firstStates': None,
+            'fill': None,
+            'save': True,
+            'animate': None,
+            'cache': None,
+            'cacheOptions': None,
             }
         # Scan through kwargs and populate any missing arguments
         for key, value in defaultDict.items():
@@ -111,35 +143,39 @@ class squareCloth(hit.hitomezashi):
                       size=self.sizes['A'],
                       start=self.starts['A'],
                       grid=self.grids['A'],
+                      canvas=False,
                       linergb=(0, 0, 255),
                       logic=logic,
                       rowStarts=self.rowStarts,
                       colStarts=self.colStarts,
                       thresh=self.thresh,
+                      seed=self.seed,
+                      firstStates=self.firstStates,
                       )
         
         self.A = self.blocks['A']
         
         self.addMode(modeName, basePath=self.savePathBase)
-            
-        # Draw detector with all blocks empty
-        self.drawStitches(self.blocks['A'])
+        
+        # Fill, draw and save, or take the pattern from the cache
+        self._renderMode_(modeName, fills={'A': self.fill}, animate=self.animate)
  
         # Label each block for debug
         # self.drawLabels()
         
-        self.saveFrame(self.modes['First Pattern'])
-        
 class triangleCloth(hit.hitomezashi_tri):
     
     def __init__(self,
                  hName,
-                 blocks={},
-                 modes={},
+                 blocks=None,
+                 modes=None,
                  quant=20,
                  grid = (100, 90),
                  slope = 0.5,
-                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi"):
+                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi",
+                 backend='numpy',
+                 tiled=False,
+                 canvasMode='RGB'):
         """
         
 
@@ -148,9 +184,11 @@ class triangleCloth(hit.hitomezashi_tri):
         hName : String
             Name of this instance
         blocks : dictionary, optional
-            Dict of hitomezashi.stitch_blocks. The default is {}.
+            Dict of hitomezashi.stitch_blocks. The default is None, which
+            gives this cloth its own empty dict.
         modes : dictionary, optional
-            Dict of hitomezashi.operatingModes. The default is {}.
+            Dict of hitomezashi.operatingModes. The default is None, which
+            gives this cloth its own empty dict.
         quant : int, optional
             Unit size of grid element. The default is 20.
         savePathBase : String, optional
@@ -161,6 +199,14 @@ class triangleCloth(hit.hitomezashi_tri):
             gradient of the edges. The default is 0.5.
         savePathBase : string, optional
             Directory into which to save images
+        backend : String, optional
+            pil or numpy, see hitomezashi.hitomezashi. Both draw the same
+            pixels, numpy several times faster. The default is 'numpy'.
+        tiled : bool, optional
+            Render region by region rather than onto one canvas, see
+            hitomezashi.hitomezashi. The default is False.
+        canvasMode : String, optional
+            RGB, P or 1, see hitomezashi.hitomezashi. The default is 'RGB'.
 
         Returns
         -------
@@ -169,10 +215,12 @@ class triangleCloth(hit.hitomezashi_tri):
         """
         
         # inherit the rest of the init method from the parent class
-        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant)
+        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant,
+                         backend=backend, tiled=tiled, canvasMode=canvasMode)
         self.quant= quant
-        self.blocks = blocks
-        self.modes = modes
+        # Fresh dicts per cloth, so that cloths never share blocks or modes
+        self.blocks = {} if blocks is None else blocks
+        self.modes = {} if modes is None else modes
         self.savePathBase = savePathBase
         self.slope = slope
         
@@ -214,7 +262,14 @@ class triangleCloth(hit.hitomezashi_tri):
             The name for this mode
         **kwargs : keyword arguments
             Keyword args to instantiate other classes and call lower level
-            methods
+            methods. Passing seed makes 'rand' logic repeatable, see
+            hitomezashi.stitch_block. Passing save=False skips saving the
+            frame. Passing animate as row or column saves an animation of the stitches being
+            added instead, see hitomezashi.stitchFrames. Passing cache, a
+            cache.renderCache, takes patterns drawn before from the cache
+            rather than drawing them, with any extra key options in the dict
+            cacheOptions. Regions are only found on square grids, so passing
+            fill raises a ValueError
 
         Returns
         -------
@@ -229,6 +284,13 @@ class triangleCloth(hit.hitomezashi_tri):
             'leftStarts': None,
             'rightStarts': None,
             'thresh': None,
+            'seed': None,
+            'firstStates': None,
+            'fill': None,
+            'save': True,
+            'animate': None,
+            'cache': None,
+            'cacheOptions': None,
             }
         
         # Scan through kwargs and populate any missing arguments
@@ -243,6 +305,7 @@ class triangleCloth(hit.hitomezashi_tri):
                       size=self.sizes['A'],
                       start=self.starts['A'],
                       grid=self.grids['A'],
+                      canvas=False,
                       linergb=(0, 0, 255),
                       slope = (self.slope, self.slope),
                       logic=logic,
@@ -251,16 +314,358 @@ class triangleCloth(hit.hitomezashi_tri):
                       leftStarts=self.leftStarts,
                       rightStarts=self.rightStarts,
                       thresh=self.thresh,
+                      seed=self.seed,
+                      firstStates=self.firstStates,
                       )
         
         self.A = self.blocks['A']
         
         self.addMode(modeName, basePath=self.savePathBase)
-            
-        # Draw detector with all blocks empty
-        self.drawStitches(self.blocks['A'])
+
+        # Draw and save, or take the pattern from the cache
+        self._renderMode_(modeName, fills={'A': self.fill}, animate=self.animate)
  
         # Label each block for debug
         # self.drawLabels()
-        
-        self.saveFrame(self.modes['First Tri Pattern'])
\ No newline at end of file
+
+class hexCloth(hit.hitomezashi_hex):
+
+    def __init__(self,
+                 hName,
+                 blocks=None,
+                 modes=None,
+                 quant=20,
+                 grid=(50, 50),
+                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi",
+                 backend='pil',
+                 tiled=False,
+                 canvasMode='RGB'):
+        """
+        An isometric 'cloth', with points on a triangular lattice, onto which
+        a pattern is to be stitched along rows and both diagonals
+
+        Parameters
+        ----------
+        hName : String
+            Name of this instance
+        blocks : dictionary, optional
+            Dict of hitomezashi.stitch_blocks. The default is None, which
+            gives this cloth its own empty dict.
+        modes : dictionary, optional
+            Dict of hitomezashi.operatingModes. The default is None, which
+            gives this cloth its own empty dict.
+        quant : int, optional
+            Length of a stitch. The default is 20.
+        grid : tuple, optional
+            The width and height of the cloth in stitches. Each row holds
+            grid[0]-1 points, and there are grid[1]-1 rows. The default is
+            (50, 50).
+        savePathBase : String, optional
+            Base save location for output files
+        backend : String, optional
+            pil or numpy, see hitomezashi.hitomezashi. The default is 'pil'.
+        tiled : bool, optional
+            Render region by region rather than onto one canvas, see
+            hitomezashi.hitomezashi. The default is False.
+        canvasMode : String, optional
+            RGB, P or 1, see hitomezashi.hitomezashi. The default is 'RGB'.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        # Inherit the rest of the init method from the parent class
+        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant,
+                         backend=backend, tiled=tiled, canvasMode=canvasMode)
+        self.quant = quant
+        # Fresh dicts per cloth, so that cloths never share blocks or modes
+        self.blocks = {} if blocks is None else blocks
+        self.modes = {} if modes is None else modes
+        self.savePathBase = savePathBase
+
+        self.grids = {
+            'A': grid
+            }
+
+        # Rows of equilateral triangles are sqrt(3)/2 of a stitch apart
+        self.sizes = {
+            'A': (quant, quant*math.sqrt(3)/2),
+            }
+
+        # Dictionary of starting positions for each stitch_block (x, y)
+        self.starts = {}
+
+        self.starts['A'] = (0, 0)
+
+    def defineMode(self, logic, modeName, **kwargs):
+        """
+        Method to define a 'mode' for this cloth
+
+        Parameters
+        ----------
+        logic : string
+            pattern, rand or alternate
+        modeName : string
+            The name for this mode
+        **kwargs : keyword arguments
+            Keyword args to instantiate other classes and call lower level
+            methods. For pattern logic, pass rowStarts of length grid[1], and
+            leftStarts and rightStarts of length grid[0] + grid[1]//2. Thresh
+            and firstStates are in the same order. Passing seed, save=False,
+            animate or cache work as for squareCloth. Regions are only found
+            on square grids, so passing fill, or animate='region', raises a
+            ValueError
+
+        Returns
+        -------
+        None.
+
+        """
+
+        # Defaults
+        defaultDict = {
+            'rowStarts': None,
+            'leftStarts': None,
+            'rightStarts': None,
+            'thresh': None,
+            'seed': None,
+            'firstStates': None,
+            'fill': None,
+            'save': True,
+            'animate': None,
+            'cache': None,
+            'cacheOptions': None,
+            }
+
+        # Scan through kwargs and populate any missing arguments
+        for key, value in defaultDict.items():
+            if key not in kwargs.keys():
+                kwargs[key] = value
+
+        self.__dict__.update((k, v) for k, v in kwargs.items())
+
+        # Create an isometric grid. This is our 'perforated' cloth
+        self.addBlock('A',
+                      size=self.sizes['A'],
+                      start=self.starts['A'],
+                      grid=self.grids['A'],
+                      canvas=False,
+                      linergb=(0, 0, 255),
+                      logic=logic,
+                      shape='isometric',
+                      rowStarts=self.rowStarts,
+                      leftStarts=self.leftStarts,
+                      rightStarts=self.rightStarts,
+                      thresh=self.thresh,
+                      seed=self.seed,
+                      firstStates=self.firstStates,
+                      )
+
+        self.A = self.blocks['A']
+
+        self.addMode(modeName, basePath=self.savePathBase)
+
+        # Draw and save, or take the pattern from the cache
+        self._renderMode_(modeName, fills={'A': self.fill}, animate=self.animate)
+
+class mosaicCloth(hit.hitomezashi_mosaic):
+
+    # Block shape of each tile geometry
+    shapes = {'square': 'rectangle', 'triangle': 'triangle', 'hex': 'isometric'}
+
+    # Start states a tile may give outright, for pattern logic
+    startKeys = ('rowStarts', 'colStarts', 'baseStarts', 'leftStarts', 'rightStarts')
+
+    def __init__(self,
+                 hName,
+                 tiles,
+                 columns=None,
+                 gap=1,
+                 blocks=None,
+                 modes=None,
+                 quant=20,
+                 savePathBase=r"C:\Users\iainj\Documents\Python Outputs\Hitomezashi",
+                 backend='pil',
+                 tiled=False,
+                 canvasMode='RGB'):
+        """
+        A 'cloth' made up of a grid of tiles, each its own pattern with its
+        own geometry, colour and start rules. Every tile is one stitch_block,
+        and blocks are rendered in parallel, see parallel.renderBlocks
+
+        Parameters
+        ----------
+        hName : String
+            Name of this instance
+        tiles : list of dict
+            One dict per tile, row by row. Each may hold:
+            geometry : 'square', 'triangle' or 'hex'. The default is 'square'.
+            grid : as for the cloth of that geometry. The default is (50, 50).
+            slope : gradient of a triangle's edges. The default is 0.5.
+            linergb : colour of the stitches. The default is (0, 0, 255).
+            logic, thresh, seed, firstStates, fill : this tile's mode
+                arguments, in place of those passed to defineMode.
+            rowStarts, colStarts, baseStarts, leftStarts, rightStarts : start
+                states, for pattern logic.
+        columns : int, optional
+            Number of tiles per row. The default is None, for a square-ish
+            grid.
+        gap : int, optional
+            Stitch lengths between neighbouring tiles. The default is 1.
+        blocks : dictionary, optional
+            Dict of hitomezashi.stitch_blocks. The default is None, which
+            gives this cloth its own empty dict.
+        modes : dictionary, optional
+            Dict of hitomezashi.operatingModes. The default is None, which
+            gives this cloth its own empty dict.
+        quant : int, optional
+            Unit size of grid element. The default is 20.
+        savePathBase : String, optional
+            Base save location for output files
+        backend : String, optional
+            pil or numpy, see hitomezashi.hitomezashi. The default is 'pil'.
+        tiled : bool, optional
+            Render region by region rather than onto one canvas, see
+            hitomezashi.hitomezashi. The default is False.
+        canvasMode : String, optional
+            RGB, P or 1, see hitomezashi.hitomezashi. The default is 'RGB'.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        # Inherit the rest of the init method from the parent class
+        super().__init__(hName=hName, blocks=blocks, modes=modes, quant=quant,
+                         backend=backend, tiled=tiled, canvasMode=canvasMode)
+        self.quant = quant
+        # Fresh dicts per cloth, so that cloths never share blocks or modes
+        self.blocks = {} if blocks is None else blocks
+        self.modes = {} if modes is None else modes
+        self.savePathBase = savePathBase
+
+        if columns is None:
+            columns = math.ceil(math.sqrt(len(tiles)))
+        self.columns = columns
+        self.gap = gap
+
+        # Tiles are named '{col}_{row}' after their place in the mosaic
+        self.tiles = {f'{i % columns}_{i // columns}': dict(tile) for i, tile in enumerate(tiles)}
+
+        self.grids = {}
+        self.sizes = {}
+        for name, tile in self.tiles.items():
+            geometry = tile.get('geometry', 'square')
+            if geometry not in self.shapes:
+                raise ValueError(f'Unknown geometry {geometry}')
+            self.grids[name] = tuple(tile.get('grid', (50, 50)))
+
+            # Rows of points are closer together on sloping lattices
+            if geometry == 'triangle':
+                self.sizes[name] = (quant, quant*np.cos(np.arctan(tile.get('slope', 0.5))))
+            elif geometry == 'hex':
+                self.sizes[name] = (quant, quant*math.sqrt(3)/2)
+            else:
+                self.sizes[name] = (quant, quant)
+
+        # Each column is as wide as its widest tile, and each row as tall as
+        # its tallest, with a gap in between
+        rows = -(-len(tiles) // columns)
+        widths = [0]*columns
+        heights = [0]*rows
+        for i, name in enumerate(self.tiles):
+            widths[i % columns] = max(widths[i % columns], self.grids[name][0]*self.sizes[name][0])
+            heights[i // columns] = max(heights[i // columns], self.grids[name][1]*self.sizes[name][1])
+        xs = np.concatenate([[0], np.cumsum(np.add(widths, gap*quant))])
+        ys = np.concatenate([[0], np.cumsum(np.add(heights, gap*quant))])
+
+        # Dictionary of starting positions for each stitch_block (x, y)
+        self.starts = {name: (float(xs[i % columns]), float(ys[i // columns]))
+                       for i, name in enumerate(self.tiles)}
+
+    def defineMode(self, logic, modeName, **kwargs):
+        """
+        Method to define a 'mode' for this cloth, creating a block per tile
+        and rendering them all
+
+        Parameters
+        ----------
+        logic : string
+            pattern, rand or alternate, for tiles which do not give their own
+        modeName : string
+            The name for this mode
+        **kwargs : keyword arguments
+            Keyword args to instantiate other classes and call lower level
+            methods. thresh, firstStates and fill apply to every tile which
+            does not give its own, with fill only used on square tiles. A
+            tile giving its own fill must be square, else a ValueError is
+            raised.
+            Passing seed gives each tile without its own seed a child of the
+            one seed, so the whole mosaic is repeatable. Passing workers sets
+            the number of processes rendering blocks, 1 for none. Passing
+            save=False or cache work as for squareCloth
+
+        Returns
+        -------
+        None.
+
+        """
+
+        # Defaults
+        defaultDict = {
+            'thresh': None,
+            'seed': None,
+            'firstStates': None,
+            'fill': None,
+            'save': True,
+            'workers': None,
+            'cache': None,
+            'cacheOptions': None,
+            }
+
+        # Scan through kwargs and populate any missing arguments
+        for key, value in defaultDict.items():
+            if key not in kwargs.keys():
+                kwargs[key] = value
+
+        self.__dict__.update((k, v) for k, v in kwargs.items())
+
+        # One independent stream per tile, all derived from the seed
+        if isinstance(self.seed, np.random.Generator):
+            seeds = [self.seed]*len(self.tiles)
+        else:
+            if not isinstance(self.seed, np.random.SeedSequence):
+                self.seed = np.random.SeedSequence(self.seed)
+            seeds = self.seed.spawn(len(self.tiles))
+
+        # Create every block before the canvas, which is then sized once
+        with self._phase_('starts'):
+            for (name, tile), seed in zip(self.tiles.items(), seeds):
+                geometry = tile.get('geometry', 'square')
+                slope = tile.get('slope', 0.5) if geometry == 'triangle' else 0
+                self.addBlock(hit.stitch_block(name,
+                                               size=self.sizes[name],
+                                               start=self.starts[name],
+                                               grid=self.grids[name],
+                                               linergb=tuple(tile.get('linergb', (0, 0, 255))),
+                                               shape=self.shapes[geometry],
+                                               slope=(slope, slope),
+                                               logic=tile.get('logic', logic),
+                                               thresh=tile.get('thresh', self.thresh),
+                                               seed=tile.get('seed', seed),
+                                               firstStates=tile.get('firstStates', self.firstStates),
+                                               **{key: tile[key] for key in self.startKeys if key in tile}))
+        self._getDimensions_()
+
+        self.addMode(modeName, basePath=self.savePathBase)
+
+        # Colour in the enclosed regions of square tiles, if asked
+        fills = {name: tile.get('fill', self.fill if self.blocks[name].shape == 'rectangle' else None)
+                 for name, tile in self.tiles.items()}
+
+        # Render the blocks in parallel and save, or take the pattern from
+        # the cache
+        self._renderMode_(modeName, fills=fills, workers=self.workers)
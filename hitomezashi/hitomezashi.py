@@ -12,19 +12,168 @@ From these blocks, a hitomezashi object is instantiated. When blocks are added
 it calls the _createCanvas_ method to create the ImageDraw.draw object on which
 all the lines will be drawn
 
-TODO:: Update standard draw methods to use just one loop, like the triangle
-method does
+Stitch states are evaluated for whole blocks at once with numpy (see
+stitchParity and stitchSegments), and only the resulting 'on' stitches are
+passed to the canvas
 
 @author: IREAD
 """
  
 import os
+import shutil
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
-import math
+from animation import animationWriter, writeAnimation
+from bits import packedStarts, unpackMasks
+from cache import clothKey
+from frames import frameWriter, readFrame
+from instrument import NOPHASE, renderStats, timedPhase
+from parallel import blockBox, renderBlocks
+from utils import randStarts
  
 ###############################################################################
  
+###############################################################################
+def rasterSegments(pixels, segments, ink, origin=(0, 0)):
+    """
+    Writes one pixel wide lines directly into a pixel array. Gives the same
+    pixels as ImageDraw.line with width=1: both end points are included,
+    coordinates are truncated to whole pixels, sloping lines follow the same
+    Bresenham steps and anything outside of the array is clipped
+
+    Parameters
+    ----------
+    pixels : numpy array
+        (height, width, 3) array of pixel values to be drawn on, or
+        (height, width) for palette and bilevel canvases
+    segments : numpy array
+        (N, 4) array of (x0, y0, x1, y1) line coordinates
+    ink : tuple or int
+        Pixel value to write along each line, see hitomezashi._ink_
+    origin : tuple, optional
+        Canvas (x, y) coordinates of the first pixel of the array, when it
+        only holds part of the canvas. The default is (0, 0).
+
+    Returns
+    -------
+    None.
+
+    """
+    height, width = pixels.shape[:2]
+
+    # Truncate on the canvas first, so lines land on the same pixels however
+    # the canvas is split up
+    x0, y0, x1, y1 = (np.asarray(segments).reshape(-1, 4).astype(int) - [*origin, *origin]).T
+
+    # Every line takes one pixel per step along its longer axis. Along the
+    # shorter axis it moves by the rounded fraction of the way, rounding
+    # halves up as ImageDraw does, which is exact along the longer axis
+    dx = x1 - x0
+    dy = y1 - y0
+    lengths = np.maximum(np.abs(dx), np.abs(dy))
+
+    # Lines of one length are stepped along together, one pixel at a time
+    for length in np.unique(lengths):
+        sel = lengths == length
+        sx, sy = x0[sel], y0[sel]
+        ax, ay = np.abs(dx[sel]), np.abs(dy[sel])
+        signx, signy = np.sign(dx[sel]), np.sign(dy[sel])
+        span = 2*max(length, 1)
+        for step in range(length + 1):
+            x = sx + signx*((2*step*ax + length) // span)
+            y = sy + signy*((2*step*ay + length) // span)
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            pixels[y[inside], x[inside]] = ink
+
+def mergeRuns(segments):
+    """
+    Joins collinear lines which meet end to end into single runs
+
+    Parameters
+    ----------
+    segments : numpy array
+        (N, 4) array of (x0, y0, x1, y1) line coordinates
+
+    Returns
+    -------
+    numpy array
+        (M, 4) array of (x0, y0, x1, y1) coordinates, one row per run
+
+    """
+    segs = np.asarray(segments, dtype=float).reshape(-1, 4)
+    if len(segs) == 0:
+        return segs
+
+    # Unit direction of each line, its perpendicular offset (which line it
+    # lies on) and its position along that line
+    dx = segs[:, 2] - segs[:, 0]
+    dy = segs[:, 3] - segs[:, 1]
+    length = np.hypot(dx, dy)
+    ux = np.round(dx/length, 6)
+    uy = np.round(dy/length, 6)
+    offset = np.round(segs[:, 0]*uy - segs[:, 1]*ux, 6)
+    position = segs[:, 0]*ux + segs[:, 1]*uy
+
+    # Order lines one after another along each line
+    segs = segs[np.lexsort((position, offset, uy, ux))]
+
+    # A new run begins wherever a line does not start at the end of the last
+    gap = np.abs(segs[1:, :2] - segs[:-1, 2:]).max(axis=1) > 1e-6
+    first = np.concatenate([[True], gap])
+    last = np.concatenate([gap, [True]])
+
+    return np.hstack([segs[first, :2], segs[last, 2:]])
+
+def paintMask(pixels, block, origin=(0, 0), inks=None):
+    """
+    Fills the grid cells of a rectangular block with their colours from the
+    block's mask, writing straight into a pixel array
+
+    Parameters
+    ----------
+    pixels : numpy array
+        (height, width, 3) array of pixel values to be drawn on, or
+        (height, width) for palette and bilevel canvases
+    block : hitomezashi.stitch_block object
+        The block whose mask is painted
+    origin : tuple, optional
+        Canvas (x, y) coordinates of the first pixel of the array, when it
+        only holds part of the canvas. The default is (0, 0).
+    inks : numpy array, optional
+        Pixel value of each entry of the block's maskPalette, see
+        hitomezashi._maskInks_. The default is None, for the RGB colours
+        themselves.
+
+    Returns
+    -------
+    None.
+
+    """
+    height, width = pixels.shape[:2]
+    cols, rows = block.grid
+    sizex, sizey = int(block.size[0]), int(block.size[1])
+    stridex = (1+block.skip[0])*sizex
+    stridey = (1+block.skip[1])*sizey
+
+    # Block pixels which land in the array, relative to the block start
+    x0 = int(block.start[0]) - origin[0]
+    y0 = int(block.start[1]) - origin[1]
+    px = np.arange(max(0, -x0), min(cols*stridex, width - x0))
+    py = np.arange(max(0, -y0), min(rows*stridey, height - y0))
+
+    # Miss out any skipped rows and columns
+    px = px[px % stridex < sizex]
+    py = py[py % stridey < sizey]
+    if len(px) == 0 or len(py) == 0:
+        return
+
+    # Look the colours up from the palette only for the pixels drawn
+    index = block.mask[np.ix_(px // stridex, py // stridey)]
+    inks = block.maskPalette if inks is None else inks
+    pixels[np.ix_(y0 + py, x0 + px)] = inks[index.T]
+
+###############################################################################
+ 
 ###############################################################################
 class hitomezashi(object):
     """
@@ -40,6 +189,9 @@ class hitomezashi(object):
     def __init__(self,
                  hName,
                  logic='rand',
+                 backend='pil',
+                 tiled=False,
+                 canvasMode='RGB',
                  **kwargs):
         """
         
@@ -57,6 +209,30 @@ class hitomezashi(object):
                 set of random numbers
             alternate: Alternate starting 'on' and 'off' line by line
             The default is 'rand'.
+        backend : string, optional
+            How stitches are put on the canvas. This can be pil or numpy.
+            pil: Draw each stitch onto a PIL image with ImageDraw
+            numpy: Write stitches straight into a pixel array, which is
+                only turned into an image when saved.
+                Labels, messages and block outlines still need ImageDraw, so
+                are only available with pil
+            The default is 'pil'.
+        tiled : bool, optional
+            Never allocate a canvas for the whole pattern. Drawing methods
+            only record what is to be drawn, and the pattern is rendered a
+            region at a time with renderRegion, e.g. by tiles.saveTiles, so
+            memory use is bounded by the region size. The default is False.
+            Render timings and counters can be collected with enableStats
+        canvasMode : string, optional
+            How pixels are held on the canvas. This can be RGB, P or 1.
+            RGB: Three bytes per pixel
+            P: One byte per pixel, indexing a palette of the colours used,
+                at most 256. Pixels are the same as RGB
+            1: Bilevel, each colour drawn as black or white by its
+                brightness, as PIL's convert('1') without dithering. Meant
+                for line drawings
+            P and 1 images are only expanded to RGB where a format needs it,
+            e.g. jpg. The default is 'RGB'.
         **kwargs : keyword arguments
             Set of optional arguments for lower level functions to be called
             via the hitomezashi object instance
@@ -68,9 +244,24 @@ class hitomezashi(object):
         """
 
         
+        if backend not in ('pil', 'numpy'):
+            raise ValueError(f'Unknown backend {backend}')
+        if canvasMode not in ('RGB', 'P', '1'):
+            raise ValueError(f'Unknown canvas mode {canvasMode}')
+
         # Attach attributes
         self.hName = hName
         self.logic = logic
+        self.backend = backend
+        self.tiled = tiled
+        self.canvasMode = canvasMode
+
+        # Colours drawn so far, indexed by palette canvases
+        self.palette = []
+        self.canvas = None
+
+        # Render stats are only collected once enableStats is called
+        self.stats = None
         
         # Set up default drawing offsets
         self.setOffsets()
@@ -130,6 +321,7 @@ class hitomezashi(object):
                 
     def addBlock(self,
                  bName,
+                 canvas=True,
                  **kwargs):
         """
         Populates the blocks dictionary with the passed stitch_block, or creates
@@ -139,6 +331,10 @@ class hitomezashi(object):
         ----------
         bName : string or hitomezashi.stitch_block object
             Name of the hitomezashi.stitch_block object to be created.
+        canvas : bool, optional
+            Create a new canvas for the blocks. False only sizes the cloth,
+            leaving the canvas to be created when it is needed, see
+            _renderMode_. The default is True.
         **kwargs : keyword arguments
             Keyword arguments to instantiate the stitch_block object. Any
             optional arguments left out will be defaulted
@@ -152,7 +348,7 @@ class hitomezashi(object):
         # If bName is a stitch block then simply update dictionary of blocks.
         # Otherwise, create a stitch block
         if isinstance(bName, stitch_block):
-            self.blocks[bName.name] = bName
+            self.blocks[bName.bName] = bName
         else:
             # Defaults
             defaultDict = {
@@ -167,35 +363,44 @@ class hitomezashi(object):
                 'leftStarts':None,
                 'rightStarts':None,
                 'baseStarts':None,
+                'firstStates': None,
+                'seed': None,
                 }
             # Scan through kwargs and populate any missing arguments
             for key, value in defaultDict.items():
                 if key not in kwargs.keys():
                     kwargs[key] = value
             
-            print(f'kwargs is {kwargs}')
+            # Debug
+            # print(f'kwargs is {kwargs}')
             
-            # Instantiate a stitch_block object
-            self.blocks[bName] = stitch_block(bName,
-                                            size = kwargs['size'],
-                                            start = kwargs['start'],
-                                            grid = kwargs['grid'],
-                                            linergb = kwargs['linergb'],
-                                            skip = kwargs['skip'],
-                                            shape = kwargs['shape'],
-                                            slope = kwargs['slope'],
-                                            lineWidth = kwargs['lineWidth'],
-                                            colStarts = kwargs['colStarts'],
-                                            rowStarts = kwargs['rowStarts'],
-                                            logic = kwargs['logic'],
-                                            thresh = kwargs['thresh'],
-                                            leftStarts=kwargs['leftStarts'],
-                                            rightStarts=kwargs['rightStarts'],
-                                            baseStarts=kwargs['baseStarts'],
-                                            )
+            # Instantiate a stitch_block object, which generates its start states
+            with self._phase_('starts'):
+                self.blocks[bName] = stitch_block(bName,
+                                                size = kwargs['size'],
+                                                start = kwargs['start'],
+                                                grid = kwargs['grid'],
+                                                linergb = kwargs['linergb'],
+                                                skip = kwargs['skip'],
+                                                shape = kwargs['shape'],
+                                                slope = kwargs['slope'],
+                                                lineWidth = kwargs['lineWidth'],
+                                                colStarts = kwargs['colStarts'],
+                                                rowStarts = kwargs['rowStarts'],
+                                                logic = kwargs['logic'],
+                                                thresh = kwargs['thresh'],
+                                                leftStarts=kwargs['leftStarts'],
+                                                rightStarts=kwargs['rightStarts'],
+                                                baseStarts=kwargs['baseStarts'],
+                                                firstStates=kwargs['firstStates'],
+                                                seed=kwargs['seed'],
+                                                )
             # create a new drawing canvas based on the new selection of
             # stitch_blocks
-            self._createCanvas_()
+            if canvas:
+                self._createCanvas_()
+            else:
+                self._getDimensions_()
         
     def _getDimensions_(self):
         """
@@ -218,7 +423,66 @@ class hitomezashi(object):
         # attach dimensions to self
         self.detWidth = max(xends)
         self.detHeight = max(yends)
+        
+        # Offset the detector dimensions to give the canvas dimensions
+        self.drawWidth = self.detWidth + self.wOffset
+        self.drawHeight = self.detHeight + self.hOffset
     
+    def enableStats(self, stats=None, hook=None):
+        """
+        Starts collecting timings per phase and counters of what is drawn and
+        saved, see instrument.renderStats
+
+        Parameters
+        ----------
+        stats : instrument.renderStats, optional
+            Stats object to record into, e.g. one shared between cloths. The
+            default is None, which creates a new one.
+        hook : callable, optional
+            Called as hook(name, seconds, stats) as each phase finishes, for
+            a new stats object. The default is None.
+
+        Returns
+        -------
+        instrument.renderStats
+            The stats being recorded.
+
+        """
+        self.stats = renderStats(hook) if stats is None else stats
+        return self.stats
+
+    def disableStats(self):
+        """
+        Stops collecting stats
+
+        Returns
+        -------
+        instrument.renderStats or None
+            The stats recorded so far.
+
+        """
+        stats, self.stats = self.stats, None
+        return stats
+
+    def _phase_(self, name):
+        """
+        Internal method to time a block of code as a phase, if stats are
+        enabled
+
+        Parameters
+        ----------
+        name : string
+            The phase.
+
+        Returns
+        -------
+        context manager
+            Times the phase, or does nothing while stats are disabled.
+
+        """
+        return NOPHASE if self.stats is None else self.stats.phase(name)
+
+    @timedPhase('canvas')
     def _createCanvas_(self):
         """
         Internal method to generate a canvas on which to draw the detector,
@@ -230,19 +494,295 @@ class hitomezashi(object):
  
         """
         
-        # Detect the dimensions of the stitch_blocks
+        # Detect the dimensions of the stitch_blocks and create a canvas
         self._getDimensions_()
-        
-        # Offset the detector dimenions and create a canvas
-        self.drawWidth = self.detWidth + self.wOffset
-        self.drawHeight = self.detHeight + self.hOffset
-        self.font = ImageFont.truetype("arial.ttf", 30)
+        try:
+            self.font = ImageFont.truetype("arial.ttf", 30)
+        except OSError:
+            # Arial is not available everywhere, e.g. on headless servers
+            self.font = ImageFont.load_default()
         self.fontColour = (0, 0, 0)
         self.background = (255, 255, 255)
         
+        width = int(np.ceil(self.drawWidth))
+        height = int(np.ceil(self.drawHeight))
+        if self.stats is not None:
+            self.stats.canvas = (width, height)
+            if not self.tiled:
+                self.stats.count('canvasBytes', width*height*(3 if self.canvasMode == 'RGB' else 1))
+
+        # Give every colour known so far its palette entry up front, so that
+        # copies of the cloth in worker processes index the same palette
+        for colour in [self.background, self.fontColour] + \
+                [block.linergb for block in self.blocks.values()] + \
+                [rgb for block in self.blocks.values() for rgb in block.maskPalette.tolist()]:
+            self._ink_(colour)
+
         # draw the canvas
-        self.canvas = Image.new('RGB', (int(np.ceil(self.drawWidth)), int(np.ceil(self.drawHeight))), self.background)
-        self.draw = ImageDraw.Draw(self.canvas)
+        if self.tiled:
+            # Regions of the canvas are rendered on demand instead
+            self.pixels = None
+            self.canvas = None
+            self.draw = None
+        elif self.backend == 'numpy':
+            # Pixel array, only wrapped into an image by getImage
+            self.pixels = self._blank_(height, width)
+            self.canvas = None
+            self.draw = None
+        else:
+            self.canvas = self._newImage_(width, height)
+            self.draw = ImageDraw.Draw(self.canvas)
+
+    def _ink_(self, colour):
+        """
+        Internal method giving the pixel value which draws an RGB colour on
+        this cloth's canvas. Palette canvases add new colours to the palette
+
+        Parameters
+        ----------
+        colour : tuple
+            RGB colour.
+
+        Returns
+        -------
+        tuple or int
+            The colour itself on RGB canvases, its palette index on P
+            canvases, or 0 (black) or 255 (white) on 1 canvases.
+
+        """
+        colour = tuple(int(value) for value in colour[:3])
+        if self.canvasMode == 'RGB':
+            return colour
+        if self.canvasMode == '1':
+            # Brightness as PIL's convert('L'), then thresholded at half
+            return 255 if (299*colour[0] + 587*colour[1] + 114*colour[2])//1000 >= 128 else 0
+
+        if colour not in self.palette:
+            if len(self.palette) == 256:
+                raise ValueError('P canvases hold at most 256 colours')
+            self.palette.append(colour)
+            if self.canvas is not None:
+                self.canvas.putpalette([value for rgb in self.palette for value in rgb])
+        return self.palette.index(colour)
+
+    def _maskInks_(self, block):
+        """
+        Internal method giving the pixel value of each entry of a block's
+        maskPalette, for paintMask
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block.
+
+        Returns
+        -------
+        numpy array
+            (N, 3) RGB colours, or (N,) palette indices or bilevel values.
+
+        """
+        if self.canvasMode == 'RGB':
+            return block.maskPalette
+        return np.asarray([self._ink_(rgb) for rgb in block.maskPalette.tolist()], dtype=np.uint8)
+
+    def _blank_(self, height, width):
+        """
+        Internal method creating an array of pixels in the canvas mode,
+        filled with the background
+
+        Parameters
+        ----------
+        height : int
+            Height in pixels.
+        width : int
+            Width in pixels.
+
+        Returns
+        -------
+        numpy array
+            (height, width, 3) uint8 for RGB, (height, width) uint8 palette
+            indices for P or (height, width) bool for 1.
+
+        """
+        if self.canvasMode == 'RGB':
+            pixels = np.empty((height, width, 3), dtype=np.uint8)
+        elif self.canvasMode == 'P':
+            pixels = np.empty((height, width), dtype=np.uint8)
+        else:
+            pixels = np.empty((height, width), dtype=bool)
+        pixels[...] = self._ink_(self.background)
+        return pixels
+
+    def _newImage_(self, width, height):
+        """
+        Internal method creating an image in the canvas mode, filled with the
+        background
+
+        Parameters
+        ----------
+        width : int
+            Width in pixels.
+        height : int
+            Height in pixels.
+
+        Returns
+        -------
+        PIL.Image.Image
+            The image, with the cloth's palette for P.
+
+        """
+        image = Image.new(self.canvasMode, (width, height), self._ink_(self.background))
+        if self.canvasMode == 'P':
+            image.putpalette([value for rgb in self.palette for value in rgb])
+        return image
+
+    def _asImage_(self, pixels):
+        """
+        Internal method wrapping an array of pixels in the canvas mode as an
+        image. P images share the array's memory
+
+        Parameters
+        ----------
+        pixels : numpy array
+            Pixels, as from _blank_.
+
+        Returns
+        -------
+        PIL.Image.Image
+            Image in the canvas mode, with the cloth's palette for P.
+
+        """
+        if self.canvasMode != 'P':
+            return Image.fromarray(pixels)
+        pixels = np.ascontiguousarray(pixels)
+        image = Image.frombuffer('P', (pixels.shape[1], pixels.shape[0]), pixels, 'raw', 'P', 0, 1)
+        image.putpalette([value for rgb in self.palette for value in rgb])
+        return image
+
+    def _asRGB_(self, pixels):
+        """
+        Internal method expanding an array of pixels in the canvas mode to
+        RGB, e.g. for animation frames
+
+        Parameters
+        ----------
+        pixels : numpy array
+            Pixels, as from _blank_.
+
+        Returns
+        -------
+        numpy array
+            (height, width, 3) uint8 RGB pixels.
+
+        """
+        if self.canvasMode == 'RGB':
+            return pixels
+        if self.canvasMode == 'P':
+            return np.asarray(self.palette, dtype=np.uint8).reshape(-1, 3)[pixels]
+        return np.repeat((pixels*255).astype(np.uint8)[..., None], 3, axis=2)
+
+    def getImage(self):
+        """
+        Returns the canvas as a PIL image, whichever backend it is drawn with
+
+        Returns
+        -------
+        PIL.Image.Image
+            The current drawing.
+
+        """
+        if self.tiled:
+            return self.renderRegion(0, 0, int(np.ceil(self.drawWidth)), int(np.ceil(self.drawHeight)))
+        if self.backend == 'numpy':
+            return self._asImage_(self.pixels)
+        return self.canvas
+
+    @timedPhase('render')
+    def renderRegion(self, x0, y0, x1, y1, keys=None):
+        """
+        Renders one rectangle of the canvas straight from the blocks' start
+        states and masks, without using the rest of the canvas. Gives the same
+        pixels as that part of a full canvas
+
+        Parameters
+        ----------
+        x0 : int
+            Left edge of the region.
+        y0 : int
+            Top edge of the region.
+        x1 : int
+            Right edge of the region, exclusive.
+        y1 : int
+            Bottom edge of the region, exclusive.
+        keys : list, optional
+            Names of the blocks to render, e.g. to render one block of a
+            mosaic on its own. The default is None, for all of them.
+
+        Returns
+        -------
+        PIL.Image.Image
+            The rendered region.
+
+        """
+        bounds = (x0, y0, x1, y1)
+        blocks = self.blocks if keys is None else {key: self.blocks[key] for key in keys}
+        segments = {key: self.stitchSegments(block, bounds) for key, block in blocks.items()}
+
+        if self.backend == 'numpy':
+            pixels = self._blank_(y1 - y0, x1 - x0)
+            for key, block in blocks.items():
+                if block.regions is not None:
+                    paintMask(pixels, block, origin=(x0, y0), inks=self._maskInks_(block))
+                for segs in segments[key]:
+                    rasterSegments(pixels, segs, self._ink_(block.linergb), origin=(x0, y0))
+            return self._asImage_(pixels)
+
+        # ImageDraw truncates coordinates towards zero, so pad the region by
+        # the longest stitch. Every stitch reaching into it then starts and
+        # ends on the padded image, and is drawn just as on the full canvas
+        extent = max([np.abs(segs[:, 2:] - segs[:, :2]).max()
+                      for value in segments.values() for segs in value if len(segs)], default=0)
+        pad = int(np.ceil(extent)) + 1
+        px0 = max(0, x0 - pad)
+        py0 = max(0, y0 - pad)
+        px1 = max(x1, min(int(np.ceil(self.drawWidth)), x1 + pad))
+        py1 = max(y1, min(int(np.ceil(self.drawHeight)), y1 + pad))
+
+        pixels = self._blank_(py1 - py0, px1 - px0)
+        for key, block in blocks.items():
+            if block.regions is not None:
+                paintMask(pixels, block, origin=(px0, py0), inks=self._maskInks_(block))
+
+        # Line colours go into the palette before the image takes a copy
+        inks = {key: self._ink_(block.linergb) for key, block in blocks.items()}
+        image = self._asImage_(pixels)
+        draw = ImageDraw.Draw(image)
+        for key, block in blocks.items():
+            for segs in segments[key]:
+                for seg in (segs - [px0, py0, px0, py0]).tolist():
+                    draw.line(seg, fill=inks[key], width=1)
+
+        return image.crop((x0 - px0, y0 - py0, x1 - px0, y1 - py0))
+
+    def __getstate__(self):
+        """
+        Leaves the canvas out when pickling, e.g. to send a cloth to worker
+        processes. The copy is marked as tiled, so it renders regions straight
+        from its blocks rather than from a canvas
+
+        Returns
+        -------
+        dict
+            Attributes to be pickled.
+
+        """
+        state = self.__dict__.copy()
+        for key in ('canvas', 'draw', 'pixels'):
+            state[key] = None
+        state['tiled'] = True
+        # Stats hooks need not pickle, and workers record their own
+        state['stats'] = None
+        return state
             
     def addMode(self,
                 mName,
@@ -300,6 +840,9 @@ class hitomezashi(object):
  
         """
         
+        # Read the colour of every grid section out of the mask in one go
+        fills = block.maskColours()
+        
         # Loop over the number of columns
         for col in range(block.grid[0]):
             # get x coordinate of top left point
@@ -311,8 +854,8 @@ class hitomezashi(object):
                 y = block.start[1] + row*(1+block.skip[1])*block.size[1]+2*block.lineWidth
                 # draw the rectangle
                 self.draw.rectangle([(x, y), (x+block.size[0]-2*block.lineWidth, y+block.size[1]-2*block.lineWidth)],
-                                    fill = block.mask[col][row],
-                                    outline = block.linergb)
+                                    fill = self._ink_(fills[col][row]),
+                                    outline = self._ink_(block.linergb))
                     
     def drawTrapezoid(self, block):
         """
@@ -335,6 +878,9 @@ class hitomezashi(object):
         # Unpack gradients of left and right edges
         lgrad, rgrad = block.slope
         
+        # Read the colour of every grid section out of the mask in one go
+        fills = block.maskColours()
+        
         # Sweep through all columns
         for col in range(block.grid[0]):
             # Generate leftmost coordinate of pixel
@@ -359,105 +905,535 @@ class hitomezashi(object):
                 
                 # Draw the resultant trapezoid
                 self.draw.polygon([(v1x, v1y), (v2x, v2y), (v3x, v3y), (v4x, v4y)],
-                                  fill = block.mask[col][row],
-                                  outline = block.linergb)
+                                  fill = self._ink_(fills[col][row]),
+                                  outline = self._ink_(block.linergb))
     
-    def drawStitches(self, block):
-        
-        # The pattern defines the starting state of the line of stitches. 1 is
-        # on and 0 is off
-        
-        # Loop through each pixel of the block and draw the lines in the given
-        # axis
-        
-        # Lines are drawn for one stitch width, alternating on and off
-        
-        # We will pass either set patterns of start states, or randomisations
-        # with different probabilities of starting on or off
+    def stitchParity(self, block, colRange=None, rowRange=None):
+        """
+        Computes the on/off state of every stitch in the block in one pass.
+        Each line of stitches alternates on and off from its start state, so
+        the state of stitch n on line i is (starts[i] + n) % 2. Masks are
+        built from the packed start states 64 stitches at a time, see bits.py
 
-        
-        # Sweep through all columns, avoiding drawing on the canvas edge
-        for col in range(block.grid[0] - 1):
-            # Generate leftmost coordinate of pixel
-            x = block.start[0] + (col+1)*(1+block.skip[0])*block.size[0]+block.lineWidth     
-            # Sweep through all rows, avoiding drawing on the canvas edge
-            for row in range(block.grid[1]-1):
-                y = block.start[1] + (row+1)*(1+block.skip[1])*block.size[1]+block.lineWidth
-                
-                # define the start and end positions of the line and then draw it
-                startLoc = (x, y)
-                endLoc = (x, y + block.size[1])
-                startCond = block.colStarts[col] + row
-                
-                self.drawLine(block, startCond, startLoc, endLoc)
-        
-        # Sweep through all rows, avoiding drawing on the canvas edge
-        for row in range(block.grid[1] - 1):
-            # Generate leftmost coordinate of pixel
-            y = block.start[1] + (row+1)*(1+block.skip[1])*block.size[1]+block.lineWidth           
-            # Sweep through all columns, avoiding drawing on the canvas edge
-            for col in range(block.grid[0]-1):
-                x = block.start[0] + (col+1)*(1+block.skip[0])*block.size[0]+block.lineWidth
-                
-                # define the start and end positions of the line and then draw it
-                startLoc = (x, y)
-                endLoc = (x + block.size[0], y)
-                startCond = block.rowStarts[row] + col
-                
-                self.drawLine(block, startCond, startLoc, endLoc)
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block of stitches, i.e. the grid, to be evaluated
+        colRange : tuple, optional
+            (first, last + 1) column lines to evaluate. The default is None,
+            for all of them.
+        rowRange : tuple, optional
+            (first, last + 1) row lines to evaluate. The default is None, for
+            all of them.
+
+        Returns
+        -------
+        vertical : numpy array of bool
+            (grid[0]-1, grid[1]-1) array indexed [col, row]. True where the
+            stitch on column line col, below row line row, is 'on'. Indices
+            count from the start of the ranges, if given
+        horizontal : numpy array of bool
+            (grid[1]-1, grid[0]-1) array indexed [row, col]. True where the
+            stitch on row line row, right of column line col, is 'on'
 
-        
-    def drawBlock(self, block):
         """
-        Draws the stitch array of the passed block, detecting the shape.
- 
+        # Lines on the canvas edge are never drawn
+        c0, c1 = (0, block.grid[0] - 1) if colRange is None else colRange
+        r0, r1 = (0, block.grid[1] - 1) if rowRange is None else rowRange
+
+        # Alternating words along each line, inverted where it starts 'on'
+        vertical = unpackMasks(block.colStarts.lineMasks(c0, c1, r0, r1 - r0), r1 - r0)
+        horizontal = unpackMasks(block.rowStarts.lineMasks(r0, r1, c0, c1 - c0), c1 - c0)
+
+        return vertical, horizontal
+
+    @timedPhase('segments')
+    def stitchSegments(self, block, bounds=None):
+        """
+        Generates the coordinates of all 'on' stitches in the block
+
         Parameters
         ----------
-        block : hitomezashi.stitch_block object or list thereof
-            One of the blocks associated with the detector, to be drawn.
- 
+        block : hitomezashi.stitch_block object
+            The block of stitches, i.e. the grid, to have lines drawn
+        bounds : tuple, optional
+            (x0, y0, x1, y1) region of the canvas. If given, only the lines
+            passing near it are evaluated, and the stitches returned include
+            at least all of those touching it. The default is None.
+
         Returns
         -------
-        None.
- 
+        segments : list of numpy arrays
+            One (N, 4) array per stitch direction, each row holding the
+            (x0, y0, x1, y1) coordinates of a line to be drawn
+
         """
-        # If the argument is a stitch_block then call the relevant draw method
-        if isinstance(block, stitch_block):
-            if block.shape.lower() == 'trapezoid':
-                self.drawTrapezoid(block)
-            else:
-                self.drawRect(block)
-       # If the argument is a list then recursively call drawBlock on the items         
-        elif isinstance(block, list) or isinstance(block, tuple):
-            for i, entry in enumerate(block):
-                self.drawBlock(block[i])
-    
-    def drawPattern(self):
+        stridex = (1+block.skip[0])*block.size[0]
+        stridey = (1+block.skip[1])*block.size[1]
+        cols = block.grid[0] - 1
+        rows = block.grid[1] - 1
+
+        if bounds is None:
+            colRange = (0, cols)
+            rowRange = (0, rows)
+        else:
+            # Lines whose stitches could reach into the region, with a line
+            # to spare either side
+            x0, y0, x1, y1 = bounds
+            left = block.start[0] + block.lineWidth
+            top = block.start[1] + block.lineWidth
+            c0 = min(cols, max(0, int((x0 - left - block.size[0]) // stridex) - 1))
+            r0 = min(rows, max(0, int((y0 - top - block.size[1]) // stridey) - 1))
+            colRange = (c0, max(c0, min(cols, int((x1 - left) // stridex) + 1)))
+            rowRange = (r0, max(r0, min(rows, int((y1 - top) // stridey) + 1)))
+
+        # Pixel coordinates of each column and row line, avoiding the canvas
+        # edge
+        xs = block.start[0] + np.arange(colRange[0]+1, colRange[1]+1)*stridex + block.lineWidth
+        ys = block.start[1] + np.arange(rowRange[0]+1, rowRange[1]+1)*stridey + block.lineWidth
+
+        # Only the 'on' stitches are listed, straight from the start states.
+        # Vertical lines run downwards from (x, y)
+        col, row = block.colStarts.onStitches(*colRange, rowRange[0], rowRange[1] - rowRange[0])
+        vSegs = np.stack([xs[col], ys[row], xs[col], ys[row] + block.size[1]], axis=1)
+
+        # Horizontal lines run rightwards from (x, y)
+        row, col = block.rowStarts.onStitches(*rowRange, colRange[0], colRange[1] - colRange[0])
+        hSegs = np.stack([xs[col], ys[row], xs[col] + block.size[0], ys[row]], axis=1)
+
+        return [vSegs, hSegs]
+
+    @timedPhase('draw')
+    def drawSegments(self, block, segments):
         """
-        Draws all stitch blocks in the pattern
- 
+        Draws a batch of stitches, as produced by stitchSegments, onto the
+        canvas
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block to which the stitches belong
+        segments : list of numpy arrays
+            (N, 4) arrays of (x0, y0, x1, y1) line coordinates
+
         Returns
         -------
         None.
- 
+
         """
-        # Loop through all blocks and draw them
-        for key, value in self.blocks.items():
-            self.drawBlock(self.blocks[key])
-    
-    def drawLabels(self):
+        # Tiled cloths have no canvas, stitches are drawn tile by tile
+        if self.tiled:
+            return
+
+        if self.stats is not None:
+            self.stats.count('segmentsDrawn', sum(len(segs) for segs in segments))
+
+        ink = self._ink_(block.linergb)
+        for segs in segments:
+            if self.backend == 'numpy':
+                rasterSegments(self.pixels, segs, ink)
+            else:
+                # Convert to python numbers once, rather than per line
+                for seg in segs.tolist():
+                    self.draw.line(seg, fill=ink, width=1)
+
+    def drawStitches(self, block):
         """
-        Adds labels for each structure on the right hand side of the canvas in 
-        the offset space
- 
+        Draws all stitches of the passed block
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block in which to draw stitches
+
         Returns
         -------
         None.
- 
+
         """
-        # If two blocks start at the same height we want to offset the y coord 
-        # of one of them.
-        lastLabel = None
+        # The pattern defines the starting state of the line of stitches. 1 is
+        # on and 0 is off
+
+        # Lines are drawn for one stitch width, alternating on and off. The
+        # states of every line are worked out at once, and only the 'on'
+        # stitches are passed to the canvas
+
+        # Tiled cloths work out the stitches for each tile as it is rendered
+        if self.tiled:
+            return
+
+        segments = self.stitchSegments(block)
+        if self.stats is not None:
+            self.stats.count('segmentsSkipped',
+                             self.stitchCount(block) - sum(len(segs) for segs in segments))
+        self.drawSegments(block, segments)
+
+    def stitchCount(self, block):
+        """
+        Number of stitch positions in the block, whether on or off
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block of stitches
+
+        Returns
+        -------
+        int
+            Stitches along every column line plus every row line.
+
+        """
+        return 2*(block.grid[0] - 1)*(block.grid[1] - 1)
+
+    def labelRegions(self, block):
+        """
+        Splits the grid cells of the block into the regions enclosed by its
+        stitches, and two-colours them so that neighbouring regions differ.
+        Regions are found with an array based union-find over all cells, so
+        there is no recursion however large or winding a region is
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block of stitches, i.e. the grid, to be split up
+
+        Returns
+        -------
+        labels : numpy array of int
+            (grid[0], grid[1]) array indexed [col, row], like the block's
+            mask, numbering the region each cell belongs to from 0
+        colours : numpy array of int
+            (grid[0], grid[1]) array of 0s and 1s, the same for every cell of
+            a region
+
+        """
+        # Regions are only found on square grids
+        if block.shape != 'rectangle':
+            raise ValueError(f'Only square blocks can be filled, not the {block.shape} block {block.bName}')
+
+        vertical, horizontal = self.stitchParity(block)
+        cols, rows = block.grid
+
+        # Walls between cells (col, row) and (col+1, row). Column lines only
+        # run below the first row line
+        vWall = np.zeros((cols-1, rows), dtype=bool)
+        vWall[:, 1:] = vertical
+
+        # Walls between cells (col, row) and (col, row+1). Row lines only run
+        # right of the first column line
+        hWall = np.zeros((cols, rows-1), dtype=bool)
+        hWall[1:, :] = horizontal.T
+
+        # The first column and row lines frame the pattern. Treat them as
+        # solid, so the cells outside of them make one region of their own,
+        # and every stitch end inside the frame meets another stitch. This is
+        # what makes the regions inside two-colourable
+        vWall[0, 1:] = True
+        hWall[1:, 0] = True
+
+        # Pairs of neighbouring cells with no wall between them
+        index = np.arange(cols*rows).reshape(cols, rows)
+        u = np.concatenate([index[:-1, :][~vWall], index[:, :-1][~hWall]])
+        v = np.concatenate([index[1:, :][~vWall], index[:, 1:][~hWall]])
+
+        # Union-find: hook the higher root of each joined pair onto the lower
+        # one, then shorten every path to point straight at its root. Repeat
+        # until all joined cells share a root
+        parent = np.arange(cols*rows)
+        while len(u) > 0:
+            pu = parent[u]
+            pv = parent[v]
+            join = pu != pv
+            u, v, pu, pv = u[join], v[join], pu[join], pv[join]
+            np.minimum.at(parent, np.maximum(pu, pv), np.minimum(pu, pv))
+
+            grand = parent[parent]
+            while np.any(grand != parent):
+                parent = grand
+                grand = parent[parent]
+
+        # Number the regions 0, 1, 2 ... in order of their first cell
+        labels = np.unique(parent, return_inverse=True)[1].reshape(cols, rows)
+
+        # Crossing a wall flips the colour. Count the walls crossed on the
+        # way from the top right cell, down the right hand column then
+        # leftwards along the row. Inside the frame this gives the same
+        # colour to every cell of a region
+        down = np.concatenate([[0], np.cumsum(hWall[-1, :])])
+        colours = np.zeros((cols, rows), dtype=int)
+        colours[:-1, :] = np.cumsum(vWall[::-1, :], axis=0)[::-1, :]
+        colours = (colours + down) % 2
+
+        # Cells outside the frame take the first colour
+        colours[0, :] = 0
+        colours[:, 0] = 0
+
+        return labels, colours
+
+    @timedPhase('fill')
+    def fillRegions(self, block, palette=((255, 255, 255), (200, 200, 255))):
+        """
+        Colours in the regions enclosed by the stitches of the block, two
+        colours alternating across every line of stitches. The colours are
+        stored in the block's mask and painted with drawMask
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block to be filled
+        palette : tuple, optional
+            The two RGB colours to fill with. The default is
+            ((255, 255, 255), (200, 200, 255)).
+
+        Returns
+        -------
+        None.
+
+        """
+        labels, colours = self.labelRegions(block)
+
+        block.regions = labels
+        block.maskPalette = np.asarray(palette, dtype=np.uint8)
+        block.mask[...] = colours
+
+        self.drawMask(block)
+
+    def drawMask(self, block):
+        """
+        Fills every grid cell of the block with its colour from the block's
+        mask, all in one go. Unlike drawRect no outline is drawn, so stitches
+        drawn afterwards sit on top of the fill
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            One of the blocks associated with the detector, to be drawn.
+
+        Returns
+        -------
+        None.
+
+        """
+        # Tiled cloths have no canvas, the mask is painted tile by tile
+        if self.tiled:
+            return
+
+        if self.backend == 'numpy':
+            paintMask(self.pixels, block, inks=self._maskInks_(block))
+        else:
+            # Edit the block's patch of the canvas as an array, then paste it
+            # back
+            x0, y0 = int(block.start[0]), int(block.start[1])
+            box = (x0, y0,
+                   x0 + block.grid[0]*(1+block.skip[0])*int(block.size[0]),
+                   y0 + block.grid[1]*(1+block.skip[1])*int(block.size[1]))
+            area = np.array(self.canvas.crop(box))
+            paintMask(area, block, origin=box[:2], inks=self._maskInks_(block))
+            self.canvas.paste(self._asImage_(area), box[:2])
+
+    def redrawRegion(self, x0, y0, x1, y1):
+        """
+        Re-renders one rectangle of the canvas from the blocks, e.g. after a
+        start state has been changed
+
+        Parameters
+        ----------
+        x0 : float
+            Left edge of the region.
+        y0 : float
+            Top edge of the region.
+        x1 : float
+            Right edge of the region, exclusive.
+        y1 : float
+            Bottom edge of the region, exclusive.
+
+        Returns
+        -------
+        None.
+
+        """
+        # Tiled cloths are always rendered from the blocks anyway
+        if self.tiled:
+            return
+
+        # Whole pixels, within the canvas
+        x0 = max(0, int(np.floor(x0)))
+        y0 = max(0, int(np.floor(y0)))
+        x1 = min(int(np.ceil(self.drawWidth)), int(np.ceil(x1)))
+        y1 = min(int(np.ceil(self.drawHeight)), int(np.ceil(y1)))
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        image = self.renderRegion(x0, y0, x1, y1)
+        if self.backend == 'numpy':
+            self.pixels[y0:y1, x0:x1] = np.asarray(image)
+        else:
+            self.canvas.paste(image, (x0, y0))
+
+    def _refreshRegions_(self, block):
+        """
+        Internal method to recolour the regions of a filled block after its
+        stitches have changed. Only the cells whose colour changed are
+        repainted
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block that was edited
+
+        Returns
+        -------
+        None.
+
+        """
+        if block.regions is None:
+            return
+
+        before = block.mask.copy()
+        block.regions, colours = self.labelRegions(block)
+        block.mask[...] = colours
+
+        cols, rows = np.nonzero(block.mask != before)
+        if len(cols) == 0:
+            return
+
+        stridex = (1+block.skip[0])*block.size[0]
+        stridey = (1+block.skip[1])*block.size[1]
+        self.redrawRegion(block.start[0] + cols.min()*stridex,
+                          block.start[1] + rows.min()*stridey,
+                          block.start[0] + (cols.max()+1)*stridex + block.lineWidth + 1,
+                          block.start[1] + (rows.max()+1)*stridey + block.lineWidth + 1)
+
+    def toggleRowStart(self, block, row):
+        """
+        Flips the start state of one row line and repaints just the canvas
+        that changes: the row of pixels the line runs along, plus any regions
+        whose colour changed if the block is filled
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block to be edited
+        row : int
+            The row line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.rowStarts[row] = 1 - block.rowStarts[row] % 2
+        self._refreshRegions_(block)
+
+        y = block.start[1] + (row+1)*(1+block.skip[1])*block.size[1] + block.lineWidth
+        self.redrawRegion(block.start[0], y,
+                          block.start[0] + block.grid[0]*(1+block.skip[0])*block.size[0] + block.lineWidth + 1,
+                          y + 1)
+
+    def toggleColStart(self, block, col):
+        """
+        Flips the start state of one column line and repaints just the canvas
+        that changes: the column of pixels the line runs along, plus any
+        regions whose colour changed if the block is filled
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block to be edited
+        col : int
+            The column line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.colStarts[col] = 1 - block.colStarts[col] % 2
+        self._refreshRegions_(block)
+
+        x = block.start[0] + (col+1)*(1+block.skip[0])*block.size[0] + block.lineWidth
+        self.redrawRegion(x, block.start[1],
+                          x + 1,
+                          block.start[1] + block.grid[1]*(1+block.skip[1])*block.size[1] + block.lineWidth + 1)
+
+    def _redrawStitches_(self, block, row, col, grad):
+        """
+        Internal method repainting the small patch of canvas around each
+        sloping stitch leaving the passed lattice points, for geometries
+        which have a latticePoints method
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to which the points belong
+        row : numpy array of int
+            Layer of each point
+        col : numpy array of int
+            Position of each point along its layer
+        grad : float
+            Gradient of the stitches, negative for left hand stitches
+
+        Returns
+        -------
+        None.
+
+        """
+        x, y = self.latticePoints(block, row, col)
+        xEnd = x + block.size[0]*grad
+        for x0, y0, x1 in zip(np.minimum(x, xEnd).tolist(), y.tolist(), np.maximum(x, xEnd).tolist()):
+            self.redrawRegion(x0 - 1, y0 - 1, x1 + 2, y0 + block.size[1] + 2)
+
+    def drawBlock(self, block):
+        """
+        Draws the stitch array of the passed block, detecting the shape.
+ 
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object or list thereof
+            One of the blocks associated with the detector, to be drawn.
+ 
+        Returns
+        -------
+        None.
+ 
+        """
+        # If the argument is a stitch_block then call the relevant draw method
+        if isinstance(block, stitch_block):
+            if block.shape.lower() == 'trapezoid':
+                self.drawTrapezoid(block)
+            else:
+                self.drawRect(block)
+       # If the argument is a list then recursively call drawBlock on the items         
+        elif isinstance(block, list) or isinstance(block, tuple):
+            for i, entry in enumerate(block):
+                self.drawBlock(block[i])
+    
+    def drawPattern(self):
+        """
+        Draws all stitch blocks in the pattern
+ 
+        Returns
+        -------
+        None.
+ 
+        """
+        # Loop through all blocks and draw them
+        for key, value in self.blocks.items():
+            self.drawBlock(self.blocks[key])
+    
+    def drawLabels(self):
+        """
+        Adds labels for each structure on the right hand side of the canvas in 
+        the offset space
+ 
+        Returns
+        -------
+        None.
+ 
+        """
+        # If two blocks start at the same height we want to offset the y coord 
+        # of one of them.
+        lastLabel = None
         for key, value in self.blocks.items():
             if value.start[1] == lastLabel and lastLabel is not None:
                 lheight = value.start[1] + value.grid[1]*value.size[1]/2
@@ -471,7 +1447,7 @@ class hitomezashi(object):
             self.draw.text((self.detWidth + self.lwOffset,
                             lheight + self.lhOffset),
                            value.bName,
-                           value.linergb,
+                           self._ink_(value.linergb),
                            font=self.font)
             
     def drawMessage(self,
@@ -492,14 +1468,233 @@ class hitomezashi(object):
         # Draw a background colour rectangle to cover up the previous message
         self.draw.rectangle([(self.mwOffset, self.detHeight + self.mhOffset),
                              (self.drawWidth, self.drawHeight)],
-                            fill = self.background,
-                            outline = self.background)
+                            fill = self._ink_(self.background),
+                            outline = self._ink_(self.background))
         # Draw the new message
         self.draw.text((self.mwOffset, self.detHeight + self.mhOffset),
                        lString,
-                       self.fontColour,
+                       self._ink_(self.fontColour),
                        font=self.font)
         
+    def stitchFrames(self, block, by='row', step=1, fill=None):
+        """
+        Draws the stitches of a block onto the canvas a few at a time, for
+        animating the pattern being stitched. After each step the rectangle
+        of canvas which changed is yielded, so that only the differences
+        between frames need to be encoded, see animation.animationWriter
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block whose stitches are to be drawn
+        by : string, optional
+            row, column or region. row adds each row line along with the
+            column stitches hanging from it, column likewise. region adds the
+            stitches around each enclosed region in turn, square grids only.
+            The default is 'row'.
+        step : int, optional
+            Number of rows, columns or regions added per frame. The default
+            is 1.
+        fill : tuple, optional
+            Pair of RGB colours, see fillRegions. With by='region' each
+            region is coloured in as its stitches are added. The default is
+            None.
+
+        Yields
+        ------
+        patch : numpy array
+            (height, width, 3) copy of the changed rectangle of the canvas
+        offset : tuple
+            (x, y) canvas position of the patch
+
+        """
+        if self.tiled:
+            raise ValueError('Tiled cloths have no canvas to animate')
+        if by not in ('row', 'column', 'region'):
+            raise ValueError(f'Stitches are added by row, column or region, not {by}')
+
+        segments = np.concatenate(self.stitchSegments(block))
+        if len(segments) == 0:
+            return
+        if by == 'region':
+            yield from self._regionFrames_(block, segments, step, fill)
+            return
+
+        # Group the stitches by the line they start on
+        key = segments[:, 1] if by == 'row' else np.minimum(segments[:, 0], segments[:, 2])
+        order = np.argsort(key, kind='stable')
+        segments, key = segments[order], key[order]
+        firsts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])[::step]
+
+        for group in np.split(segments, firsts[1:]):
+            self.drawSegments(block, [group])
+            patch, offset = self._canvasPatch_(np.minimum(group[:, 0], group[:, 2]).min(),
+                                               np.minimum(group[:, 1], group[:, 3]).min(),
+                                               np.maximum(group[:, 0], group[:, 2]).max() + 1,
+                                               np.maximum(group[:, 1], group[:, 3]).max() + 1)
+            yield self._asRGB_(patch), offset
+
+    def _regionFrames_(self, block, segments, step, fill):
+        """
+        Internal method behind stitchFrames(by='region'). Each stitch is added
+        along with the first region it borders
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block whose stitches are to be drawn
+        segments : numpy array
+            The block's stitches from stitchSegments, vertical then horizontal
+        step : int
+            Number of regions added per frame.
+        fill : tuple or None
+            Pair of RGB colours to colour the regions in with.
+
+        Yields
+        ------
+        patch : numpy array
+            (height, width, 3) copy of the changed rectangle of the canvas
+        offset : tuple
+            (x, y) canvas position of the patch
+
+        """
+        vertical, horizontal = self.stitchParity(block)
+        labels, colours = self.labelRegions(block)
+
+        # The regions either side of each stitch, matching the walls of
+        # labelRegions, and in the same order as stitchSegments
+        col, row = np.nonzero(vertical)
+        vKey = np.minimum(labels[col, row+1], labels[col+1, row+1])
+        row, col = np.nonzero(horizontal)
+        hKey = np.minimum(labels[col+1, row], labels[col+1, row+1])
+        key = np.concatenate([vKey, hKey])
+
+        order = np.argsort(key, kind='stable')
+        segments, key = segments[order], key[order]
+
+        # Cells sorted by region, for finding each region's extent
+        cells = np.argsort(labels, axis=None, kind='stable')
+        cellKey = labels.ravel()[cells]
+        cellCol, cellRow = np.unravel_index(cells, labels.shape)
+
+        if fill is not None:
+            # Unrevealed cells take a third palette entry, the background
+            block.regions = labels
+            block.maskPalette = np.asarray(list(fill) + [self.background], dtype=np.uint8)
+            block.mask[...] = 2
+
+        stridex = (1+block.skip[0])*int(block.size[0])
+        stridey = (1+block.skip[1])*int(block.size[1])
+
+        for first in range(0, labels.max() + 1, step):
+            last = first + step
+            s0, s1 = np.searchsorted(key, [first, last])
+            group = segments[s0:s1]
+
+            if fill is None:
+                if len(group) == 0:
+                    continue
+                self.drawSegments(block, [group])
+                patch, offset = self._canvasPatch_(group[:, 0].min(), group[:, 1].min(),
+                                                   group[:, 2].max() + 1, group[:, 3].max() + 1)
+                yield self._asRGB_(patch), offset
+                continue
+
+            c0, c1 = np.searchsorted(cellKey, [first, last])
+            cc, rr = cellCol[c0:c1], cellRow[c0:c1]
+            block.mask[cc, rr] = colours[cc, rr]
+
+            # Repaint the cells and every stitch added so far over them
+            x0 = block.start[0] + cc.min()*stridex
+            y0 = block.start[1] + rr.min()*stridey
+            x1 = block.start[0] + (cc.max()+1)*stridex
+            y1 = block.start[1] + (rr.max()+1)*stridey
+            if len(group):
+                x0, y0 = min(x0, group[:, 0].min()), min(y0, group[:, 1].min())
+                x1, y1 = max(x1, group[:, 2].max() + 1), max(y1, group[:, 3].max() + 1)
+            area, origin = self._canvasPatch_(x0, y0, x1, y1)
+            drawn = segments[:s1]
+            near = (drawn[:, 2] >= origin[0]) & (drawn[:, 0] < origin[0] + area.shape[1]) & \
+                (drawn[:, 3] >= origin[1]) & (drawn[:, 1] < origin[1] + area.shape[0])
+            paintMask(area, block, origin, inks=self._maskInks_(block))
+            rasterSegments(area, drawn[near], self._ink_(block.linergb), origin)
+
+            if self.backend == 'numpy':
+                self.pixels[origin[1]:origin[1]+area.shape[0],
+                            origin[0]:origin[0]+area.shape[1]] = area
+            else:
+                self.canvas.paste(self._asImage_(area), origin)
+            yield self._asRGB_(area).copy(), origin
+
+    def _canvasPatch_(self, x0, y0, x1, y1):
+        """
+        Internal method to copy a rectangle of the canvas out as an array
+
+        Parameters
+        ----------
+        x0 : float
+            Left edge of the rectangle.
+        y0 : float
+            Top edge of the rectangle.
+        x1 : float
+            Right edge of the rectangle, exclusive.
+        y1 : float
+            Bottom edge of the rectangle, exclusive.
+
+        Returns
+        -------
+        patch : numpy array
+            Copy of the pixels in the canvas mode, clipped to the canvas
+        offset : tuple
+            (x, y) canvas position of the patch
+
+        """
+        # Whole pixels, within the canvas
+        x0 = max(0, int(np.floor(x0)))
+        y0 = max(0, int(np.floor(y0)))
+        x1 = max(x0, min(int(np.ceil(self.drawWidth)), int(np.floor(x1))))
+        y1 = max(y0, min(int(np.ceil(self.drawHeight)), int(np.floor(y1))))
+
+        if self.backend == 'numpy':
+            return self.pixels[y0:y1, x0:x1].copy(), (x0, y0)
+        return np.array(self.canvas.crop((x0, y0, x1, y1))), (x0, y0)
+
+    def recordStitching(self, block, mode, by='row', step=1, fill=None, **kwargs):
+        """
+        Animates the stitches of a block being added to the canvas, streaming
+        only the changed rectangle of each frame into the mode's animation
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block object
+            The block whose stitches are to be drawn
+        mode : hitomezashi.operatingMode object
+            The operating mode of which the frames are a part. If it has not
+            started an animation, one is started with **kwargs.
+        by : string, optional
+            row, column or region, see stitchFrames. The default is 'row'.
+        step : int, optional
+            Rows, columns or regions added per frame. The default is 1.
+        fill : tuple, optional
+            Pair of RGB colours, see stitchFrames. The default is None.
+        **kwargs : keyword arguments
+            Passed to operatingMode.startAnimation.
+
+        Returns
+        -------
+        None.
+
+        """
+        if mode.animation is None:
+            mode.startAnimation(**kwargs)
+
+        # The canvas as it stands, then each step as a patch
+        mode.ct = mode.ct + 1
+        mode.animation.addFrame(self.getImage())
+        for patch, offset in self.stitchFrames(block, by, step, fill):
+            mode.ct = mode.ct + 1
+            mode.animation.addPatch(patch, offset)
+
     def clearMasks(self):
         """
         Clears all masks in the block to refresh for a new sequence
@@ -519,9 +1714,12 @@ class hitomezashi(object):
         for key, value in self.blocks.items():
             value.clearMask()
         
+    @timedPhase('encode')
     def saveFrame(self, mode):
         """
-        Save a snapshot of the canvas
+        Save a snapshot of the canvas, in the mode's frame format, see
+        operatingMode.setFrameFormat. Frames saved in the background may
+        still be being written on return, until mode.frames.wait()
  
         Parameters
         ----------
@@ -530,27 +1728,240 @@ class hitomezashi(object):
  
         Returns
         -------
-        None.
+        saveName : string or None
+            Path of the saved frame, or None if it went into an animation.
  
         """
-        # Increment frame counter within the operatingMode and save the frame
-        # TODO:: This counter was only used for creating gifs, so not currently
-        # used in this implementation
+        # Increment frame counter within the operatingMode and save the frame,
+        # straight into the animation if the mode is recording one
         mode.ct = mode.ct + 1
-        saveName = os.path.join(mode.saveFolder, f'Frame {mode.ct}.jpg')
-        self.canvas.save(saveName, quality=100)
-        
-    def drawLine(self, block, startCond, startLoc, endLoc):
+        if mode.animation is not None:
+            mode.animation.addFrame(self.getImage())
+            return None
+
+        # Written in the mode's frame format, see setFrameFormat
+        saveName = os.path.join(mode.saveFolder, f'Frame {mode.ct}.{mode.frames.ext}')
+        done = None
+        if self.stats is not None:
+            self.stats.count('framesSaved')
+            done = lambda size: self.stats.count('bytesWritten', size)
+        mode.frames.write(self.getImage(), saveName, done)
+        return saveName
+
+    def fetchCached(self, cache, mode, save=True, **options):
         """
-        
+        Looks the cloth up in a render cache before anything is drawn. On a
+        hit the cached file is copied in as the mode's next frame, so the
+        pattern need not be drawn at all. The key is kept as self.cacheKey,
+        for adding the render to the cache on a miss
 
         Parameters
         ----------
-        block : stitch_block object
-            The block of stitches, i.e. the grid, to have lines drawn
-        startCond : int
-            1 or 0, defining the starting state of the line
-        startLoc : tuple
+        cache : cache.renderCache object
+            The cache to look in
+        mode : hitomezashi.operatingMode object
+            The operating mode of which the frame is a part.
+        save : bool, optional
+            Copy a hit in as the next frame. The default is True.
+        **options : keyword arguments
+            Render options which change the output, see cache.clothKey. ext
+            gives the file extension. The default is that of the mode's
+            frames, as saveFrame, and then their encoder options are keyed
+            too, as saveArgs.
+
+        Returns
+        -------
+        string or None
+            Path of the cached file, or None on a miss.
+
+        """
+        if 'ext' not in options:
+            # The file is a frame, so how frames are encoded changes it too
+            options['ext'] = mode.frames.ext
+            options.setdefault('saveArgs', tuple(sorted(mode.frames.options.items())))
+        self.cacheKey = clothKey(self, **options)
+        path = cache.get(self.cacheKey, options['ext'])
+
+        if path is not None and save:
+            mode.ct = mode.ct + 1
+            saveName = os.path.join(mode.saveFolder, f'Frame {mode.ct}.{options["ext"]}')
+            shutil.copyfile(path, saveName)
+        return path
+
+    def _renderMode_(self, modeName, fills=None, animate=None, workers=None):
+        """
+        Internal method finishing defineMode once every block has been added,
+        with canvas=False. The pattern is taken from the cache if it was drawn
+        before, otherwise the canvas is created, its regions are filled and
+        its stitches drawn, or animated, and the frame saved. Uses the save,
+        cache and cacheOptions set by defineMode
+
+        Parameters
+        ----------
+        modeName : string
+            The name of the mode, already added
+        fills : dict, optional
+            Pair of RGB colours per block name, for the blocks whose regions
+            are coloured in. None values are left out. Only square blocks can
+            be filled. The default is None.
+        animate : string, optional
+            row, column or region, to record block A's stitches going in
+            instead, see recordStitching. The default is None.
+        workers : int, optional
+            Processes drawing the blocks, see _drawBlocks_. The default is
+            None.
+
+        Returns
+        -------
+        None.
+
+        """
+        mode = self.modes[modeName]
+        fills = {name: fill for name, fill in (fills or {}).items() if fill is not None}
+
+        # Regions are only found on square grids, so check before drawing
+        for name in fills:
+            if self.blocks[name].shape != 'rectangle':
+                raise ValueError(f'Only square blocks can be filled, not the {self.blocks[name].shape} block {name}')
+        if animate == 'region' and self.blocks['A'].shape != 'rectangle':
+            raise ValueError(f'Only square blocks can be animated by region, not {self.blocks["A"].shape} blocks')
+
+        # Patterns drawn before are copied from the cache, skipping the drawing.
+        # Nothing is filled yet, so the fills are keyed as options
+        self.cachePath = None
+        if self.cache is not None and animate is None:
+            fill = tuple((name, np.asarray(fills[name]).tolist()) for name in sorted(fills))
+            self.cachePath = self.fetchCached(self.cache, mode, self.save, fill=fill or None,
+                                              **(self.cacheOptions or {}))
+            if self.cachePath is not None:
+                return
+
+        # Only a miss needs the canvas, and the font
+        self._createCanvas_()
+
+        # Record the stitches going in one step at a time. Regions are coloured
+        # in as they are enclosed, otherwise before any stitches go in
+        if animate is not None:
+            fill = fills.get('A')
+            if fill is not None and animate != 'region':
+                self.fillRegions(self.blocks['A'], fill)
+                fill = None
+            self.recordStitching(self.blocks['A'], mode, by=animate, fill=fill)
+            mode.makeGif()
+            return
+
+        # Colour in the enclosed regions, then draw the stitches over them
+        for name, fill in fills.items():
+            self.fillRegions(self.blocks[name], fill)
+        self._drawBlocks_(workers)
+
+        if self.save:
+            saveName = self.saveFrame(mode)
+            if self.cache is not None:
+                # The frame may still be being written in the background
+                mode.frames.wait()
+                self.cache.put(self.cacheKey, saveName, mode.frames.ext)
+
+    def _drawBlocks_(self, workers=None):
+        """
+        Internal method drawing the stitches of every block onto the canvas
+
+        Parameters
+        ----------
+        workers : int, optional
+            Unused, blocks are drawn in this process. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        for block in self.blocks.values():
+            self.drawStitches(block)
+
+    def saveSVG(self, mode, chunk=10000):
+        """
+        Save the stitches of every block as a scalable vector image, as the
+        next frame of the mode, see writeSVG
+
+        Parameters
+        ----------
+        mode : hitomezashi.operatingMode object
+            The operating mode of which the frame is a part.
+        chunk : int, optional
+            Number of runs formatted per write. The default is 10000.
+
+        Returns
+        -------
+        saveName : string
+            Path of the saved frame.
+
+        """
+        mode.ct = mode.ct + 1
+        saveName = os.path.join(mode.saveFolder, f'Frame {mode.ct}.svg')
+        self.writeSVG(saveName, chunk)
+        return saveName
+
+    @timedPhase('encode')
+    def writeSVG(self, saveName, chunk=10000):
+        """
+        Write the stitches of every block to a scalable vector image. Collinear
+        stitches which meet end to end are merged into one path command, and
+        the file is written a chunk at a time rather than built in memory.
+        Nothing is drawn on the canvas, so this works for tiled cloths too
+
+        Parameters
+        ----------
+        saveName : string
+            Path of the file to write.
+        chunk : int, optional
+            Number of runs formatted per write. The default is 10000.
+
+        Returns
+        -------
+        None.
+
+        """
+        width = int(np.ceil(self.drawWidth))
+        height = int(np.ceil(self.drawHeight))
+
+        with open(saveName, 'w') as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" '
+                    f'width="{width}" height="{height}" '
+                    f'viewBox="0 0 {width} {height}">\n')
+            f.write(f'<rect width="{width}" height="{height}" '
+                    f'fill="#{bytes(self.background).hex()}"/>\n')
+
+            # One path per block, holding a move and a relative line per run
+            for key, block in self.blocks.items():
+                f.write(f'<path fill="none" stroke="#{bytes(block.linergb).hex()}" '
+                        'stroke-width="1" d="')
+                for segs in self.stitchSegments(block):
+                    runs = mergeRuns(segs)
+                    runs[:, 2:] -= runs[:, :2]
+                    runs = np.round(runs, 2)
+                    for i in range(0, len(runs), chunk):
+                        f.write(''.join('M{:.10g} {:.10g}l{:.10g} {:.10g}'.format(*run)
+                                        for run in runs[i:i + chunk].tolist()))
+                f.write('"/>\n')
+
+            f.write('</svg>\n')
+
+        if self.stats is not None:
+            self.stats.count('framesSaved')
+            self.stats.count('bytesWritten', os.path.getsize(saveName))
+        
+    def drawLine(self, block, startCond, startLoc, endLoc):
+        """
+        
+
+        Parameters
+        ----------
+        block : stitch_block object
+            The block of stitches, i.e. the grid, to have lines drawn
+        startCond : int
+            1 or 0, defining the starting state of the line
+        startLoc : tuple
             x and y coordinates of the line start
         endLoc : tuple
             x and y coordinates of the line end
@@ -564,9 +1975,14 @@ class hitomezashi(object):
         
         # State will be 1 or 0, depending on row number and start state
         state = (startCond)%2
+        if self.stats is not None:
+            self.stats.count('segmentsDrawn' if state == 1 else 'segmentsSkipped')
         # Only draw a line if it starts 'on'
-        if state == 1:
-            self.draw.line((startLoc, endLoc), fill=block.linergb*state, width = 1)
+        if state == 1 and not self.tiled:
+            if self.backend == 'numpy':
+                rasterSegments(self.pixels, [*startLoc, *endLoc], self._ink_(block.linergb))
+            else:
+                self.draw.line((startLoc, endLoc), fill=self._ink_(block.linergb), width = 1)
 ###############################################################################
  
 ###############################################################################    
@@ -599,29 +2015,87 @@ class operatingMode(object):
         self.mName = mName
         self.ct = 0
         self.saveFolder = os.path.join(basePath, self.mName)
-           
+        self.animation = None
+        self.frames = frameWriter()
+
+    def setFrameFormat(self,
+                       fmt='jpg',
+                       background=False,
+                       **kwargs):
+        """
+        Sets how the following frames are saved by saveFrame. Any frames
+        still being written in the old format are finished first
+
+        Parameters
+        ----------
+        fmt : string, optional
+            jpg, png, webp or raw, see frames.py. The default is 'jpg'.
+        background : bool, optional
+            Encode frames on a background thread, so drawing carries on
+            while they are written. The default is False.
+        **kwargs : keyword arguments
+            Encoder options, passed to PIL.Image.Image.save, e.g.
+            compress_level for png or method for webp.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.frames.close()
+        self.frames = frameWriter(fmt, background=background, **kwargs)
+
+    def startAnimation(self,
+                       fmt='gif',
+                       **kwargs):
+        """
+        Record the following frames straight into an animation file, rather
+        than saving each one as a jpg. Finish it with makeGif
+
+        Parameters
+        ----------
+        fmt : string, optional
+            gif, apng or webp. The default is 'gif'.
+        **kwargs : keyword arguments
+            Passed to animation.animationWriter, e.g. duration or delta.
+
+        Returns
+        -------
+        None.
+
+        """
+        ext = 'png' if fmt == 'apng' else fmt
+        saveName = os.path.join(self.saveFolder, f'{self.mName}_sequence.{ext}')
+        self.animation = animationWriter(saveName, fmt=fmt, **kwargs)
+
     def makeGif(self,
                 duration=100):
         """
-        Collate saved frames into an animated gif
+        Collate saved frames into an animated gif. If an animation was
+        started with startAnimation it is finished instead
  
+        Parameters
+        ----------
+        duration : int, optional
+            Display time of each frame in milliseconds, when collating saved
+            frames. The default is 100.
+
         Returns
         -------
         None.
  
         """
-        # Create list of saved files in the directory
-        filenames = [f'Frame {i+1}.jpg' for i in range(self.ct-1)]
-        filePaths = [os.path.join(self.saveFolder, filenames[i]) for i, _ in enumerate(filenames)]
-        
-        # Open each frame and save them into a gif
-        frames = [Image.open(image) for image in filePaths]
-        frame_one = frames[0]
-        saveName = f'{self.saveFolder}\\{self.mName}_sequence.gif'
-        frame_one.save(saveName, format="GIF", append_images=frames,
-                   save_all=True, duration=duration, loop=0)
-        
-        print('Done')
+        if self.animation is not None:
+            self.animation.close()
+            self.animation = None
+            return
+
+        # Open each saved frame only as it is added to the gif
+        self.frames.wait()
+        filePaths = (os.path.join(self.saveFolder, f'Frame {i+1}.{self.frames.ext}') for i in range(self.ct))
+        frames = (readFrame(filePath) for filePath in filePaths)
+        saveName = os.path.join(self.saveFolder, f'{self.mName}_sequence.gif')
+        writeAnimation(saveName, frames, duration=duration)
         
         
 ###############################################################################
@@ -644,9 +2118,9 @@ class stitch_block(object):
         """
         Object to describe a grid of points. Could tile a few grids together
         
-        The self-created mask array contains an rgb colour value per grid section.
-        This mask is used during the drawBlock method to colour in sectiond of
-        the grid.
+        The self-created mask array contains a colour per grid section, stored
+        as an index into the small maskPalette table of rgb colours. This mask
+        is used during the drawBlock method to colour in sectiond of the grid.
  
         Parameters
         ----------
@@ -664,13 +2138,18 @@ class stitch_block(object):
         skip : tuple, optional
             Number of rows and columns to skip for interleaved blocks.
             The default is (0, 0).
-        shape : string, 'rectangle' or 'trapezoid' optional
+        shape : string, 'rectangle', 'trapezoid', 'triangle' or 'isometric', optional
             The shape of the pixel. The default is 'rectangle'.
         slope : tuple, optional
             Gradient of the left and right hand sides of the grid. Sloping up
             from left to right is considered positive. The default is (0, 0).
         lineWidth : int, optional
             Width of the line in pixels. The default is 1.
+        seed : int, numpy SeedSequence or Generator, optional
+            Keyword argument. Source of the random start states for 'rand'
+            logic. Each side draws from its own child of the SeedSequence, so
+            the same seed always gives the same pattern. The default is None,
+            which draws fresh entropy.
  
         Returns
         -------
@@ -696,11 +2175,17 @@ class stitch_block(object):
         elif shape =='triangle':
             # Triangular grids have 3 sides: base, left and right
             self.startList = ['baseStarts', 'leftStarts', 'rightStarts']
+
+        elif shape == 'isometric':
+            # Isometric grids have 3 directions: rows, left and right slopes
+            self.startList = ['rowStarts', 'leftStarts', 'rightStarts']
         
         
         # Defaults
         defaultDict = {
             'thresh': None,
+            'firstStates': None,
+            'seed': None,
             }
             
             
@@ -718,8 +2203,9 @@ class stitch_block(object):
                 
         self.startList = [kwargs[val] for val in self.startList]
         
-        # Start with an empty array of pixels
+        # Start with an empty array of pixels, and no regions found yet
         self.clearMask()
+        self.regions = None
         
         self.__dict__.update((k, v) for k, v in kwargs.items())
         
@@ -734,10 +2220,30 @@ class stitch_block(object):
         None.
  
         """
-        # Loop through each dimension and make each grid section (0, 0 ,0) colour
-        self.mask = [[] for i in range(self.grid[0])]
-        for i in range(self.grid[0]):
-            self.mask[i] = [(0, 0, 0) for i in range(self.grid[1])]
+        # A single (0, 0, 0) palette entry, used by every grid section
+        self.maskPalette = np.zeros((1, 3), dtype=np.uint8)
+
+        # One byte per grid section, indexing the palette. Reuse the existing
+        # array where possible
+        shape = (self.grid[0], self.grid[1])
+        if isinstance(getattr(self, 'mask', None), np.ndarray) and self.mask.shape == shape:
+            self.mask.fill(0)
+        else:
+            self.mask = np.zeros(shape, dtype=np.uint8)
+
+    def maskColours(self):
+        """
+        Looks up the rgb colour of every grid section
+
+        Returns
+        -------
+        list
+            Nested list of rgb tuples indexed [col][row]
+
+        """
+        # Convert each palette entry once, then share the tuples
+        palette = [tuple(rgb) for rgb in self.maskPalette.tolist()]
+        return [[palette[i] for i in column] for column in self.mask.tolist()]
     
     def _setStartStates_(self):
         
@@ -753,32 +2259,53 @@ class stitch_block(object):
                 raise ValueError('No pattern provided')
         elif self.logic == 'alternate':
             if self.firstStates is not None:
-                if self.shape == 'rectangle':
-                    self.colStarts = [(i + self.firstStates[0])%2 for i in range(self.grid[0])]
-                    self.rowStarts = [(i + self.firstStates[1])%2 for i in range(self.grid[1])]
-                elif self.shape == 'triangle':
-                    self.baseStarts = [(i + self.firstStates[0])%2 for i in range(self.grid[1])]
-                    self.leftStarts = [(i + self.firstStates[1])%2 for i in range(self.grid[1])]
-                    self.rightStarts = [(i + self.firstStates[2])%2 for i in range(self.grid[1])]
-                    
+                for side, (key, length) in enumerate(self._sides_()):
+                    setattr(self, key, (np.arange(length) + self.firstStates[side]) % 2)
             else:
                 raise ValueError('No first states provided')
         elif self.logic == 'rand':
             if self.thresh is not None:
-                if self.shape == 'rectangle':
-                    randomNums = np.random.uniform(low=0, high=100, size=self.grid[0])
-                    self.colStarts = [math.floor(elem/self.thresh[0]) for elem in randomNums]
-                    randomNums = np.random.uniform(low=0, high=100, size=self.grid[1])
-                    self.rowStarts = [math.floor(elem/self.thresh[1]) for elem in randomNums]
-                elif self.shape == 'triangle':
-                    randomNums = np.random.uniform(low=0, high=100, size=self.grid[0])
-                    self.baseStarts = [math.floor(elem/self.thresh[0]) for elem in randomNums]
-                    randomNums = np.random.uniform(low=0, high=100, size=self.grid[0])
-                    self.leftStarts = [math.floor(elem/self.thresh[1]) for elem in randomNums]
-                    randomNums = np.random.uniform(low=0, high=100, size=self.grid[0])
-                    self.rightStarts = [math.floor(elem/self.thresh[2]) for elem in randomNums]
+                # One independent stream per side, all derived from the seed.
+                # A Generator is used as it is, one side after another
+                sides = self._sides_()
+                if isinstance(self.seed, np.random.Generator):
+                    seeds = [self.seed]*len(sides)
+                else:
+                    if not isinstance(self.seed, np.random.SeedSequence):
+                        self.seed = np.random.SeedSequence(self.seed)
+                    seeds = self.seed.spawn(len(sides))
+                for side, (key, length) in enumerate(sides):
+                    setattr(self, key, randStarts(length, self.thresh[side], seed=seeds[side]))
             else:
                 raise ValueError('No thresholds provided')
+
+        # Whatever the logic, each side is kept as packed bits, see bits.py.
+        # Starts which are packed already are kept as they are, e.g. those
+        # mapped from a pattern file
+        for key, _ in self._sides_():
+            if getattr(self, key) is not None and not isinstance(getattr(self, key), packedStarts):
+                setattr(self, key, packedStarts(getattr(self, key)))
+
+    def _sides_(self):
+        """
+        Internal method listing the start state attributes of the block with
+        the number of points along each, in the order of the thresholds and
+        first states
+
+        Returns
+        -------
+        list of tuple
+            (attribute name, length) per side.
+
+        """
+        if self.shape == 'rectangle':
+            return [('colStarts', self.grid[0]), ('rowStarts', self.grid[1])]
+        if self.shape == 'isometric':
+            # Sloping lines cross the rows, so there are more of them
+            return [('rowStarts', self.grid[1]), ('leftStarts', self.grid[0] + self.grid[1]//2),
+                    ('rightStarts', self.grid[0] + self.grid[1]//2)]
+        return [('baseStarts', self.grid[0]), ('leftStarts', self.grid[0]),
+                ('rightStarts', self.grid[0])]
             
 
 ###############################################################################
@@ -790,118 +2317,591 @@ class hitomezashi_tri(hitomezashi):
     """
     
     
-    def drawStitches(self, block):
+    def stitchParity(self, block, rowRange=None):
         """
-        
+        Computes the on/off state of every stitch in the triangular block in
+        one pass
 
         Parameters
         ----------
         block : hitomezashi.stitch_block instance
-            the block in which to draw stitches
+            the block to be evaluated
+        rowRange : tuple, optional
+            (first, last + 1) layers to evaluate. The default is None, for all
+            of them.
 
         Returns
         -------
-        None.
+        row : numpy array of int
+            Horizontal line (layer) of each lattice point
+        col : numpy array of int
+            Position of each lattice point along its layer
+        right : numpy array of bool
+            True where the right stitch from the point is 'on'
+        left : numpy array of bool
+            True where the left stitch from the point is 'on'
+        base : numpy array of bool
+            True where the base stitch from the point is 'on'. The last point
+            of each layer has no base stitch
 
         """
-        
-        
-        # The pattern defines the starting state of the line of stitches. 1 is
-        # on and 0 is off
-        
-        # Loop through each pixel of the block and draw the lines in the given
-        # axis
-        
-        # Lines are drawn for one pixel width, alternating on and off
-        
-        # We will pass either set patterns of start states, or randomisations
-        # with different probabilities
-        
-        # Unpack gradients
-        lgrad, rgrad = block.slope
-        meangrad = (lgrad+rgrad)/2
-        
         # We draw by running along horizontal lines of points and adding up to
         # three lines from each one. Work out how many horizontal lines
         # (layers) we have in the grid
         layers = block.grid[0] - 1
-        
-        # # Need to shift the start (LHS) of first line in row 2 onwards.
-        # # Depending on the slope of the sides, this will have a variable period or
-        # # no period at all. Create a list of initial position offsets to apply.
-        # shift_vals = [0]
-        # first_shift = self.shift
-        # while 1 - first_shift/block.size[0] > 1E-6 and len(shift_vals) < block.grid[1]:
-        #     shift_vals.append(first_shift)
-        #     first_shift = first_shift + self.shift
-        #     # Check for values that would 'skip' the first point
-        #     if first_shift > block.size[0] and first_shift < 2*block.size[0]:
-        #         first_shift = first_shift - block.size[0]
-           
-        # period = len(shift_vals)
-                
-        # Sweep through all rows, avoiding drawing on the canvas edge
-        for row in range(layers):
-            # Generate leftmost coordinate of pixel.
-            y = block.start[1] + (row+1)*(1+block.skip[1])*block.size[1] + block.lineWidth
-            # Calculate number of columns in this row
-            # Sweep through all columns, avoiding drawing on the canvas edge
-            for col in range(row):
-                # x = block.start[0] + \
-                x = 0.25*block.grid[0]*block.size[0] + \
-                    (col+1)*(1+block.skip[0])*block.size[0] + \
-                        block.lineWidth + \
-                            (np.floor(block.grid[0]/2)-row)*meangrad*block.size[0] #\
-                                # + shift_vals[row%period]
-                # Debug
-                # if row == 1 and col == 0:
-                #     print(f'x is {x}')
-                #     print(f'grid size is {block.grid[0]*block.size[0]}')
-                
-                # Generate a 3-pt co-ordinate system for identifying each point
-                # on the lattice. This will call the appropriate state
-                
-                # (B, L, R)
-                # B = Base, L = Left, R = Right
-                # B = row numer
-                # L is numRows --> numRows - row number
-                # R is numRows - row number --> numRows
-                
-                # block.grid[1] - 1 = t
-                
-                # Top is 0, t, t
-                # Next row down is (1, t, t-1) ; (1, t-1, t)
-                # (2, t, t-2) ; (2, t-1, t-1) ; (2, t - 2, t)
-                # etc.
-                
-                tot = 2*(layers-1)
-                L_R_min = layers - row
-                R_idx = L_R_min + col
-                L_idx = tot - row - R_idx
-                
-                # Lines are drawn 'upwards' from points for L/R and rightwards
-                # for base.
-                
-                # Right lines
-                startLoc = (x, y)
-                endLoc = (x + block.size[0]*rgrad, y + block.size[1])
-                startCond = block.rightStarts[L_idx] + col
-                
-                
-                self.drawLine(block, startCond, startLoc, endLoc)
-                
-                if col < row and row >= 1:
-                    # Left lines
-                    endLoc = (x - block.size[0]*lgrad, y + block.size[1])
-                    startCond = block.leftStarts[R_idx] + col
-                    
-                    self.drawLine(block, startCond, startLoc, endLoc)
-                    
-                if col < row-1 and row >=1:
-                    # Base lines
-                    endLoc = (x + block.size[0], y)
-                    startCond = block.baseStarts[row] + col
-                    
-                    
-                    self.drawLine(block, startCond, startLoc, endLoc)
 
+        # Every point of the triangle, avoiding drawing on the canvas edge.
+        # Layer row holds row points
+        r0, r1 = (0, layers) if rowRange is None else rowRange
+        rows = np.arange(r0, r1)
+        row = np.repeat(rows, rows)
+        col = np.arange(len(row)) - np.repeat(np.cumsum(rows) - rows, rows)
+
+        # Generate a 3-pt co-ordinate system for identifying each point
+        # on the lattice. This will call the appropriate state
+
+        # (B, L, R)
+        # B = Base, L = Left, R = Right
+        # B = row numer
+        # L is numRows --> numRows - row number
+        # R is numRows - row number --> numRows
+
+        # block.grid[1] - 1 = t
+
+        # Top is 0, t, t
+        # Next row down is (1, t, t-1) ; (1, t-1, t)
+        # (2, t, t-2) ; (2, t-1, t-1) ; (2, t - 2, t)
+        # etc.
+
+        tot = 2*(layers-1)
+        L_R_min = layers - row
+        R_idx = L_R_min + col
+        L_idx = tot - row - R_idx
+
+        # State will be 1 or 0, depending on position along the line and the
+        # start state of the line
+        right = (np.asarray(block.rightStarts, dtype=int)[L_idx] + col) % 2 == 1
+        left = (np.asarray(block.leftStarts, dtype=int)[R_idx] + col) % 2 == 1
+        base = (np.asarray(block.baseStarts, dtype=int)[row] + col) % 2 == 1
+        base &= col < row - 1
+
+        return row, col, right, left, base
+
+    def stitchCount(self, block):
+        """
+        Number of stitch positions in the triangular block, whether on or off
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block of stitches
+
+        Returns
+        -------
+        int
+            Three stitches, right, left and base, per lattice point.
+
+        """
+        return 3*len(self.stitchParity(block)[0])
+
+    def latticePoints(self, block, row, col):
+        """
+        Canvas positions of points on the triangular lattice
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to which the points belong
+        row : numpy array of int
+            Layer of each point
+        col : numpy array of int
+            Position of each point along its layer
+
+        Returns
+        -------
+        x : numpy array
+            x coordinate of each point
+        y : numpy array
+            y coordinate of each point
+
+        """
+        # Unpack gradients
+        lgrad, rgrad = block.slope
+        meangrad = (lgrad+rgrad)/2
+
+        x = block.start[0] + 0.25*block.grid[0]*block.size[0] + \
+            (col+1)*(1+block.skip[0])*block.size[0] + \
+                block.lineWidth + \
+                    (np.floor(block.grid[0]/2)-row)*meangrad*block.size[0]
+        y = block.start[1] + (row+1)*(1+block.skip[1])*block.size[1] + block.lineWidth
+
+        return x, y
+
+    @timedPhase('segments')
+    def stitchSegments(self, block, bounds=None):
+        """
+        Generates the coordinates of all 'on' stitches in the triangular block
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block in which to draw stitches
+        bounds : tuple, optional
+            (x0, y0, x1, y1) region of the canvas. If given, only the layers
+            passing near it are evaluated, and only stitches touching it are
+            returned. The default is None.
+
+        Returns
+        -------
+        segments : list of numpy arrays
+            (N, 4) arrays of (x0, y0, x1, y1) coordinates for the right, left
+            and base stitches
+
+        """
+        # Unpack gradients
+        lgrad, rgrad = block.slope
+
+        rowRange = None
+        if bounds is not None:
+            # Layers whose stitches could reach into the region, with a layer
+            # to spare either side
+            layers = block.grid[0] - 1
+            stridey = (1+block.skip[1])*block.size[1]
+            top = block.start[1] + block.lineWidth
+            r0 = min(layers, max(0, int((bounds[1] - top - block.size[1]) // stridey) - 2))
+            rowRange = (r0, max(r0, min(layers, int((bounds[3] - top) // stridey) + 1)))
+
+        row, col, right, left, base = self.stitchParity(block, rowRange)
+        x, y = self.latticePoints(block, row, col)
+
+        # Lines are drawn 'upwards' from points for L/R and rightwards
+        # for base.
+        rSegs = np.stack([x, y, x + block.size[0]*rgrad, y + block.size[1]], axis=1)[right]
+        lSegs = np.stack([x, y, x - block.size[0]*lgrad, y + block.size[1]], axis=1)[left]
+        bSegs = np.stack([x, y, x + block.size[0], y], axis=1)[base]
+
+        segments = [rSegs, lSegs, bSegs]
+        if bounds is not None:
+            # Keep the stitches whose bounding boxes meet the region
+            x0, y0, x1, y1 = bounds
+            segments = [segs[(np.maximum(segs[:, 0], segs[:, 2]) >= x0 - 1) &
+                             (np.minimum(segs[:, 0], segs[:, 2]) < x1 + 1)]
+                        for segs in segments]
+
+        return segments
+
+    def toggleBaseStart(self, block, index):
+        """
+        Flips the start state of one base line and repaints just its stitches
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be edited
+        index : int
+            The base line, i.e. layer, to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.baseStarts[index] = 1 - block.baseStarts[index] % 2
+
+        # Base stitches run along the layer, so repaint its row of pixels
+        x, y = self.latticePoints(block, index, 0)
+        self.redrawRegion(0, int(y), self.drawWidth, int(y) + 1)
+
+    def toggleLeftStart(self, block, index):
+        """
+        Flips the start state of one left line and repaints just its stitches
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be edited
+        index : int
+            The left line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.leftStarts[index] = 1 - block.leftStarts[index] % 2
+
+        # Points whose left stitch belongs to this line (R_idx == index)
+        layers = block.grid[0] - 1
+        row = np.arange(max(1, layers - index), layers)
+        self._redrawStitches_(block, row, row - layers + index, -block.slope[0])
+
+    def toggleRightStart(self, block, index):
+        """
+        Flips the start state of one right line and repaints just its stitches
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be edited
+        index : int
+            The right line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.rightStarts[index] = 1 - block.rightStarts[index] % 2
+
+        # Points whose right stitch belongs to this line (L_idx == index)
+        layers = block.grid[0] - 1
+        col = layers - 2 - index
+        row = np.arange(col + 1, layers)
+        self._redrawStitches_(block, row, np.full(len(row), col), block.slope[1])
+
+
+###############################################################################
+ 
+############################################################################### 
+class hitomezashi_hex(hitomezashi):
+    """
+    A child class of hitomezashi with methods for an isometric grid, i.e.
+    points on a triangular lattice with stitches in three directions: along
+    the rows, and sloping down to the left and to the right. Alternate rows of
+    points are shifted by half a stitch, so the stitches form hexagons and
+    triangles
+    """
+
+    def stitchParity(self, block, rowRange=None):
+        """
+        Computes the on/off state of every stitch in the isometric block in
+        one pass
+
+        Point col of row row lies on sloping lines left = col + (row+1)//2
+        and right = col - row//2 + (rows-1)//2, numbered from the top left.
+        Stitches alternate along rows by col, and along sloping lines by row
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be evaluated
+        rowRange : tuple, optional
+            (first, last + 1) rows of points to evaluate. The default is None,
+            for all of them.
+
+        Returns
+        -------
+        row : numpy array of int
+            Row of each lattice point
+        col : numpy array of int
+            Position of each lattice point along its row
+        horizontal : numpy array of bool
+            True where the stitch right from the point is 'on'
+        left : numpy array of bool
+            True where the stitch down and left from the point is 'on'
+        right : numpy array of bool
+            True where the stitch down and right from the point is 'on'
+
+        """
+        # Points avoid the canvas edge, as on square grids
+        cols = block.grid[0] - 1
+        rows = block.grid[1] - 1
+
+        r0, r1 = (0, rows) if rowRange is None else rowRange
+        row = np.repeat(np.arange(r0, r1), cols)
+        col = np.tile(np.arange(cols), r1 - r0)
+
+        # Odd rows are shifted right, so their sloping stitches lean the
+        # other way in col
+        odd = row % 2
+        leftIdx = col + (row + 1)//2
+        rightIdx = col - row//2 + (rows - 1)//2
+
+        horizontal = (np.asarray(block.rowStarts, dtype=int)[row] + col) % 2 == 1
+        left = (np.asarray(block.leftStarts, dtype=int)[leftIdx] + row) % 2 == 1
+        right = (np.asarray(block.rightStarts, dtype=int)[rightIdx] + row) % 2 == 1
+
+        # Only stitches between two points of the grid
+        horizontal &= col < cols - 1
+        left &= (row < rows - 1) & (col + odd > 0)
+        right &= (row < rows - 1) & (col + odd < cols)
+
+        return row, col, horizontal, left, right
+
+    def stitchCount(self, block):
+        """
+        Number of stitch positions in the isometric block, whether on or off
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block of stitches
+
+        Returns
+        -------
+        int
+            Three stitches, horizontal, left and right, per lattice point.
+
+        """
+        return 3*(block.grid[0] - 1)*(block.grid[1] - 1)
+
+    def latticePoints(self, block, row, col):
+        """
+        Canvas positions of points on the isometric lattice
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to which the points belong
+        row : numpy array of int
+            Row of each point
+        col : numpy array of int
+            Position of each point along its row
+
+        Returns
+        -------
+        x : numpy array
+            x coordinate of each point
+        y : numpy array
+            y coordinate of each point
+
+        """
+        # Rows are centred on the canvas, whichever way they are shifted
+        x = block.start[0] + (col + 0.75 + 0.5*(row % 2))*(1+block.skip[0])*block.size[0] + block.lineWidth
+        y = block.start[1] + (row + 1)*(1+block.skip[1])*block.size[1] + block.lineWidth
+
+        return x, y
+
+    @timedPhase('segments')
+    def stitchSegments(self, block, bounds=None):
+        """
+        Generates the coordinates of all 'on' stitches in the isometric block
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block in which to draw stitches
+        bounds : tuple, optional
+            (x0, y0, x1, y1) region of the canvas. If given, only the rows
+            passing near it are evaluated, and only stitches touching it are
+            returned. The default is None.
+
+        Returns
+        -------
+        segments : list of numpy arrays
+            (N, 4) arrays of (x0, y0, x1, y1) coordinates for the horizontal,
+            left and right stitches
+
+        """
+        rowRange = None
+        if bounds is not None:
+            # Rows whose stitches could reach into the region, with a row to
+            # spare either side
+            rows = block.grid[1] - 1
+            stridey = (1+block.skip[1])*block.size[1]
+            top = block.start[1] + block.lineWidth
+            r0 = min(rows, max(0, int((bounds[1] - top - block.size[1]) // stridey) - 2))
+            rowRange = (r0, max(r0, min(rows, int((bounds[3] - top) // stridey) + 1)))
+
+        row, col, horizontal, left, right = self.stitchParity(block, rowRange)
+        x, y = self.latticePoints(block, row, col)
+
+        # Rows are drawn rightwards, sloping lines downwards to the next row
+        half = block.size[0]/2
+        hSegs = np.stack([x, y, x + block.size[0], y], axis=1)[horizontal]
+        lSegs = np.stack([x, y, x - half, y + block.size[1]], axis=1)[left]
+        rSegs = np.stack([x, y, x + half, y + block.size[1]], axis=1)[right]
+
+        segments = [hSegs, lSegs, rSegs]
+        if bounds is not None:
+            # Keep the stitches whose bounding boxes meet the region
+            x0, y0, x1, y1 = bounds
+            segments = [segs[(np.maximum(segs[:, 0], segs[:, 2]) >= x0 - 1) &
+                             (np.minimum(segs[:, 0], segs[:, 2]) < x1 + 1)]
+                        for segs in segments]
+
+        return segments
+
+    def toggleLeftStart(self, block, index):
+        """
+        Flips the start state of one left sloping line and repaints just its
+        stitches
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be edited
+        index : int
+            The left line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.leftStarts[index] = 1 - block.leftStarts[index] % 2
+
+        # Points on this line which have a stitch down to the left
+        cols = block.grid[0] - 1
+        row = np.arange(block.grid[1] - 2)
+        col = index - (row + 1)//2
+        keep = (col + row % 2 > 0) & (col < cols)
+        self._redrawStitches_(block, row[keep], col[keep], -0.5)
+
+    def toggleRightStart(self, block, index):
+        """
+        Flips the start state of one right sloping line and repaints just its
+        stitches
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be edited
+        index : int
+            The right line to flip
+
+        Returns
+        -------
+        None.
+
+        """
+        block.rightStarts[index] = 1 - block.rightStarts[index] % 2
+
+        # Points on this line which have a stitch down to the right
+        cols = block.grid[0] - 1
+        row = np.arange(block.grid[1] - 2)
+        col = index + row//2 - (block.grid[1] - 2)//2
+        keep = (col >= 0) & (col + row % 2 < cols)
+        self._redrawStitches_(block, row[keep], col[keep], 0.5)
+
+
+###############################################################################
+ 
+############################################################################### 
+class hitomezashi_mosaic(hitomezashi):
+    """
+    A child class of hitomezashi for cloths whose blocks have different
+    shapes. Each geometry specific method is passed on to the class which
+    draws the shape of the block it is called for
+    """
+
+    # Class drawing each shape of block
+    geometries = {'rectangle': hitomezashi,
+                  'triangle': hitomezashi_tri,
+                  'isometric': hitomezashi_hex}
+
+    def _drawBlocks_(self, workers=None):
+        """
+        Internal method drawing every block, each on its own and pasted onto
+        the canvas, see parallel.renderBlocks. Tiled cloths are left to be
+        rendered region by region
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of processes rendering blocks, 1 for none. The default is
+            None, one per core.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.tiled:
+            renderBlocks(self, workers=workers)
+
+    def _geometry_(self, block):
+        """
+        Internal method finding the class which draws a block
+
+        Parameters
+        ----------
+        block : hitomezashi.stitch_block instance
+            the block to be drawn
+
+        Returns
+        -------
+        class
+            hitomezashi or one of its geometry classes.
+
+        """
+        return self.geometries[block.shape]
+
+    def renderRegion(self, x0, y0, x1, y1, keys=None):
+        """
+        Renders one rectangle of the canvas, as hitomezashi.renderRegion, but
+        block by block, each clipped to its own rectangle of canvas. Gives the
+        same pixels as the blocks pasted together by parallel.renderBlocks
+
+        Parameters
+        ----------
+        x0, y0, x1, y1 : int
+            Edges of the region, x1 and y1 exclusive.
+        keys : list, optional
+            Names of the blocks to render. The default is None, for all of
+            them.
+
+        Returns
+        -------
+        PIL.Image.Image
+            The rendered region.
+
+        """
+        image = self._newImage_(x1 - x0, y1 - y0)
+        for key in (self.blocks if keys is None else keys):
+            # The part of the region covered by the block
+            bx0, by0, bx1, by1 = blockBox(self, self.blocks[key])
+            bx0, by0 = max(x0, bx0), max(y0, by0)
+            bx1, by1 = min(x1, bx1), min(y1, by1)
+            if bx1 > bx0 and by1 > by0:
+                patch = hitomezashi.renderRegion(self, bx0, by0, bx1, by1, keys=[key])
+                image.paste(patch, (bx0 - x0, by0 - y0))
+        return image
+
+    def stitchParity(self, block, *args):
+        """
+        stitchParity of the geometry which draws the block
+        """
+        return self._geometry_(block).stitchParity(self, block, *args)
+
+    def stitchSegments(self, block, bounds=None):
+        """
+        stitchSegments of the geometry which draws the block
+        """
+        return self._geometry_(block).stitchSegments(self, block, bounds)
+
+    def stitchCount(self, block):
+        """
+        stitchCount of the geometry which draws the block
+        """
+        return self._geometry_(block).stitchCount(self, block)
+
+    def latticePoints(self, block, row, col):
+        """
+        latticePoints of the geometry which draws the block
+        """
+        return self._geometry_(block).latticePoints(self, block, row, col)
+
+    def labelRegions(self, block):
+        """
+        labelRegions of the geometry which draws the block
+        """
+        return self._geometry_(block).labelRegions(self, block)
+
+    def toggleBaseStart(self, block, index):
+        """
+        toggleBaseStart of the geometry which draws the block
+        """
+        hitomezashi_tri.toggleBaseStart(self, block, index)
+
+    def toggleLeftStart(self, block, index):
+        """
+        toggleLeftStart of the geometry which draws the block
+        """
+        self._geometry_(block).toggleLeftStart(self, block, index)
+
+    def toggleRightStart(self, block, index):
+        """
+        toggleRightStart of the geometry which draws the block
+        """
+        self._geometry_(block).toggleRightStart(self, block, index)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Optional timing and counters for the hitomezashi render pipeline
+
+A cloth only collects stats once hitomezashi.enableStats has been called.
+Until then each instrumented method costs one attribute check, and nothing
+is timed or counted
+
+Phases recorded by hitomezashi:
+
+    starts : generating the start states of a new block
+    canvas : allocating the canvas in _createCanvas_
+    segments : working out the 'on' stitches in stitchSegments
+    draw : putting stitches on the canvas in drawSegments
+    fill : finding and colouring the enclosed regions in fillRegions
+    render : rendering a region from the blocks in renderRegion
+    encode : writing a frame or svg to disk
+
+Counters: segmentsDrawn, segmentsSkipped ('off' stitches passed over by
+drawStitches and drawLine), canvasBytes, bytesWritten and framesSaved
+"""
+import copy
+import functools
+import time
+from contextlib import contextmanager, nullcontext
+
+# Shared do-nothing phase, handed out while stats are disabled
+NOPHASE = nullcontext()
+
+class renderStats(object):
+
+    def __init__(self, hook=None):
+        """
+        Durations per phase, counters and canvas size of a cloth's renders
+
+        Parameters
+        ----------
+        hook : callable, optional
+            Called as hook(name, seconds, stats) as each phase finishes, e.g.
+            to log or export the timings. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.hook = hook
+        self.reset()
+
+    def reset(self):
+        """
+        Clears everything recorded so far
+
+        Returns
+        -------
+        None.
+
+        """
+        self.phases = {}
+        self.counters = {}
+        self.canvas = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed code as one call of a phase. Nested phases are
+        each timed in full, so the time of an inner phase is also part of
+        the outer one
+
+        Parameters
+        ----------
+        name : string
+            The phase.
+
+        Yields
+        ------
+        None.
+
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            entry = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            if self.hook is not None:
+                self.hook(name, seconds, self)
+
+    def count(self, name, value=1):
+        """
+        Adds to a counter
+
+        Parameters
+        ----------
+        name : string
+            The counter.
+        value : int, optional
+            Amount to add. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def asDict(self):
+        """
+        Everything recorded, e.g. for saving as JSON
+
+        Returns
+        -------
+        dict
+            phases: {name: {calls, seconds}}, counters: {name: value} and
+            canvas: (width, height) or None.
+
+        """
+        return {'phases': copy.deepcopy(self.phases),
+                'counters': dict(self.counters),
+                'canvas': self.canvas}
+
+    def report(self):
+        """
+        Formats the stats as a table, slowest phase first
+
+        Returns
+        -------
+        string
+            One line per phase and counter.
+
+        """
+        lines = []
+        if self.canvas is not None:
+            lines.append(f'canvas {self.canvas[0]} x {self.canvas[1]}')
+        for name, entry in sorted(self.phases.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name:10} {entry['seconds']:10.4f}s {entry['calls']:8} calls")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name:16} {value:12}')
+        return '\n'.join(lines)
+
+def timedPhase(name):
+    """
+    Decorator timing every call of a cloth method as a phase, when the cloth
+    has stats enabled
+
+    Parameters
+    ----------
+    name : string
+        The phase.
+
+    Returns
+    -------
+    callable
+        The decorator.
+
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            if self.stats is None:
+                return method(self, *args, **kwargs)
+            with self.stats.phase(name):
+                return method(self, *args, **kwargs)
+        return timed
+    return decorate
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering cloths across many processes
+
+renderBlocks renders each block on its own, straight from its start states,
+into a buffer of just its part of the canvas. Blocks are shared out across a
+pool of worker processes and the finished buffers are pasted onto the
+cloth's canvas as they come back. This suits mosaics of many blocks, see
+geometries.mosaicCloth
+
+renderShared renders a whole cloth into a sharedCanvas, a canvas held in
+shared memory. Workers each render horizontal bands of rows, or blocks, and
+write them straight into it, so nothing is pickled back to the parent and
+no second copy of the canvas is made. The parent saves the canvas through
+an image wrapping the shared memory, e.g.
+
+    cloth = geometries.squareCloth('big', grid=(5000, 5000), quant=4, tiled=True)
+    cloth.defineMode('rand', 'big', thresh=[50, 50], save=False)
+    with renderShared(cloth) as canvas:
+        canvas.save('big.jpg')
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from frames import writeFrame
+
+# Formats PIL writes straight from RGBX pixels. PNG is written as a palette
+# image where it can be, see frames.writeFrame, and others from an RGB copy
+RGBX_FORMATS = ('JPEG', 'WEBP', 'TIFF')
+
+class sharedCanvas(object):
+
+    def __init__(self,
+                 width,
+                 height,
+                 name=None,
+                 background=None):
+        """
+        A canvas of RGBX pixels in shared memory, which any process can open
+        by name and draw into. The fourth byte of each pixel is always 255,
+        so PIL can wrap the memory as an image without copying it
+
+        Pickling a sharedCanvas sends only its name and size, so the copy
+        opens the same memory
+
+        Parameters
+        ----------
+        width : int
+            Width in pixels.
+        height : int
+            Height in pixels.
+        name : string, optional
+            Name of existing shared memory to open. The default is None,
+            which creates new shared memory, freed by close.
+        background : tuple, optional
+            RGB colour to fill a new canvas with. The default is None, which
+            leaves it to whoever draws to fill every pixel.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.width = width
+        self.height = height
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(1, 4*width*height))
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+
+        # (height, width, 4) view of the memory
+        self.array = np.ndarray((height, width, 4), dtype=np.uint8, buffer=self.memory.buf)
+        if background is not None:
+            self.array[...] = (*background, 255)
+
+    def __getstate__(self):
+        return {'width': self.width, 'height': self.height, 'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['width'], state['height'], name=state['name'])
+
+    def paste(self, image, offset=(0, 0)):
+        """
+        Writes an RGB image, or array of pixels, into the canvas. Palette
+        and bilevel images are expanded to RGB
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy array
+            The pixels to write.
+        offset : tuple, optional
+            (x, y) canvas position of the first pixel. The default is
+            (0, 0).
+
+        Returns
+        -------
+        None.
+
+        """
+        if isinstance(image, Image.Image) and image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = np.asarray(image)
+        x0, y0 = offset[0], offset[1]
+        area = self.array[y0:y0 + pixels.shape[0], x0:x0 + pixels.shape[1]]
+        area[..., :3] = pixels[..., :3]
+        area[..., 3] = 255
+
+    def image(self, mode='RGBX'):
+        """
+        The canvas as a PIL image sharing its memory. It is only valid until
+        the canvas is closed
+
+        Parameters
+        ----------
+        mode : string, optional
+            RGBX or RGBA. The pixels are the same, the fourth byte being
+            unused or an opaque alpha. The default is 'RGBX'.
+
+        Returns
+        -------
+        PIL.Image.Image
+            Read only image of the canvas.
+
+        """
+        return Image.frombuffer(mode, (self.width, self.height), self.memory.buf,
+                                'raw', mode, 0, 1)
+
+    def save(self, path, **kwargs):
+        """
+        Saves the canvas, without copying it for formats which take RGBX
+        pixels. PNG and WebP are saved as frames.writeFrame saves them, as
+        palette PNG and lossless WebP, so the file is the same as one saved
+        from a cloth's own canvas. Other formats are saved from an RGB copy
+
+        Parameters
+        ----------
+        path : string
+            File to write. Its extension picks the format.
+        **kwargs : keyword arguments
+            Passed on to PIL.Image.Image.save.
+
+        Returns
+        -------
+        None.
+
+        """
+        fmt = kwargs.pop('format', None) or \
+            Image.registered_extensions().get(os.path.splitext(path)[1].lower())
+        if fmt == 'WEBP':
+            writeFrame(self.image(), path, 'webp', **kwargs)
+        elif fmt in RGBX_FORMATS:
+            self.image().save(path, format=fmt, **kwargs)
+        elif fmt == 'PNG':
+            writeFrame(self.image().convert('RGB'), path, 'png', **kwargs)
+        else:
+            self.image().convert('RGB').save(path, format=fmt, **kwargs)
+
+    def close(self):
+        """
+        Closes the canvas, freeing the shared memory if this canvas created
+        it
+
+        Returns
+        -------
+        None.
+
+        """
+        self.array = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def blockBox(cloth, block):
+    """
+    The rectangle of canvas belonging to a block, as worked out by
+    hitomezashi._getDimensions_
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth holding the block.
+    block : hitomezashi.stitch_block
+        The block.
+
+    Returns
+    -------
+    tuple
+        (x0, y0, x1, y1) whole pixels, within the canvas.
+
+    """
+    x0 = max(0, int(np.floor(block.start[0])))
+    y0 = max(0, int(np.floor(block.start[1])))
+    x1 = min(int(np.ceil(cloth.drawWidth)),
+             int(np.ceil(block.start[0] + block.grid[0]*(1+block.skip[0])*block.size[0])))
+    y1 = min(int(np.ceil(cloth.drawHeight)),
+             int(np.ceil(block.start[1] + block.grid[1]*(1+block.skip[1])*block.size[1])))
+    return x0, y0, max(x0, x1), max(y0, y1)
+
+def renderBlock(cloth, key):
+    """
+    Renders one block of a cloth on its own, over its own rectangle of canvas
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth holding the block.
+    key : string
+        Name of the block.
+
+    Returns
+    -------
+    box : tuple
+        (x0, y0, x1, y1) canvas rectangle of the block.
+    pixels : numpy array
+        Rendered rectangle, in the cloth's canvasMode, see
+        hitomezashi._blank_.
+
+    """
+    box = blockBox(cloth, cloth.blocks[key])
+    return box, np.asarray(cloth.renderRegion(*box, keys=[key]))
+
+def _setWorkerCloth_(cloth, canvas=None):
+    """
+    Pool initialiser, keeping one copy of the cloth, and the shared canvas
+    if there is one, in each worker process
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth to be rendered.
+    canvas : parallel.sharedCanvas, optional
+        The canvas to render into. The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    global _workerCloth, _workerCanvas
+    _workerCloth = cloth
+    _workerCanvas = canvas
+
+def _renderBlock_(key):
+    """
+    Renders one block in a worker process, see renderBlock
+
+    Parameters
+    ----------
+    key : string
+        Name of the block.
+
+    Returns
+    -------
+    tuple
+        (box, pixels) of the block.
+
+    """
+    return renderBlock(_workerCloth, key)
+
+def renderBlocks(cloth, keys=None, workers=None):
+    """
+    Renders blocks of a cloth, each into its own buffer, and pastes them onto
+    the cloth's canvas. Blocks are expected not to overlap, as each one
+    replaces its whole rectangle of canvas
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth, with a canvas.
+    keys : list, optional
+        Names of the blocks to render. The default is None, for all of them.
+    workers : int, optional
+        Number of worker processes. 1 renders in this process, without a
+        pool. The default is None, one per core.
+
+    Returns
+    -------
+    None.
+
+    """
+    if cloth.tiled:
+        raise ValueError('Tiled cloths have no canvas to paste blocks onto')
+
+    keys = list(cloth.blocks) if keys is None else list(keys)
+
+    def paste(box, pixels):
+        if cloth.backend == 'numpy':
+            cloth.pixels[box[1]:box[3], box[0]:box[2]] = pixels
+        else:
+            cloth.canvas.paste(cloth._asImage_(pixels), box[:2])
+
+    if workers == 1 or len(keys) < 2:
+        for key in keys:
+            paste(*renderBlock(cloth, key))
+        return
+
+    # The cloth is sent to each worker once, and only block names after that
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_setWorkerCloth_,
+                             initargs=(cloth,)) as pool:
+        for box, pixels in pool.map(_renderBlock_, keys):
+            paste(box, pixels)
+
+def _renderShared_(job):
+    """
+    Renders one band or block into the shared canvas in a worker process
+
+    Parameters
+    ----------
+    job : tuple
+        (box, keys) to pass to renderRegion.
+
+    Returns
+    -------
+    None.
+
+    """
+    box, keys = job
+    _workerCanvas.paste(_workerCloth.renderRegion(*box, keys=keys), box[:2])
+
+def renderShared(cloth, workers=None, by='band', rows=None, canvas=None):
+    """
+    Renders a whole cloth into a canvas in shared memory, across a pool of
+    worker processes. Each worker writes its part straight into the canvas,
+    so the only full size copy of the pattern is the canvas itself. The
+    cloth needs no canvas of its own, i.e. it can be tiled
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth, with all of its blocks added.
+    workers : int, optional
+        Number of worker processes. 1 renders in this process, without a
+        pool. The default is None, one per core.
+    by : string, optional
+        band or block. band shares out horizontal bands of rows, block
+        shares out the blocks, for mosaics. The default is 'band'.
+    rows : int, optional
+        Height of a band in pixels. The default is None, for about four
+        bands per worker.
+    canvas : parallel.sharedCanvas, optional
+        Canvas to render into, the size of the cloth. The default is None,
+        which creates one.
+
+    Returns
+    -------
+    parallel.sharedCanvas
+        The rendered canvas. Close it, e.g. with a with block, to free the
+        shared memory.
+
+    """
+    if by not in ('band', 'block'):
+        raise ValueError(f'Work is shared out by band or block, not {by}')
+
+    width = int(np.ceil(cloth.drawWidth))
+    height = int(np.ceil(cloth.drawHeight))
+    workers = workers or os.cpu_count() or 1
+
+    if by == 'band':
+        rows = rows or max(16, -(-height // (4*workers)))
+        jobs = [((0, y0, width, min(y0 + rows, height)), None) for y0 in range(0, height, rows)]
+        background = None
+    else:
+        # Blocks need not cover the canvas, so fill it first
+        jobs = [(blockBox(cloth, block), [key]) for key, block in cloth.blocks.items()]
+        background = cloth.background
+
+    if canvas is None:
+        canvas = sharedCanvas(width, height, background=background)
+    elif background is not None:
+        canvas.array[...] = (*background, 255)
+
+    try:
+        if workers == 1 or len(jobs) < 2:
+            for box, keys in jobs:
+                canvas.paste(cloth.renderRegion(*box, keys=keys), box[:2])
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_setWorkerCloth_,
+                                     initargs=(cloth, canvas)) as pool:
+                list(pool.map(_renderShared_, jobs))
+    except BaseException:
+        canvas.close()
+        raise
+
+    return canvas
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Compact binary files of hitomezashi patterns
+
+A pattern file holds everything which defines a cloth, rather than an image
+of it: the geometry and colours of every block, their seeds, their start
+states as packed bits, and the region labels and colours of filled blocks.
+A 1000x1000 square pattern takes under 1kB, about 500 bytes of header and
+250 bytes of starts, against megabytes of image. Files are laid out as
+
+    16 byte prefix : MAGIC, version, header length and where the data starts
+    header : UTF-8 JSON describing the cloth and its blocks
+    data : little-endian arrays, each starting on a 64 byte boundary
+
+Opening a file maps its data into memory rather than reading it, and the
+blocks' start states are views of the mapping, so a huge pattern opens at
+once and renderRegion only pages in the starts of the lines it draws, e.g.
+
+    savePattern(cloth, 'big.hzp')
+    cloth = loadPattern('big.hzp', tiled=True)
+    tile = cloth.renderRegion(0, 0, 512, 512)
+
+The mapping is copy on write, so toggling starts of a loaded cloth never
+changes the file
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+import geometries
+import hitomezashi as hit
+from bits import packedStarts
+from parallel import renderBlocks
+
+MAGIC = b'HTMZ'
+VERSION = 1
+EXTENSION = '.hzp'
+
+# MAGIC, version, flags, header length, data start
+PREFIX = struct.Struct('<4sHHII')
+ALIGN = 64
+
+# Cloth classes which can be written, and the geometry names they go by
+CLOTHS = {'square': geometries.squareCloth,
+          'triangle': geometries.triangleCloth,
+          'hex': geometries.hexCloth,
+          'mosaic': geometries.mosaicCloth}
+
+# Tile settings which decide a mosaic's layout
+TILE_KEYS = ('geometry', 'grid', 'slope', 'linergb')
+
+def _plain_(value):
+    """
+    Internal function converting numpy values and tuples into plain python
+    types which JSON can hold
+
+    Parameters
+    ----------
+    value : object
+        The value.
+
+    Returns
+    -------
+    object
+        The value as lists, ints, floats and strings.
+
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_plain_(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain_(item) for key, item in value.items()}
+    return value
+
+def _seed_(seed):
+    """
+    Internal function recording a block's seed. Generators cannot be written
+    down, so are recorded as None
+
+    Parameters
+    ----------
+    seed : int, numpy SeedSequence, Generator or None
+        The seed.
+
+    Returns
+    -------
+    int, dict or None
+        The seed, or a SeedSequence as its entropy and spawn key.
+
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return {'entropy': _plain_(seed.entropy), 'spawnKey': list(seed.spawn_key)}
+    if isinstance(seed, (int, np.integer)):
+        return int(seed)
+    return None
+
+def clothGeometry(cloth):
+    """
+    The geometry name of a cloth, one of CLOTHS
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth.
+
+    Returns
+    -------
+    string
+        square, triangle, hex or mosaic.
+
+    """
+    for geometry, cls in CLOTHS.items():
+        if type(cloth) is cls:
+            return geometry
+    raise ValueError(f'{type(cloth).__name__} cloths cannot be written to pattern files')
+
+def savePattern(cloth, path):
+    """
+    Writes a cloth to a pattern file, once its blocks have been added. The
+    file is written beside the path and moved into place once complete
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth, a squareCloth, triangleCloth, hexCloth or mosaicCloth.
+    path : string
+        File to write.
+
+    Returns
+    -------
+    string
+        The path written.
+
+    """
+    geometry = clothGeometry(cloth)
+
+    # The arguments which rebuild the cloth itself
+    args = {'quant': cloth.quant}
+    if geometry == 'mosaic':
+        args['tiles'] = [{key: tile[key] for key in TILE_KEYS if key in tile}
+                         for tile in cloth.tiles.values()]
+        args['columns'] = cloth.columns
+        args['gap'] = cloth.gap
+    else:
+        args['grid'] = cloth.grids['A']
+        if geometry == 'triangle':
+            args['slope'] = cloth.slope
+
+    # Lay the arrays out one after another, recording where each one goes
+    arrays = []
+    offset = 0
+
+    def place(array):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        entry = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        arrays.append((offset, array))
+        offset += -(-array.nbytes // ALIGN)*ALIGN
+        return entry
+
+    blocks = []
+    for name, block in cloth.blocks.items():
+        record = {'name': name,
+                  'shape': block.shape,
+                  'size': block.size,
+                  'start': block.start,
+                  'grid': block.grid,
+                  'linergb': block.linergb,
+                  'skip': block.skip,
+                  'slope': block.slope,
+                  'lineWidth': block.lineWidth,
+                  'logic': block.logic,
+                  'thresh': block.thresh,
+                  'firstStates': block.firstStates,
+                  'seed': _seed_(block.seed),
+                  'starts': {}}
+
+        # Start states as whole words, so they can be mapped straight back
+        for key, _ in block._sides_():
+            starts = packedStarts(getattr(block, key))
+            record['starts'][key] = dict(place(starts.words), length=len(starts))
+
+        # Filled blocks keep their regions, so need not be labelled again
+        if block.regions is not None:
+            record['regions'] = place(block.regions)
+            record['mask'] = place(block.mask)
+            record['maskPalette'] = block.maskPalette
+
+        blocks.append(record)
+
+    header = json.dumps(_plain_({'geometry': geometry,
+                                 'hName': cloth.hName,
+                                 'args': args,
+                                 'blocks': blocks})).encode()
+    dataStart = -(-(PREFIX.size + len(header)) // ALIGN)*ALIGN
+
+    partName = f'{path}.part'
+    with open(partName, 'wb') as file:
+        file.write(PREFIX.pack(MAGIC, VERSION, 0, len(header), dataStart))
+        file.write(header)
+        for position, array in arrays:
+            file.seek(dataStart + position)
+            array.tofile(file)
+        # Pad the last array out to its boundary
+        file.truncate(dataStart + offset)
+    os.replace(partName, path)
+    return path
+
+class patternFile(object):
+
+    def __init__(self, path):
+        """
+        An open pattern file. Only the header is read, and the data is mapped
+        into memory, copy on write, to be paged in as it is used
+
+        Parameters
+        ----------
+        path : string
+            The pattern file.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            prefix = file.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                raise ValueError(f'{path} is not a pattern file')
+            magic, version, _, headerLength, self.dataStart = PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a pattern file')
+            if version > VERSION:
+                raise ValueError(f'{path} is pattern file version {version}, newer than {VERSION}')
+            self.header = json.loads(file.read(headerLength))
+
+        self.memory = np.memmap(path, dtype=np.uint8, mode='c')
+        self.geometry = self.header['geometry']
+        self.blocks = {record['name']: record for record in self.header['blocks']}
+
+    def array(self, entry):
+        """
+        One array of the file, as a view of the mapping
+
+        Parameters
+        ----------
+        entry : dict
+            offset, dtype and shape of the array, from the header.
+
+        Returns
+        -------
+        numpy array
+            The array. Writes to it are kept in memory only.
+
+        """
+        dtype = np.dtype(entry['dtype'])
+        start = self.dataStart + entry['offset']
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        return self.memory[start:start + count*dtype.itemsize].view(dtype).reshape(entry['shape'])
+
+    def startStates(self, name):
+        """
+        The start states of one block, without reading them
+
+        Parameters
+        ----------
+        name : string
+            Name of the block.
+
+        Returns
+        -------
+        dict
+            packedStarts per side, e.g. {'rowStarts': ..., 'colStarts': ...}.
+
+        """
+        return {key: packedStarts.fromWords(self.array(entry), entry['length'])
+                for key, entry in self.blocks[name]['starts'].items()}
+
+    def cloth(self, draw=True, **kwargs):
+        """
+        Rebuilds the cloth held in the file
+
+        Parameters
+        ----------
+        draw : bool, optional
+            Draw the pattern onto the canvas. Tiled cloths are never drawn,
+            as they render region by region. The default is True.
+        **kwargs : keyword arguments
+            Passed on to the cloth, e.g. backend, tiled or savePathBase.
+
+        Returns
+        -------
+        hitomezashi.hitomezashi
+            The cloth, with every block added.
+
+        """
+        cloth = CLOTHS[self.geometry](self.header['hName'], **self.header['args'], **kwargs)
+
+        # Blocks take their starts as they are, so the mapping is shared
+        for name, record in self.blocks.items():
+            block = hit.stitch_block(name,
+                                     size=tuple(record['size']),
+                                     start=tuple(record['start']),
+                                     grid=tuple(record['grid']),
+                                     linergb=tuple(record['linergb']),
+                                     skip=tuple(record['skip']),
+                                     shape=record['shape'],
+                                     slope=tuple(record['slope']),
+                                     lineWidth=record['lineWidth'],
+                                     logic='pattern',
+                                     **self.startStates(name))
+            block.logic = record['logic']
+            block.thresh = record['thresh']
+            block.firstStates = record['firstStates']
+            block.seed = record['seed']
+            if isinstance(block.seed, dict):
+                block.seed = np.random.SeedSequence(block.seed['entropy'],
+                                                    spawn_key=block.seed['spawnKey'])
+
+            if 'regions' in record:
+                block.regions = self.array(record['regions'])
+                block.mask = self.array(record['mask'])
+                block.maskPalette = np.asarray(record['maskPalette'], dtype=np.uint8)
+            cloth.addBlock(block)
+
+        cloth._createCanvas_()
+        if 'A' in cloth.blocks:
+            cloth.A = cloth.blocks['A']
+
+        if draw and not cloth.tiled:
+            if isinstance(cloth, hit.hitomezashi_mosaic):
+                renderBlocks(cloth)
+            else:
+                for block in cloth.blocks.values():
+                    if block.regions is not None:
+                        cloth.drawMask(block)
+                    cloth.drawStitches(block)
+        return cloth
+
+def loadPattern(path, draw=True, **kwargs):
+    """
+    Opens a pattern file and rebuilds its cloth, see patternFile.cloth
+
+    Parameters
+    ----------
+    path : string
+        The pattern file.
+    draw : bool, optional
+        Draw the pattern onto the canvas. The default is True.
+    **kwargs : keyword arguments
+        Passed on to the cloth, e.g. backend, tiled or savePathBase.
+
+    Returns
+    -------
+    hitomezashi.hitomezashi
+        The cloth.
+
+    """
+    return patternFile(path).cloth(draw=draw, **kwargs)
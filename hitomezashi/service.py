@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering hitomezashi patterns from asyncio code, e.g. behind a web server
+
+renderService.render is a coroutine returning the encoded file of a pattern
+spec (see batch.py). Patterns are drawn on a pool of worker processes, so the
+event loop is never held up by drawing or encoding. Specs are given a format
+in place of an output path:
+
+    format : 'png', 'jpg', 'webp', 'svg' or 'hzp'. The default is 'png'
+
+Requests for a spec which is already being rendered wait for that render
+rather than starting another, so a burst of identical requests costs one
+render. Renders wait for a worker in a queue of limited length, and once it
+is full further requests wait for room, rather than piling up unbounded
+work, e.g.
+
+    async with renderService(workers=4) as service:
+        data = await service.render({'grid': [50, 50], 'thresh': [40, 60]})
+
+Running this file fires many concurrent requests at a service, as a local
+client would, and reports how many renders they cost
+
+    python service.py --requests 200 --distinct 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cli import FORMATS
+from patternfile import _plain_
+
+def specFormat(spec):
+    """
+    The file format a spec is rendered to, from its format, or else the
+    extension of its output
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec.
+
+    Returns
+    -------
+    string
+        One of FORMATS.
+
+    """
+    fmt = spec.get('format')
+    if fmt is None and spec.get('output'):
+        fmt = os.path.splitext(spec['output'])[1].lstrip('.')
+    fmt = (fmt or 'png').lower().replace('jpeg', 'jpg')
+    if fmt not in FORMATS:
+        raise ValueError(f'Patterns are rendered to one of {FORMATS}, not {fmt}')
+    return fmt
+
+def specKey(spec):
+    """
+    Key identifying the file a spec renders to. Specs differing only in
+    their output path, or the order of their keys, share a key. Arrays are
+    keyed on every value they hold
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec.
+
+    Returns
+    -------
+    string
+        The spec as canonical JSON.
+
+    """
+    spec = {key: value for key, value in spec.items() if key != 'output'}
+    spec['format'] = specFormat(spec)
+    try:
+        return json.dumps(_plain_(spec), sort_keys=True, separators=(',', ':'))
+    except TypeError as error:
+        raise ValueError(f'Pattern specs must hold plain values and arrays: {error}') from None
+
+def renderBytes(spec):
+    """
+    Renders a spec to a file in a temporary folder and reads it back, see
+    batch.renderSpec. Run in the worker processes
+
+    Parameters
+    ----------
+    spec : dict
+        Pattern spec.
+
+    Returns
+    -------
+    bytes
+        The encoded pattern.
+
+    """
+    import batch
+
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, f'pattern.{specFormat(spec)}')
+        result = batch.renderSpec({**spec, 'output': output, 'name': spec.get('name', 'pattern')})
+        if not result['ok']:
+            raise RuntimeError(result['error'])
+        with open(output, 'rb') as file:
+            return file.read()
+
+class renderService(object):
+
+    def __init__(self,
+                 workers=None,
+                 queue=None,
+                 renderer=renderBytes,
+                 executor=None):
+        """
+        Renders pattern specs for asyncio code on a pool of processes,
+        coalescing identical requests. Create it, or enter it with async
+        with, inside a running event loop
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of renders run at once. The default is None, one per
+            core.
+        queue : int, optional
+            Number of renders which may wait for a worker. Requests for new
+            specs beyond this wait for room. The default is None, twice the
+            number of workers.
+        renderer : callable, optional
+            Function taking a spec and returning its bytes, run in the
+            executor. It must pickle, for a process pool. The default is
+            renderBytes.
+        executor : concurrent.futures.Executor, optional
+            Executor to run renders in, left open by close. The default is
+            None, which creates a ProcessPoolExecutor of workers processes.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.renderer = renderer
+        self._ownExecutor = executor is None
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if executor is None else executor
+
+        # Renders waiting for a worker, and the future of each spec being
+        # rendered, by specKey
+        self._queue = asyncio.Queue(maxsize=queue or 2*self.workers)
+        self._pending = {}
+
+        # Requests made, and renders they cost
+        self.requests = 0
+        self.renders = 0
+
+        self._tasks = [asyncio.get_running_loop().create_task(self._work_())
+                       for _ in range(self.workers)]
+
+    async def render(self, spec):
+        """
+        Renders a spec, or waits for the render already under way of an
+        identical one
+
+        Parameters
+        ----------
+        spec : dict
+            Pattern spec, see batch.py, with a format in place of an output.
+
+        Returns
+        -------
+        bytes
+            The encoded pattern.
+
+        """
+        if self._tasks is None:
+            raise RuntimeError('The render service is closed')
+
+        key = specKey(spec)
+        self.requests += 1
+        while True:
+            future = self._pending.get(key)
+            if future is None:
+                future = await self._submit_(key, spec)
+
+            # Waiting does not cancel the render if this caller gives up, so it
+            # carries on for any others waiting on it. Cancelling this caller
+            # raises here
+            await asyncio.wait([future])
+
+            # A render dropped before it was queued is asked for again
+            if not future.cancelled():
+                return future.result()
+
+    async def _submit_(self, key, spec):
+        """
+        Internal method queueing a new render, waiting for room in the queue
+
+        Parameters
+        ----------
+        key : string
+            specKey of the spec.
+        spec : dict
+            Pattern spec.
+
+        Returns
+        -------
+        asyncio.Future
+            Future of the render's bytes.
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        # Errors are raised to callers, and need not be reported if none wait
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._pending[key] = future
+        try:
+            await self._queue.put((key, spec, future))
+        except BaseException:
+            del self._pending[key]
+            future.cancel()
+            raise
+        self.renders += 1
+        return future
+
+    async def _work_(self):
+        """
+        Internal method, one per worker, running queued renders in the
+        executor
+
+        Returns
+        -------
+        None.
+
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            key, spec, future = await self._queue.get()
+            try:
+                data = await loop.run_in_executor(self.executor, self.renderer, spec)
+                if not future.done():
+                    future.set_result(data)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            finally:
+                self._pending.pop(key, None)
+                self._queue.task_done()
+
+    async def close(self):
+        """
+        Waits for the queued renders, then stops the workers and the process
+        pool
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._tasks is None:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = None
+        if self._ownExecutor:
+            self.executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+async def _client_(requests, distinct, workers, fmt):
+    """
+    Internal function acting as a local client, making many requests at once
+    for a few distinct patterns
+
+    Parameters
+    ----------
+    requests : int
+        Number of requests.
+    distinct : int
+        Number of different patterns requested.
+    workers : int
+        Worker processes of the service.
+    fmt : string
+        Format of the patterns.
+
+    Returns
+    -------
+    None.
+
+    """
+    specs = [{'grid': [60, 60], 'quant': 10, 'thresh': [40, 60], 'seed': seed, 'format': fmt}
+             for seed in range(distinct)]
+
+    start = time.perf_counter()
+    async with renderService(workers=workers) as service:
+        results = await asyncio.gather(*(service.render(specs[i % distinct])
+                                         for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    sizes = sorted({len(data) for data in results})
+    print(f'{service.requests} requests, {service.renders} renders in {elapsed:.2f}s, '
+          f'{fmt} of {sizes[0]} to {sizes[-1]} bytes')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=100, help='concurrent requests')
+    parser.add_argument('--distinct', type=int, default=4, help='different patterns requested')
+    parser.add_argument('--workers', type=int, help='worker processes, default one per core')
+    parser.add_argument('--format', choices=FORMATS, default='png', help='file type rendered')
+    args = parser.parse_args(argv)
+
+    asyncio.run(_client_(args.requests, max(1, args.distinct), args.workers, args.format))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Tiled output of hitomezashi patterns which are too large to hold as one
+canvas
+
+Each tile is rendered on its own with hitomezashi.renderRegion, straight from
+the start states of the blocks, and written out before the next one is
+started. Peak memory is set by the tile size, not the pattern size
+
+savePyramid builds a Deep Zoom tile pyramid in the same way, for viewing huge
+patterns in a browser
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import parallel
+from frames import formatImage
+
+def tileBoxes(width, height, tileSize):
+    """
+    Splits a canvas into tiles, row by row
+
+    Parameters
+    ----------
+    width : int
+        Canvas width in pixels.
+    height : int
+        Canvas height in pixels.
+    tileSize : int
+        Width and height of a tile in pixels. Tiles on the right and bottom
+        edges may be smaller.
+
+    Yields
+    ------
+    tuple
+        (col, row, (x0, y0, x1, y1)) for each tile.
+
+    """
+    for row, y0 in enumerate(range(0, height, tileSize)):
+        for col, x0 in enumerate(range(0, width, tileSize)):
+            yield col, row, (x0, y0, min(x0 + tileSize, width), min(y0 + tileSize, height))
+
+def saveTiles(cloth, folder, tileSize=1024, fmt='png'):
+    """
+    Renders a cloth tile by tile into a folder of images, together with an
+    index.json describing the layout. Tiles are named '{col}_{row}.{fmt}'
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth to be rendered, typically created with tiled=True.
+    folder : string
+        Directory into which to save the tiles.
+    tileSize : int, optional
+        Width and height of a tile in pixels. The default is 1024.
+    fmt : string, optional
+        Image format of the tiles. The default is 'png'.
+
+    Returns
+    -------
+    dict
+        The index written to index.json.
+
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    width = int(np.ceil(cloth.drawWidth))
+    height = int(np.ceil(cloth.drawHeight))
+
+    index = {
+        'width': width,
+        'height': height,
+        'tileSize': tileSize,
+        'columns': -(-width // tileSize),
+        'rows': -(-height // tileSize),
+        'format': fmt,
+        'tiles': [],
+        }
+
+    for col, row, box in tileBoxes(width, height, tileSize):
+        name = f'{col}_{row}.{fmt}'
+        formatImage(cloth.renderRegion(*box), fmt).save(os.path.join(folder, name))
+        index['tiles'].append({'file': name, 'col': col, 'row': row, 'box': list(box)})
+
+    with open(os.path.join(folder, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=1)
+
+    return index
+
+def _renderTile_(job):
+    """
+    Renders one full resolution tile in a worker process
+
+    Parameters
+    ----------
+    job : tuple
+        (box, path) of the tile.
+
+    Returns
+    -------
+    None.
+
+    """
+    box, path = job
+    fmt = os.path.splitext(path)[1].lstrip('.')
+    formatImage(parallel._workerCloth.renderRegion(*box), fmt).save(path)
+
+def _reduceTile_(job):
+    """
+    Builds one tile by halving the (up to) four tiles beneath it in the
+    level above
+
+    Parameters
+    ----------
+    job : tuple
+        (childFolder, path, col, row, size, tileSize, fmt) of the tile.
+
+    Returns
+    -------
+    None.
+
+    """
+    childFolder, path, col, row, size, tileSize, fmt = job
+
+    combined = Image.new('RGB', (2*tileSize, 2*tileSize))
+    width = height = 0
+    for dy in (0, 1):
+        for dx in (0, 1):
+            childPath = os.path.join(childFolder, f'{2*col + dx}_{2*row + dy}.{fmt}')
+            if os.path.exists(childPath):
+                with Image.open(childPath) as child:
+                    combined.paste(child, (dx*tileSize, dy*tileSize))
+                    width = max(width, dx*tileSize + child.width)
+                    height = max(height, dy*tileSize + child.height)
+
+    combined.crop((0, 0, width, height)).resize(size, Image.BOX).save(path)
+
+def savePyramid(cloth, folder, name='pattern', tileSize=256, fmt='png', workers=None):
+    """
+    Exports a cloth as a Deep Zoom (DZI) tile pyramid for web viewers. The
+    full resolution level is rendered tile by tile from the pattern
+    definition, and each lower level is made by halving the level above, so
+    no full size image is ever held. Tiles within a level are made in
+    parallel
+
+    Writes {name}.dzi and {name}_files/{level}/{col}_{row}.{fmt}
+
+    Parameters
+    ----------
+    cloth : hitomezashi.hitomezashi
+        The cloth to be rendered, typically created with tiled=True.
+    folder : string
+        Directory into which to save the pyramid.
+    name : string, optional
+        Name of the pyramid. The default is 'pattern'.
+    tileSize : int, optional
+        Width and height of a tile in pixels. The default is 256.
+    fmt : string, optional
+        Image format of the tiles. The default is 'png'.
+    workers : int, optional
+        Number of worker processes. The default is None, one per core.
+
+    Returns
+    -------
+    int
+        The number of the full resolution level.
+
+    """
+    width = int(np.ceil(cloth.drawWidth))
+    height = int(np.ceil(cloth.drawHeight))
+    maxLevel = int(np.ceil(np.log2(max(width, height, 2))))
+    tileFolder = os.path.join(folder, f'{name}_files')
+
+    def levelFolder(level):
+        path = os.path.join(tileFolder, str(level))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=parallel._setWorkerCloth_,
+                             initargs=(cloth,)) as pool:
+
+        # Full resolution tiles come from the pattern definition
+        path = levelFolder(maxLevel)
+        jobs = [(box, os.path.join(path, f'{col}_{row}.{fmt}'))
+                for col, row, box in tileBoxes(width, height, tileSize)]
+        list(pool.map(_renderTile_, jobs, chunksize=16))
+
+        # Every other level halves the one above, until one pixel remains
+        for level in range(maxLevel - 1, -1, -1):
+            scale = 2**(maxLevel - level)
+            levelWidth = -(-width // scale)
+            levelHeight = -(-height // scale)
+            childFolder = os.path.join(tileFolder, str(level + 1))
+            path = levelFolder(level)
+
+            jobs = [(childFolder, os.path.join(path, f'{col}_{row}.{fmt}'), col, row,
+                     (box[2] - box[0], box[3] - box[1]), tileSize, fmt)
+                    for col, row, box in tileBoxes(levelWidth, levelHeight, tileSize)]
+            list(pool.map(_reduceTile_, jobs, chunksize=16))
+
+    with open(os.path.join(folder, f'{name}.dzi'), 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+                f'TileSize="{tileSize}" Overlap="0" Format="{fmt}">\n'
+                f'  <Size Width="{width}" Height="{height}"/>\n'
+                '</Image>\n')
+
+    return maxLevel
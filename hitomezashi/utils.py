@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for generating the inputs to hitomezashi patterns
+"""
+import numpy as np
+
+def genStarts(sideLen=50, modulo=7, cutOff=4):
+    """
+    
+
+    Parameters
+    ----------
+    sideLen : int, optional
+        The number of points per side. The default is 50.
+    modulo : int, optional
+        Numerical base. The default is 7.
+    cutOff : int, optional
+        Threshold to choose 1 or 0.
+        If cutOff >= modulo then none will be set to 1
+        The default is 4.
+
+    Returns
+    -------
+    numpy array of int
+        1s and 0s, one start state per point.
+
+    """
+    
+    # Create a pattern of numbers
+    starts = np.linspace(1, sideLen, sideLen)%modulo
+
+    # Convert to boolean according to some rule
+    starts = starts > cutOff
+
+    # Convert to int for 1s and 0s
+    return(starts.astype(int))
+
+def randStarts(length, thresh, n=None, seed=None):
+    """
+    Random start states, as used by stitch_blocks with 'rand' logic. Each
+    state is floor(u/thresh) for u drawn uniformly from [0, 100), so roughly
+    thresh percent of the states are 0 when thresh is over 50
+
+    Parameters
+    ----------
+    length : int
+        The number of points per side.
+    thresh : float
+        Threshold, in percent, dividing the random numbers.
+    n : int, optional
+        Number of patterns to generate at once. The default is None, which
+        gives a single side.
+    seed : int, numpy SeedSequence or Generator, optional
+        Source of the random numbers. The same int or SeedSequence always
+        gives the same states. The default is None, which draws fresh
+        entropy from the operating system.
+
+    Returns
+    -------
+    numpy array of int
+        (length,) start states, or (n, length) with one row per pattern.
+
+    """
+    rng = np.random.default_rng(seed)
+    shape = length if n is None else (n, length)
+    return np.floor(rng.uniform(low=0, high=100, size=shape)/thresh).astype(np.int64)
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup of the tests. The modules of hitomezashi/ import each other by
+name, so the folder goes on the path as it does when running them as scripts
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'hitomezashi'))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Animations written frame by frame read back as the frames given, storing only
+the box of each frame which changed
+"""
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from animation import animationWriter, changedBox, writeAnimation
+
+def frames():
+    # A blue square growing across a white frame, then one frame unchanged
+    pixels = np.full((30, 40, 3), 255, dtype=np.uint8)
+    out = [pixels.copy()]
+    for i in range(4):
+        pixels[5:10 + 3*i, 6:12 + 4*i] = (0, 0, 255)
+        out.append(pixels.copy())
+    out.append(pixels.copy())
+    return out
+
+def chunks(path):
+    # Every (type, data) chunk of a png file
+    with open(path, 'rb') as file:
+        data = file.read()
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos+8])
+        yield kind, data[pos+8:pos+8+length]
+        pos += 12 + length
+
+def readBack(path):
+    with Image.open(path) as image:
+        out = []
+        for i in range(image.n_frames):
+            image.seek(i)
+            out.append((np.asarray(image.convert('RGB')), image.info.get('duration')))
+        return out
+
+def test_changed_box():
+    given = frames()
+    assert changedBox(given[0], given[1]) == (6, 5, 12, 10)
+    assert changedBox(given[4], given[5]) is None
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_gif(workers, tmp_path):
+    path = str(tmp_path / 'a.gif')
+    assert writeAnimation(path, frames(), workers=workers) == 5
+
+    read = readBack(path)
+    assert len(read) == 5
+    for (pixels, duration), expected in zip(read, frames()):
+        assert np.array_equal(pixels, expected)
+    # The unchanged last frame lengthens the one before it
+    assert [duration for _, duration in read] == [100, 100, 100, 100, 200]
+
+    # Each frame after the first only holds the changed box
+    with Image.open(path) as image:
+        extents = []
+        for i in range(image.n_frames):
+            image.seek(i)
+            image.load()
+            extents.append(tuple(image.dispose_extent))
+    assert extents[1:] == [changedBox(a, b) for a, b in zip(frames()[:4], frames()[1:5])]
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_apng(workers, tmp_path):
+    path = str(tmp_path / 'a.png')
+    assert writeAnimation(path, frames(), workers=workers) == 5
+
+    found = list(chunks(path))
+    kinds = [kind for kind, _ in found]
+    assert kinds[:3] == [b'IHDR', b'acTL', b'fcTL'] and kinds[-1] == b'IEND'
+    actl = dict(found)[b'acTL']
+    assert struct.unpack('>II', actl) == (5, 0)
+
+    # Frame control holds the size and offset of each changed box
+    controls = [struct.unpack('>IIIIIHHBB', data) for kind, data in found if kind == b'fcTL']
+    given = frames()
+    expected = [(0, 0, 40, 30)] + [changedBox(a, b) for a, b in zip(given[:4], given[1:5])]
+    assert [(x, y, x + w, y + h) for _, w, h, x, y, *_ in controls] == expected
+    assert [control[5] for control in controls] == [100, 100, 100, 100, 200]
+
+    read = readBack(path)
+    assert len(read) == 5
+    for (pixels, _), expected in zip(read, given):
+        assert np.array_equal(pixels, expected)
+
+def test_webp(tmp_path):
+    path = str(tmp_path / 'a.webp')
+    assert writeAnimation(path, frames()) == 5
+
+    read = readBack(path)
+    assert len(read) == 5
+    for (pixels, _), expected in zip(read, frames()):
+        assert np.array_equal(pixels, expected)
+    assert read[-1][1] == 200
+
+def test_patches(tmp_path):
+    # Patches give the same file as whole frames
+    given = frames()
+    with animationWriter(str(tmp_path / 'patched.gif'), workers=0) as writer:
+        writer.addFrame(given[0])
+        for previous, frame in zip(given, given[1:]):
+            box = changedBox(previous, frame) or (0, 0, 1, 1)
+            writer.addPatch(frame[box[1]:box[3], box[0]:box[2]], box[:2])
+    writeAnimation(str(tmp_path / 'whole.gif'), given, workers=0)
+    assert (tmp_path / 'patched.gif').read_bytes() == (tmp_path / 'whole.gif').read_bytes()
+
+    with pytest.raises(ValueError):
+        animationWriter(str(tmp_path / 'a.gif'), workers=0).addPatch(given[0], (0, 0))
+
+def test_bad_frames(tmp_path):
+    with pytest.raises(ValueError):
+        animationWriter(str(tmp_path / 'a.mp4'))
+    with pytest.raises(ValueError):
+        with animationWriter(str(tmp_path / 'a.gif'), workers=0) as writer:
+            writer.addFrame(np.zeros((30, 40, 3), dtype=np.uint8))
+            writer.addFrame(np.zeros((20, 40, 3), dtype=np.uint8))
+
+@pytest.mark.parametrize('by', ['row', None])
+def test_cloth_animation_is_quiet(by, tmp_path, capsys):
+    import geometries
+    (tmp_path / 'test').mkdir()
+    cloth = geometries.squareCloth('test', grid=(8, 6), quant=5, savePathBase=str(tmp_path))
+    if by is None:
+        # Saved frames collated afterwards
+        cloth.defineMode('rand', 'test', thresh=[40, 60], seed=1)
+        cloth.saveFrame(cloth.modes['test'])
+        cloth.modes['test'].makeGif()
+    else:
+        cloth.defineMode('rand', 'test', thresh=[40, 60], seed=1, animate=by)
+    assert capsys.readouterr().out == ''
+    assert list(tmp_path.rglob('*.gif'))
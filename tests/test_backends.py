@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+The pil and numpy backends draw the same pixels
+"""
+import numpy as np
+import pytest
+
+import geometries
+
+FILL = ((255, 255, 255), (200, 200, 255))
+
+def render(cls, backend, thresh, fill=None, **kwargs):
+    cloth = cls('test', quant=5, backend=backend, **kwargs)
+    cloth.defineMode('rand', 'test', thresh=thresh, seed=7, fill=fill, save=False)
+    return cloth
+
+@pytest.mark.parametrize('grid', [(1, 1), (7, 3), (40, 30)])
+def test_square(grid):
+    pil = render(geometries.squareCloth, 'pil', [40, 60], grid=grid)
+    numpy = render(geometries.squareCloth, 'numpy', [40, 60], grid=grid)
+    assert np.array_equal(np.asarray(pil.getImage()), np.asarray(numpy.getImage()))
+
+def test_square_filled():
+    pil = render(geometries.squareCloth, 'pil', [40, 60], fill=FILL, grid=(40, 30))
+    numpy = render(geometries.squareCloth, 'numpy', [40, 60], fill=FILL, grid=(40, 30))
+    assert np.array_equal(np.asarray(pil.getImage()), np.asarray(numpy.getImage()))
+
+@pytest.mark.parametrize('grid, slope', [((10, 9), 0.5), ((41, 30), 0.5), ((30, 20), 0.8)])
+def test_triangle(grid, slope):
+    pil = render(geometries.triangleCloth, 'pil', [30, 50, 70], grid=grid, slope=slope)
+    numpy = render(geometries.triangleCloth, 'numpy', [30, 50, 70], grid=grid, slope=slope)
+    assert np.array_equal(np.asarray(pil.getImage()), np.asarray(numpy.getImage()))
+
+def test_stitches_drawn():
+    # Guards against both backends drawing nothing
+    pixels = np.asarray(render(geometries.squareCloth, 'numpy', [40, 60], grid=(20, 20)).getImage())
+    assert (pixels == (0, 0, 255)).all(axis=2).any()
+
+def test_default_backend(tmp_path):
+    # Square and triangle cloths draw with numpy unless asked otherwise
+    assert geometries.squareCloth('test').backend == 'numpy'
+    assert geometries.triangleCloth('test').backend == 'numpy'
+
+    from batch import renderSpec
+    result = renderSpec({'grid': [10, 10], 'quant': 5, 'thresh': [40, 60], 'seed': 1, 'output': str(tmp_path / 'out.png')})
+    assert result['ok'], result['error']
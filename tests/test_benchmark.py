@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark cases measure their memory from before the first run
+"""
+import itertools
+
+import pytest
+
+import benchmark
+
+@pytest.mark.parametrize('operation', ['stitches', 'save'])
+def test_base_rss_before_first_run(monkeypatch, operation):
+    # Each reading is higher than the last, as peak RSS is
+    readings = itertools.count(1)
+    monkeypatch.setattr(benchmark, 'peakRSS', lambda: float(next(readings)))
+
+    case = {'geometry': 'square', 'size': 20, 'backend': 'numpy', 'operation': operation,
+            'quant': 2, 'seed': 0, 'repeat': 3}
+    result = benchmark.runCase(case)
+    assert result['status'] == 'ok'
+    assert result['baseRSS'] == 1
+    assert result['peakRSS'] == 2
+    assert result['best'] <= result['median']
+    assert result['segments'] > 0
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Packed start states behave like the arrays of 0s and 1s they replace, across
+word boundaries and at lengths which are not whole words
+"""
+import numpy as np
+import pytest
+
+from bits import WORD, packedStarts, unpackMasks
+
+LENGTHS = (0, 1, 63, 64, 65, 127, 128, 200)
+
+def values(length, seed=0):
+    return np.random.default_rng(seed).integers(0, 5, length)
+
+def parityMasks(starts, first, count):
+    # Stitch n of a line is 'on' when (start + n) % 2 == 1
+    return (np.asarray(starts)[:, None] + first + np.arange(count)) % 2 == 1
+
+@pytest.mark.parametrize('index', [62, 63, 64, 65])
+def test_set_and_toggle_across_words(index):
+    starts = packedStarts(np.zeros(130, dtype=int))
+    expected = np.zeros(130, dtype=np.uint8)
+
+    starts[index] = 3
+    expected[index] = 1
+    assert np.array_equal(np.asarray(starts), expected)
+    assert starts[index] == 1
+
+    starts.toggle(index)
+    expected[index] = 0
+    assert np.array_equal(np.asarray(starts), expected)
+
+    # Only the one bit moves, in a word of set bits too
+    starts = packedStarts(np.ones(130, dtype=int))
+    starts[index] = 0
+    starts.toggle(index + 1)
+    expected = np.ones(130, dtype=np.uint8)
+    expected[[index, index + 1]] = 0
+    assert np.array_equal(np.asarray(starts), expected)
+    assert starts[-130 + index] == 0
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_lengths(length):
+    data = values(length)
+    starts = packedStarts(data)
+    assert len(starts) == length
+    assert len(starts.words) == -(-length // WORD)
+    assert starts.tolist() == (data % 2).tolist()
+    assert list(starts) == (data % 2).tolist()
+    assert np.array_equal(starts[3:length - 2], data[3:length - 2] % 2)
+
+    # Padding bits stay 0, so equal starts have equal words
+    if length % WORD:
+        assert int(starts.words[-1]) >> (length % WORD) == 0
+    assert starts == packedStarts(data + 2)
+
+    with pytest.raises(IndexError):
+        starts[length]
+    with pytest.raises(IndexError):
+        starts.toggle(-length - 1)
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_bytes_round_trip(length):
+    starts = packedStarts(values(length, 1))
+    data = starts.tobytes()
+    assert len(data) == -(-length // 8)
+    assert data == np.packbits(np.asarray(starts), bitorder='little').tobytes()
+
+    copy = packedStarts.fromBytes(data, length)
+    assert copy == starts
+    assert copy.tobytes() == data
+
+    # Stray bits past the last line are dropped
+    if length % 8:
+        dirty = bytearray(data)
+        dirty[-1] |= 0xFF << (length % 8) & 0xFF
+        assert packedStarts.fromBytes(bytes(dirty), length) == starts
+
+@pytest.mark.parametrize('length', (1, 64, 65, 130))
+@pytest.mark.parametrize('first', (0, 1, 4, 7))
+@pytest.mark.parametrize('count', (0, 1, 63, 64, 65, 150))
+def test_masks_match_parity(length, first, count):
+    data = values(length, 2)
+    starts = packedStarts(data)
+    expected = parityMasks(data, first, count)
+
+    masks = starts.lineMasks(first=first, count=count)
+    assert masks.shape == (length, -(-count // WORD))
+    assert np.array_equal(unpackMasks(masks, count), expected)
+
+    # Bits past count are 0
+    if count % WORD:
+        assert not np.any(masks[:, -1] >> np.uint64(count % WORD))
+
+    line, stitch = starts.onStitches(first=first, count=count)
+    on = np.nonzero(expected)
+    assert np.array_equal(line, on[0])
+    assert np.array_equal(stitch, on[1])
+
+@pytest.mark.parametrize('start, stop', [(0, 1), (60, 70), (63, 65), (64, 130), (100, None)])
+def test_masks_of_a_run(start, stop):
+    data = values(130, 3)
+    starts = packedStarts(data)
+    expected = parityMasks(data[start:stop], 3, 70)
+
+    assert np.array_equal(starts.unpack(start, stop), data[start:stop] % 2)
+    assert np.array_equal(unpackMasks(starts.lineMasks(start, stop, 3, 70), 70), expected)
+    line, stitch = starts.onStitches(start, stop, 3, 70)
+    assert np.array_equal(np.stack([line, stitch]), np.stack(np.nonzero(expected)))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+The render cache hands back a file only for the same rendered output
+"""
+import os
+
+import geometries
+import hitomezashi as hit
+from batch import renderSpec
+from cache import renderCache
+
+FILL = ((255, 0, 0), (0, 255, 0))
+TILES = [{'geometry': 'square', 'grid': (10, 10)}, {'geometry': 'square', 'grid': (10, 10)}]
+
+def mosaic(folder, modeName, cache, **kwargs):
+    os.makedirs(os.path.join(folder, modeName), exist_ok=True)
+    cloth = geometries.mosaicCloth('m', TILES, savePathBase=folder, quant=10)
+    cloth.defineMode('rand', modeName, thresh=[50, 50], seed=1, cache=cache, workers=1, **kwargs)
+    return cloth
+
+def frame(cloth, modeName):
+    mode = cloth.modes[modeName]
+    with open(os.path.join(mode.saveFolder, f'Frame {mode.ct}.{mode.frames.ext}'), 'rb') as file:
+        return file.read()
+
+def test_mosaic_fill_is_keyed(tmp_path):
+    cache = renderCache(str(tmp_path / 'cache'))
+    plain = mosaic(str(tmp_path), 'plain', cache)
+    filled = mosaic(str(tmp_path), 'filled', cache, fill=FILL)
+
+    assert filled.cachePath is None
+    assert frame(plain, 'plain') != frame(filled, 'filled')
+
+    # Each is then served from the cache
+    again = mosaic(str(tmp_path), 'again', cache, fill=FILL)
+    assert again.cachePath is not None
+    assert frame(again, 'again') == frame(filled, 'filled')
+
+def test_mosaic_tile_fill_is_keyed(tmp_path):
+    cache = renderCache(str(tmp_path / 'cache'))
+    mosaic(str(tmp_path), 'plain', cache)
+    tiles = [dict(TILES[0], fill=FILL), TILES[1]]
+    os.makedirs(tmp_path / 'tile')
+    cloth = geometries.mosaicCloth('m', tiles, savePathBase=str(tmp_path), quant=10)
+    cloth.defineMode('rand', 'tile', thresh=[50, 50], seed=1, cache=cache, workers=1)
+    assert cloth.cachePath is None
+
+def test_batch_mosaic_fill(tmp_path):
+    spec = {'geometry': 'mosaic', 'tiles': TILES, 'thresh': [50, 50], 'seed': 1,
+            'quant': 10, 'cache': str(tmp_path / 'cache')}
+    plain = renderSpec(dict(spec, output=str(tmp_path / 'plain.png')))
+    filled = renderSpec(dict(spec, output=str(tmp_path / 'filled.png'), fill=FILL))
+    assert plain['ok'] and filled['ok'], (plain['error'], filled['error'])
+    assert (tmp_path / 'plain.png').read_bytes() != (tmp_path / 'filled.png').read_bytes()
+
+def test_square_fill_is_keyed(tmp_path):
+    cache = renderCache(str(tmp_path / 'cache'))
+    for name, fill in (('plain', None), ('filled', FILL)):
+        os.makedirs(tmp_path / name)
+        cloth = geometries.squareCloth('s', grid=(20, 20), quant=5, savePathBase=str(tmp_path))
+        cloth.defineMode('rand', name, thresh=[50, 50], seed=1, cache=cache, fill=fill)
+        assert cloth.cachePath is None
+
+def test_frame_options_are_keyed(tmp_path):
+    cloth = geometries.squareCloth('s', grid=(20, 20), quant=5, savePathBase=str(tmp_path))
+    cloth.defineMode('rand', 'frames', thresh=[50, 50], seed=1, save=False)
+    mode = cloth.modes['frames']
+    os.makedirs(mode.saveFolder)
+    cache = renderCache(str(tmp_path / 'cache'))
+
+    def save(quality):
+        mode.setFrameFormat('jpg', quality=quality)
+        path = cloth.fetchCached(cache, mode)
+        if path is None:
+            cache.put(cloth.cacheKey, cloth.saveFrame(mode), mode.frames.ext)
+        return path, frame(cloth, 'frames')
+
+    (lowPath, low), (highPath, high), (againPath, again) = save(20), save(95), save(20)
+    assert lowPath is None and highPath is None
+    assert low != high
+    assert againPath is not None and again == low
+
+def test_canvas_mode_is_keyed(tmp_path):
+    cache = renderCache(str(tmp_path / 'cache'))
+    for name, canvasMode in (('rgb', 'RGB'), ('bilevel', '1')):
+        os.makedirs(tmp_path / name)
+        cloth = geometries.squareCloth('s', grid=(20, 20), quant=5, savePathBase=str(tmp_path),
+                                       canvasMode=canvasMode)
+        cloth.defineMode('rand', name, thresh=[50, 50], seed=1, cache=cache)
+        assert cloth.cachePath is None
+
+def test_hit_makes_no_canvas(tmp_path, monkeypatch):
+    cache = renderCache(str(tmp_path / 'cache'))
+    os.makedirs(tmp_path / 'first')
+    cloth = geometries.squareCloth('s', grid=(20, 20), quant=5, savePathBase=str(tmp_path))
+    cloth.defineMode('rand', 'first', thresh=[50, 50], seed=1, cache=cache)
+    mosaic(str(tmp_path), 'plain', cache)
+
+    def createCanvas(self):
+        raise AssertionError('a cache hit created a canvas')
+    monkeypatch.setattr(hit.hitomezashi, '_createCanvas_', createCanvas)
+
+    os.makedirs(tmp_path / 'again')
+    again = geometries.squareCloth('s', grid=(20, 20), quant=5, savePathBase=str(tmp_path))
+    again.defineMode('rand', 'again', thresh=[50, 50], seed=1, cache=cache)
+    assert again.cachePath is not None and again.canvas is None
+    assert frame(again, 'again') == frame(cloth, 'first')
+
+    assert mosaic(str(tmp_path), 'mosaic', cache).cachePath is not None
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+The command line renderer checks specs against the formats batch renders
+"""
+import json
+
+import numpy as np
+from PIL import Image
+
+import cli
+import service
+
+def test_formats_are_shared():
+    assert service.FORMATS is cli.FORMATS
+    assert 'webp' in cli.FORMATS
+
+def test_validate_outputs():
+    for ext in cli.FORMATS + ('jpeg',):
+        assert cli.validateSpec({'output': f'a.{ext}', 'thresh': [40, 60]}) == []
+    assert cli.validateSpec({'output': 'a.gif', 'thresh': [40, 60]})
+
+def test_webp_format(tmp_path):
+    manifest = tmp_path / 'specs.json'
+    manifest.write_text(json.dumps([{'output': 'a.png', 'grid': [10, 10], 'quant': 5,
+                                     'thresh': [40, 60], 'seed': 1}]))
+    assert cli.main([str(manifest), '--format', 'webp', '--quiet']) == 0
+    with Image.open(tmp_path / 'a.webp') as image:
+        assert image.format == 'WEBP'
+        assert (np.asarray(image.convert('RGB')) == (0, 0, 255)).all(axis=2).any()
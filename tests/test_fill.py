@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Regions are only filled on square grids, and other geometries refuse a fill
+before drawing anything
+"""
+import pytest
+
+import geometries
+from batch import renderSpec
+from cli import validateSpec
+
+FILL = ((255, 255, 255), (200, 200, 255))
+
+@pytest.mark.parametrize('cls', [geometries.triangleCloth, geometries.hexCloth])
+def test_fill_rejected(cls):
+    cloth = cls('test', quant=5, grid=(20, 18))
+    with pytest.raises(ValueError, match='square'):
+        cloth.defineMode('rand', 'test', thresh=[30, 50, 70], fill=FILL, save=False)
+
+@pytest.mark.parametrize('cls', [geometries.triangleCloth, geometries.hexCloth])
+def test_region_animation_rejected(cls):
+    cloth = cls('test', quant=5, grid=(20, 18))
+    with pytest.raises(ValueError, match='square'):
+        cloth.defineMode('rand', 'test', thresh=[30, 50, 70], animate='region')
+
+@pytest.mark.parametrize('cls', [geometries.triangleCloth, geometries.hexCloth])
+def test_regions_rejected(cls):
+    cloth = cls('test', quant=5, grid=(20, 18))
+    cloth.defineMode('rand', 'test', thresh=[30, 50, 70], save=False)
+    with pytest.raises(ValueError, match='square'):
+        cloth.labelRegions(cloth.blocks['A'])
+    with pytest.raises(ValueError, match='square'):
+        cloth.fillRegions(cloth.blocks['A'], FILL)
+
+def test_mosaic_tile_fill_rejected():
+    tiles = [{'geometry': 'square', 'grid': (10, 10)},
+             {'geometry': 'hex', 'grid': (10, 10), 'thresh': [30, 50, 70], 'fill': FILL}]
+    cloth = geometries.mosaicCloth('test', tiles, quant=5)
+    with pytest.raises(ValueError, match='square'):
+        cloth.defineMode('rand', 'test', thresh=[40, 60], save=False, workers=1)
+
+def test_mosaic_fill_skips_other_tiles():
+    tiles = [{'geometry': 'square', 'grid': (10, 10)},
+             {'geometry': 'triangle', 'grid': (10, 10), 'thresh': [30, 50, 70]}]
+    cloth = geometries.mosaicCloth('test', tiles, quant=5)
+    cloth.defineMode('rand', 'test', thresh=[40, 60], fill=FILL, save=False, workers=1)
+    assert cloth.blocks['0_0'].regions is not None
+    assert cloth.blocks['1_0'].regions is None
+
+def test_spec_validation():
+    spec = {'output': 'out.png', 'thresh': [30, 50, 70], 'fill': FILL}
+    assert validateSpec(dict(spec, geometry='square')) == []
+    assert validateSpec(dict(spec, geometry='triangle')) == ['fill needs a square geometry, not triangle']
+    assert validateSpec(dict(spec, geometry='hex')) == ['fill needs a square geometry, not hex']
+
+    mosaic = {'output': 'out.png', 'geometry': 'mosaic', 'thresh': [30, 50, 70], 'fill': FILL,
+              'tiles': [{'geometry': 'hex'}, {'geometry': 'triangle', 'fill': FILL}]}
+    assert validateSpec(mosaic) == ['tile 2: fill needs a square geometry, not triangle']
+
+def test_batch_reports_fill(tmp_path):
+    result = renderSpec({'output': str(tmp_path / 'tri.png'), 'geometry': 'triangle',
+                         'thresh': [30, 50, 70], 'fill': FILL})
+    assert not result['ok']
+    assert 'ValueError' in result['error']
+    assert not (tmp_path / 'tri.png').exists()
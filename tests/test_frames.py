@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Frames read back exactly from the lossless formats, and background writers
+hold few frames and raise what went wrong
+"""
+import pickle
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import frames
+from frames import frameWriter, readFrame, writeFrame
+
+def pattern(colours=3):
+    # A line drawing in a few colours, or noise in many
+    if colours > 256:
+        return np.random.default_rng(0).integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    pixels = np.full((30, 40, 3), 255, dtype=np.uint8)
+    pixels[::5] = (0, 0, 255)
+    if colours > 2:
+        pixels[2:4, 3:30] = (200, 200, 255)
+    return pixels
+
+def test_png_palette(tmp_path):
+    path = str(tmp_path / 'a.png')
+    writeFrame(pattern(), path, 'png')
+    with readFrame(path) as image:
+        assert image.mode == 'P'
+        assert len(image.getcolors()) == 3
+        assert np.array_equal(np.asarray(image.convert('RGB')), pattern())
+
+    # Too many colours for a palette are saved as they are
+    writeFrame(pattern(1000), path, 'png')
+    with readFrame(path) as image:
+        assert image.mode == 'RGB'
+        assert np.array_equal(np.asarray(image), pattern(1000))
+
+def test_png_canvas_modes(tmp_path):
+    # Palette and bilevel canvases are saved without expanding them
+    path = str(tmp_path / 'a.png')
+    for mode in ('P', '1'):
+        image = frames.paletteImage(Image.fromarray(pattern(2))).convert(mode)
+        writeFrame(image, path, 'png')
+        with readFrame(path) as read:
+            assert read.mode == mode
+            assert np.array_equal(np.asarray(read.convert('RGB')), np.asarray(image.convert('RGB')))
+
+@pytest.mark.parametrize('colours', [3, 1000])
+def test_webp_lossless(colours, tmp_path):
+    path = str(tmp_path / 'a.webp')
+    # Palette images are expanded first
+    writeFrame(frames.paletteImage(Image.fromarray(pattern(colours))), path, 'webp')
+    with readFrame(path) as image:
+        assert image.format == 'WEBP'
+        assert np.array_equal(np.asarray(image.convert('RGB')), pattern(colours))
+
+def test_raw(tmp_path):
+    path = str(tmp_path / 'a.npy')
+    assert writeFrame(pattern(1000), path, 'raw') == (tmp_path / 'a.npy').stat().st_size
+    assert np.array_equal(np.load(path), pattern(1000))
+    assert np.array_equal(np.asarray(readFrame(path)), pattern(1000))
+
+    # Palette images are stored as RGB pixels
+    writeFrame(frames.paletteImage(Image.fromarray(pattern())), path, 'raw')
+    assert np.array_equal(np.load(path), pattern())
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        frameWriter('tiff')
+
+def test_background_holds_two_frames(tmp_path, monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def slowWrite(image, path, fmt, **options):
+        started.append(path)
+        release.wait(5)
+        return writeFrame(image, path, fmt, **options)
+    monkeypatch.setattr(frames, 'writeFrame', slowWrite)
+
+    writer = frameWriter('png', background=True)
+    sizes = []
+    canvas = pattern()
+    for i in range(2):
+        writer.write(canvas, str(tmp_path / f'{i}.png'), sizes.append)
+    assert len(writer._pending) == 2
+
+    # A third frame waits for the oldest to be written, so no more than two
+    # are ever in flight
+    third = threading.Thread(target=writer.write, args=(canvas, str(tmp_path / '2.png'), sizes.append))
+    third.start()
+    time.sleep(0.1)
+    assert third.is_alive()
+    assert len(writer._pending) == 1 and started == [str(tmp_path / '0.png')]
+
+    # Frames are copied once write returns, so drawing on goes unseen
+    release.set()
+    third.join(5)
+    canvas[...] = 0
+    writer.close()
+
+    assert len(sizes) == 3 and all(sizes)
+    assert started == [str(tmp_path / f'{i}.png') for i in range(3)]
+    for i in range(3):
+        with readFrame(str(tmp_path / f'{i}.png')) as image:
+            assert np.array_equal(np.asarray(image.convert('RGB')), pattern())
+
+def test_errors_raised(tmp_path, monkeypatch):
+    def badWrite(image, path, fmt, **options):
+        raise OSError('disk full')
+    monkeypatch.setattr(frames, 'writeFrame', badWrite)
+
+    writer = frameWriter('png', background=True)
+    writer.write(pattern(), str(tmp_path / 'a.png'))
+    with pytest.raises(OSError, match='disk full'):
+        writer.close()
+
+    with pytest.raises(OSError, match='disk full'):
+        frameWriter('png').write(pattern(), str(tmp_path / 'a.png'))
+
+def test_pickled_writer_is_foreground():
+    writer = pickle.loads(pickle.dumps(frameWriter('webp', background=True, quality=90)))
+    assert writer._pool is None and not writer.background
+    assert (writer.fmt, writer.ext, writer.options) == ('webp', 'webp', {'quality': 90})
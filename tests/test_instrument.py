@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Render stats count every stitch position once, as drawn or skipped, and a
+cloth without stats records nothing
+"""
+import os
+
+import numpy as np
+import pytest
+
+import geometries
+from instrument import NOPHASE, renderStats
+
+def cloth(geometry, stats=None, grid=None, **kwargs):
+    if geometry == 'square':
+        cloth = geometries.squareCloth('test', quant=5, grid=grid or (14, 11), **kwargs)
+    elif geometry == 'triangle':
+        cloth = geometries.triangleCloth('test', quant=5, grid=grid or (12, 14), **kwargs)
+    else:
+        cloth = geometries.hexCloth('test', quant=5, **kwargs)
+    if stats is not None:
+        cloth.enableStats(stats)
+    cloth.defineMode('rand', 'test', thresh=[50, 50, 50], seed=3, save=False)
+    return cloth
+
+def onStitches(starts, count):
+    # Stitch n of a line is 'on' when (start + n) % 2 == 1
+    return int(((np.asarray(starts)[:, None] + np.arange(count)) % 2).sum())
+
+@pytest.mark.parametrize('geometry', ['square', 'triangle', 'hex'])
+def test_stitch_counts(geometry):
+    stats = renderStats()
+    c = cloth(geometry, stats)
+    drawn = sum(len(segs) for block in c.blocks.values() for segs in c.stitchSegments(block))
+    total = sum(c.stitchCount(block) for block in c.blocks.values())
+
+    assert stats.counters['segmentsDrawn'] == drawn
+    assert stats.counters['segmentsDrawn'] + stats.counters['segmentsSkipped'] == total
+    assert 0 < drawn < total
+
+    width, height = int(np.ceil(c.drawWidth)), int(np.ceil(c.drawHeight))
+    assert stats.canvas == (width, height)
+    assert stats.counters['canvasBytes'] == 3*width*height
+    for name in ('starts', 'canvas', 'segments', 'draw'):
+        assert stats.phases[name]['calls'] >= 1
+
+def test_square_counts_match_starts():
+    stats = renderStats()
+    c = cloth('square', stats, grid=(30, 17))
+    block, = c.blocks.values()
+    cols, rows = block.grid[0] - 1, block.grid[1] - 1
+
+    # Sides hold a start per grid point, the last line is not drawn
+    on = onStitches(block.colStarts[:cols], rows) + onStitches(block.rowStarts[:rows], cols)
+
+    assert stats.counters['segmentsDrawn'] == on
+    assert stats.counters['segmentsSkipped'] == 2*cols*rows - on
+    assert stats.phases['draw']['calls'] == 1
+
+def test_frames_and_report(tmp_path):
+    c = cloth('square', renderStats(), savePathBase=str(tmp_path))
+    mode = c.modes['test']
+    os.makedirs(mode.saveFolder)
+    mode.setFrameFormat('png')
+    path = c.saveFrame(mode)
+    svg = c.saveSVG(mode)
+
+    counters = c.stats.counters
+    assert counters['framesSaved'] == 2
+    assert counters['bytesWritten'] == os.path.getsize(path) + os.path.getsize(svg)
+    assert c.stats.phases['encode']['calls'] == 2
+
+    # The report has a line for the canvas, each phase and each counter
+    assert len(c.stats.report().splitlines()) == 1 + len(c.stats.phases) + len(counters)
+    record = c.stats.asDict()
+    record['phases']['encode']['calls'] = 0
+    assert c.stats.phases['encode']['calls'] == 2
+
+def test_hook():
+    calls = []
+    c = geometries.squareCloth('test', quant=5, grid=(14, 11))
+    stats = c.enableStats(hook=lambda name, seconds, stats: calls.append((name, stats)))
+    c.defineMode('rand', 'test', thresh=[50, 50], seed=3, save=False)
+    assert calls
+    assert all(got is stats for _, got in calls)
+    assert sum(entry['calls'] for entry in stats.phases.values()) == len(calls)
+
+def test_no_stats_left_behind(monkeypatch):
+    # Nothing is timed without stats, and no stats object is ever made
+    def fail(*args, **kwargs):
+        raise AssertionError('stats were recorded')
+    monkeypatch.setattr(renderStats, 'phase', fail)
+    monkeypatch.setattr(renderStats, 'count', fail)
+
+    for geometry in ('square', 'triangle', 'hex'):
+        c = cloth(geometry)
+        assert c.stats is None
+        assert c._phase_('draw') is NOPHASE
+        with c._phase_('draw'):
+            pass
+
+def test_disable_stats():
+    c = cloth('square', renderStats())
+    stats = c.disableStats()
+    before = stats.asDict()
+    assert c.stats is None
+    assert c._phase_('draw') is NOPHASE
+
+    # Drawing again leaves the old stats as they were
+    for block in c.blocks.values():
+        c.drawStitches(block)
+    assert stats.asDict() == before
+    assert c.disableStats() is None
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering across processes, into a shared canvas or block by block, gives
+the same pixels as a single process
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+import geometries
+from batch import renderSpec
+from parallel import renderBlocks, renderShared, sharedCanvas
+
+TILES = [{'geometry': 'square', 'grid': (20, 20), 'thresh': [40, 60]},
+         {'geometry': 'hex', 'grid': (12, 14), 'thresh': [30, 50, 70]},
+         {'geometry': 'triangle', 'grid': (15, 13), 'thresh': [30, 50, 70]}]
+
+def square(**kwargs):
+    cloth = geometries.squareCloth('test', quant=3, grid=(60, 45), **kwargs)
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=4, save=False)
+    return cloth
+
+def mosaic(**kwargs):
+    cloth = geometries.mosaicCloth('test', TILES, columns=2, quant=3, **kwargs)
+    cloth.defineMode('rand', 'test', seed=4, save=False, workers=1)
+    return cloth
+
+def shared(canvas):
+    return np.asarray(canvas.image('RGBA'))[..., :3].copy()
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bands(workers):
+    full = np.asarray(square().getImage())
+    with renderShared(square(tiled=True), workers=workers, rows=16) as canvas:
+        assert np.array_equal(shared(canvas), full)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_blocks(workers):
+    full = np.asarray(mosaic().getImage())
+    with renderShared(mosaic(tiled=True), workers=workers, by='block') as canvas:
+        assert np.array_equal(shared(canvas), full)
+
+def test_render_blocks_in_processes():
+    cloth = mosaic()
+    full = np.asarray(cloth.getImage()).copy()
+    renderBlocks(cloth, workers=2)
+    assert np.array_equal(np.asarray(cloth.getImage()), full)
+
+def test_canvas_opened_by_name():
+    with sharedCanvas(8, 4, background=(1, 2, 3)) as canvas:
+        other = sharedCanvas(8, 4, name=canvas.name)
+        other.paste(np.full((2, 2, 3), 9, dtype=np.uint8), (3, 1))
+        other.close()
+        assert (shared(canvas)[1:3, 3:5] == 9).all()
+        assert (shared(canvas)[0] == (1, 2, 3)).all()
+
+@pytest.mark.parametrize('ext', ['png', 'jpg', 'bmp'])
+def test_batch_output_matches_single_process(ext, tmp_path):
+    spec = {'grid': [60, 45], 'quant': 3, 'thresh': [40, 60], 'seed': 4}
+    one = renderSpec(dict(spec, output=str(tmp_path / f'one.{ext}')))
+    two = renderSpec(dict(spec, output=str(tmp_path / f'two.{ext}'), workers=2))
+    assert one['ok'] and two['ok'], (one['error'], two['error'])
+
+    with Image.open(tmp_path / f'one.{ext}') as a, Image.open(tmp_path / f'two.{ext}') as b:
+        assert a.mode == b.mode
+        if ext != 'jpg':
+            assert np.array_equal(np.asarray(a.convert('RGB')), np.asarray(b.convert('RGB')))
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_webp_is_lossless(workers, tmp_path):
+    spec = {'grid': [60, 45], 'quant': 3, 'thresh': [40, 60], 'seed': 4, 'workers': workers}
+    result = renderSpec(dict(spec, output=str(tmp_path / 'out.webp')))
+    assert result['ok'], result['error']
+
+    full = np.asarray(square().getImage())
+    with Image.open(tmp_path / 'out.webp') as image:
+        assert np.array_equal(np.asarray(image.convert('RGB')), full)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Cloths written to pattern files come back the same
+"""
+import numpy as np
+import pytest
+
+import geometries
+from patternfile import loadPattern, patternFile, savePattern
+
+FILL = ((255, 255, 255), (200, 200, 255))
+
+def square(**kwargs):
+    cloth = geometries.squareCloth('sq', quant=4, grid=(45, 33))
+    cloth.defineMode('rand', 'sq', thresh=[40, 60], seed=2, save=False, **kwargs)
+    return cloth
+
+def triangle():
+    cloth = geometries.triangleCloth('tri', quant=4, grid=(40, 30), slope=0.6)
+    cloth.defineMode('rand', 'tri', thresh=[30, 50, 70], seed=2, save=False)
+    return cloth
+
+def hexagon():
+    cloth = geometries.hexCloth('hex', quant=4, grid=(30, 24))
+    cloth.defineMode('rand', 'hex', thresh=[30, 50, 70], seed=2, save=False)
+    return cloth
+
+def mosaic():
+    tiles = [{'geometry': 'square', 'grid': (20, 20), 'thresh': [40, 60], 'fill': FILL},
+             {'geometry': 'hex', 'grid': (12, 14), 'thresh': [30, 50, 70]},
+             {'geometry': 'triangle', 'grid': (15, 13), 'thresh': [30, 50, 70]}]
+    cloth = geometries.mosaicCloth('mos', tiles, columns=2, quant=3)
+    cloth.defineMode('rand', 'mos', seed=2, save=False, workers=1)
+    return cloth
+
+@pytest.mark.parametrize('make', [square, lambda: square(fill=FILL), triangle, hexagon, mosaic])
+def test_round_trip(make, tmp_path):
+    cloth = make()
+    path = savePattern(cloth, str(tmp_path / 'pattern.hzp'))
+    loaded = loadPattern(path)
+
+    assert type(loaded) is type(cloth)
+    assert list(loaded.blocks) == list(cloth.blocks)
+    for name, block in cloth.blocks.items():
+        for key, _ in block._sides_():
+            assert np.array_equal(np.asarray(getattr(loaded.blocks[name], key)),
+                                  np.asarray(getattr(block, key)))
+    assert np.array_equal(np.asarray(loaded.getImage()), np.asarray(cloth.getImage()))
+
+def test_tiled_load(tmp_path):
+    cloth = square()
+    path = savePattern(cloth, str(tmp_path / 'pattern.hzp'))
+    tiled = loadPattern(path, tiled=True)
+    assert np.array_equal(np.asarray(tiled.renderRegion(10, 20, 90, 70)),
+                          np.asarray(cloth.getImage())[20:70, 10:90])
+
+def test_toggle_leaves_file(tmp_path):
+    path = savePattern(square(), str(tmp_path / 'pattern.hzp'))
+    before = (tmp_path / 'pattern.hzp').read_bytes()
+    loaded = loadPattern(path)
+    loaded.toggleRowStart(loaded.blocks['A'], 0)
+    assert (tmp_path / 'pattern.hzp').read_bytes() == before
+
+def test_not_a_pattern(tmp_path):
+    path = tmp_path / 'other.hzp'
+    path.write_bytes(b'not a pattern file at all')
+    with pytest.raises(ValueError):
+        patternFile(str(path))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+The render service coalesces identical requests, bounds its queue, and
+passes results, errors and cancellation to the right callers
+"""
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from service import renderService, specKey
+
+class stubRenderer(object):
+    """
+    Stands in for renderBytes, counting renders and taking a little time
+    over each, so that requests overlap
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, spec):
+        with self._lock:
+            self.calls.append(spec['seed'])
+        time.sleep(self.delay)
+        if spec.get('fail'):
+            raise ValueError(f"bad spec {spec['seed']}")
+        return f"pattern {spec['seed']}".encode()
+
+def serve(test, workers=2, queue=2, delay=0.05):
+    # Runs a test coroutine against a service with a stub renderer on threads
+    renderer = stubRenderer(delay)
+    with ThreadPoolExecutor(workers) as executor:
+        async def run():
+            async with renderService(workers=workers, queue=queue, renderer=renderer,
+                                     executor=executor) as service:
+                return await test(service)
+        return asyncio.run(run()), renderer
+
+def test_spec_key():
+    assert specKey({'grid': [5, 5], 'seed': 1}) == specKey({'seed': 1, 'grid': [5, 5], 'format': 'png'})
+    assert specKey({'seed': 1, 'output': 'a.png'}) == specKey({'seed': 1, 'output': 'b/c.png'})
+    assert specKey({'seed': 1, 'format': 'jpg'}) != specKey({'seed': 1, 'format': 'png'})
+    with pytest.raises(ValueError):
+        specKey({'seed': 1, 'format': 'gif'})
+
+def test_spec_key_arrays():
+    starts = np.random.default_rng(1).integers(0, 2, 2000)
+    changed = starts.copy()
+    changed[1000] = 1 - changed[1000]
+    assert specKey({'rowStarts': starts}) != specKey({'rowStarts': changed})
+    assert specKey({'rowStarts': starts}) == specKey({'rowStarts': starts.tolist()})
+    with pytest.raises(ValueError):
+        specKey({'seed': object()})
+
+def test_coalescing():
+    async def test(service):
+        return await asyncio.gather(*(service.render({'seed': i % 5}) for i in range(200))), service
+
+    (results, service), renderer = serve(test)
+    assert results == [f'pattern {i % 5}'.encode() for i in range(200)]
+    assert service.requests == 200
+    assert service.renders == 5
+    assert sorted(renderer.calls) == [0, 1, 2, 3, 4]
+
+def test_later_requests_render_again():
+    async def test(service):
+        first = await service.render({'seed': 1})
+        second = await service.render({'seed': 1})
+        return first, second, service.renders
+
+    (first, second, renders), _ = serve(test)
+    assert first == second and renders == 2
+
+def test_backpressure():
+    async def test(service):
+        largest = 0
+
+        async def watch():
+            nonlocal largest
+            while True:
+                largest = max(largest, service._queue.qsize())
+                await asyncio.sleep(0.002)
+
+        watcher = asyncio.ensure_future(watch())
+        results = await asyncio.gather(*(service.render({'seed': i}) for i in range(20)))
+        watcher.cancel()
+        return results, largest
+
+    (results, largest), renderer = serve(test, workers=2, queue=2, delay=0.01)
+    assert len(results) == 20 and len(renderer.calls) == 20
+    assert largest <= 2
+
+def test_errors_reach_every_caller():
+    async def test(service):
+        return await asyncio.gather(service.render({'seed': 9, 'fail': True}),
+                                    service.render({'seed': 9, 'fail': True}),
+                                    service.render({'seed': 3}),
+                                    return_exceptions=True)
+
+    results, renderer = serve(test)
+    assert [type(result) for result in results[:2]] == [ValueError, ValueError]
+    assert results[2] == b'pattern 3'
+    assert sorted(renderer.calls) == [3, 9]
+
+def test_cancelled_caller_leaves_render():
+    async def test(service):
+        first = asyncio.ensure_future(service.render({'seed': 5}))
+        second = asyncio.ensure_future(service.render({'seed': 5}))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result
+
+    result, renderer = serve(test)
+    assert result == b'pattern 5' and renderer.calls == [5]
+
+def test_cancelled_before_queueing():
+    async def test(service):
+        # Fill the workers and the queue, so the next new spec waits for room
+        busy = [asyncio.ensure_future(service.render({'seed': i})) for i in range(6)]
+        await asyncio.sleep(0.005)
+        first = asyncio.ensure_future(service.render({'seed': 50}))
+        await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(service.render({'seed': 50}))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result, await asyncio.gather(*busy)
+
+    (result, busy), renderer = serve(test)
+    assert result == b'pattern 50' and len(busy) == 6
+    assert renderer.calls.count(50) == 1
+
+def test_closed_service():
+    async def test():
+        service = renderService(workers=1, renderer=stubRenderer(0), executor=ThreadPoolExecutor(1))
+        await service.close()
+        with pytest.raises(RuntimeError):
+            await service.render({'seed': 1})
+        service.executor.shutdown()
+
+    asyncio.run(test())
+
+def test_process_pool_render():
+    spec = {'grid': [30, 20], 'quant': 5, 'thresh': [40, 60], 'seed': 3}
+
+    async def test():
+        async with renderService(workers=2) as service:
+            results = await asyncio.gather(*(service.render(dict(spec, format=fmt))
+                                             for fmt in ('png', 'svg', 'hzp')*3))
+            return results, service.renders
+
+    results, renders = asyncio.run(test())
+    assert renders == 3
+    with Image.open(io.BytesIO(results[0])) as image:
+        assert image.size == (150, 100)
+    assert results[1].startswith(b'<svg')
+    assert results[2].startswith(b'HTMZ')
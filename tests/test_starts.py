@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Start states are sized to the lines they start, and reproducible from a seed,
+with independent streams per side and per pattern
+"""
+import numpy as np
+
+import geometries
+import hitomezashi as hit
+from utils import randStarts
+
+def triangle(logic, grid, **kwargs):
+    cloth = geometries.triangleCloth('test', quant=5, grid=grid)
+    cloth.defineMode(logic, 'test', save=False, **kwargs)
+    return cloth
+
+def test_triangle_alternate_sides():
+    # Triangles have grid[0] - 1 layers, so each side needs grid[0] starts
+    # whatever grid[1] is, as with 'rand' logic
+    for grid in ((12, 4), (12, 12), (6, 20)):
+        cloth = triangle('alternate', grid, firstStates=(0, 1, 0))
+        starts = [np.asarray(cloth.A.baseStarts), np.asarray(cloth.A.leftStarts),
+                  np.asarray(cloth.A.rightStarts)]
+        for first, side in zip((0, 1, 0), starts):
+            assert np.array_equal(side, (np.arange(grid[0]) + first) % 2)
+
+        # The same starts given outright draw the same pattern
+        pattern = triangle('pattern', grid, baseStarts=starts[0], leftStarts=starts[1],
+                           rightStarts=starts[2])
+        assert np.array_equal(np.asarray(cloth.canvas), np.asarray(pattern.canvas))
+
+def square(seed, thresh=(40, 60)):
+    return hit.stitch_block('A', size=(5, 5), start=(0, 0), grid=(30, 20), logic='rand',
+                            thresh=list(thresh), seed=seed)
+
+def sides(block):
+    return [np.asarray(getattr(block, key)) for key, _ in block._sides_()]
+
+def test_same_seed_same_starts():
+    first = sides(square(7))
+    for seed in (7, np.random.SeedSequence(7)):
+        assert all(np.array_equal(a, b) for a, b in zip(first, sides(square(seed))))
+    assert not all(np.array_equal(a, b) for a, b in zip(sides(square(7)), sides(square(8))))
+
+    cloth = triangle('rand', (30, 20), thresh=[30, 50, 70], seed=3)
+    again = triangle('rand', (30, 20), thresh=[30, 50, 70], seed=3)
+    assert all(np.array_equal(a, b) for a, b in zip(sides(cloth.A), sides(again.A)))
+    assert np.array_equal(np.asarray(cloth.canvas), np.asarray(again.canvas))
+
+def test_sides_are_spawned():
+    # Each side draws from its own child of the seed, in order. Only the
+    # parity of a start is kept
+    children = np.random.SeedSequence(11).spawn(2)
+    expected = [randStarts(30, 40, seed=children[0]) % 2, randStarts(20, 60, seed=children[1]) % 2]
+    assert all(np.array_equal(a, b) for a, b in zip(sides(square(11)), expected))
+
+def test_rand_starts_batch():
+    batch = randStarts(500, 50, n=4, seed=5)
+    assert batch.shape == (4, 500)
+    assert set(np.unique(batch)) <= {0, 1}
+    assert np.array_equal(batch, randStarts(500, 50, n=4, seed=5))
+
+    # The rows are different patterns, each about half on
+    assert len({row.tobytes() for row in batch}) == 4
+    assert np.all(np.abs(batch.mean(axis=1) - 0.5) < 0.1)
+    assert np.all(np.abs(np.corrcoef(batch)[np.triu_indices(4, 1)]) < 0.2)
+
+def test_spawned_seeds():
+    children = np.random.SeedSequence(9).spawn(3)
+    starts = [randStarts(500, 50, seed=child) for child in children]
+    assert len({side.tobytes() for side in starts}) == 3
+
+    # Spawning again from the same seed gives the same children
+    again = [randStarts(500, 50, seed=child) for child in np.random.SeedSequence(9).spawn(3)]
+    assert all(np.array_equal(a, b) for a, b in zip(starts, again))
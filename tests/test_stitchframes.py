@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Stitches added a few at a time end on the full render, and each patch covers
+the pixels which changed in its step
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+import geometries
+from animation import changedBox
+
+FILL = ((255, 255, 255), (200, 200, 255))
+
+def blank(backend, geometry='square'):
+    # A cloth with its block added but no stitches drawn yet
+    if geometry == 'square':
+        cloth = geometries.squareCloth('test', grid=(14, 11), quant=5, backend=backend)
+        cloth.addBlock('A', size=cloth.sizes['A'], start=cloth.starts['A'], grid=cloth.grids['A'],
+                       linergb=(0, 0, 255), logic='rand', thresh=[40, 60], seed=2)
+    else:
+        cloth = geometries.triangleCloth('test', grid=(12, 14), quant=5, backend=backend)
+        cloth.addBlock('A', size=cloth.sizes['A'], start=cloth.starts['A'], grid=cloth.grids['A'],
+                       linergb=(0, 0, 255), logic='rand', slope=(cloth.slope, cloth.slope),
+                       shape='triangle', thresh=[30, 50, 70], seed=2)
+    return cloth
+
+def full(backend, geometry='square', fill=None):
+    cloth = blank(backend, geometry)
+    if fill is not None:
+        cloth.fillRegions(cloth.blocks['A'], fill)
+    cloth.drawStitches(cloth.blocks['A'])
+    return np.asarray(cloth.getImage().convert('RGB'))
+
+CASES = [('square', 'row', None), ('square', 'column', None), ('square', 'region', None),
+         ('square', 'region', FILL), ('triangle', 'row', None), ('triangle', 'column', None)]
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+@pytest.mark.parametrize('geometry, by, fill', CASES)
+def test_frames(backend, geometry, by, fill):
+    cloth = blank(backend, geometry)
+    previous = np.asarray(cloth.getImage().convert('RGB')).copy()
+
+    steps = 0
+    for patch, (x, y) in cloth.stitchFrames(cloth.blocks['A'], by=by, fill=fill):
+        current = np.asarray(cloth.getImage().convert('RGB')).copy()
+        box = (x, y, x + patch.shape[1], y + patch.shape[0])
+
+        # The patch is the canvas in its box, and nothing changed outside it
+        assert np.array_equal(patch, current[box[1]:box[3], box[0]:box[2]])
+        outside = np.ones(current.shape[:2], dtype=bool)
+        outside[box[1]:box[3], box[0]:box[2]] = False
+        assert np.array_equal(previous[outside], current[outside])
+
+        # Every changed pixel is in the box. Stitch ends may already have been
+        # inked by an earlier step, so the box is held to the stitches drawn,
+        # with ink on each of its edges
+        changed = changedBox(previous, current)
+        if changed is not None:
+            assert box[0] <= changed[0] and box[1] <= changed[1]
+            assert changed[2] <= box[2] and changed[3] <= box[3]
+        if fill is None:
+            ink = (patch == (0, 0, 255)).all(axis=2)
+            assert ink[0].any() and ink[-1].any() and ink[:, 0].any() and ink[:, -1].any()
+        previous = current
+        steps += 1
+
+    assert steps > 1
+    assert np.array_equal(previous, full(backend, geometry, fill))
+
+@pytest.mark.parametrize('by', ['row', 'column', 'region'])
+def test_record_stitching(by, tmp_path):
+    (tmp_path / 'test').mkdir()
+    cloth = geometries.squareCloth('test', grid=(14, 11), quant=5, savePathBase=str(tmp_path))
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=2, fill=FILL, animate=by)
+
+    with Image.open(tmp_path / 'test' / 'test_sequence.gif') as image:
+        assert image.n_frames > 2
+        image.seek(image.n_frames - 1)
+        last = np.asarray(image.convert('RGB'))
+    assert np.array_equal(last, full('numpy', fill=FILL))
+
+def test_bad_order():
+    cloth = blank('numpy')
+    with pytest.raises(ValueError):
+        list(cloth.stitchFrames(cloth.blocks['A'], by='diagonal'))
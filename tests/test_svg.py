@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Merged runs cover exactly the stitches they replace, and SVG frames hold one
+path per block with one move per run
+"""
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+import geometries
+from hitomezashi import mergeRuns
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+def cloth(geometry, folder='.', **kwargs):
+    if geometry == 'square':
+        cloth = geometries.squareCloth('test', quant=5, grid=(14, 11), savePathBase=folder, **kwargs)
+    elif geometry == 'triangle':
+        cloth = geometries.triangleCloth('test', quant=5, grid=(12, 14), savePathBase=folder, **kwargs)
+    else:
+        cloth = geometries.hexCloth('test', quant=5, savePathBase=folder, **kwargs)
+    cloth.defineMode('rand', 'test', thresh=[50, 50, 50], seed=3, save=False)
+    return cloth
+
+def covered(segs, runs):
+    """
+    (segments, runs) bools, True where a segment lies along a run, between
+    its ends
+    """
+    start, end = segs[:, None, :2], segs[:, None, 2:]
+    origin, direction = runs[None, :, :2], runs[None, :, 2:] - runs[None, :, :2]
+    length = np.hypot(*np.moveaxis(direction, -1, 0))
+
+    def along(point):
+        rel = point - origin
+        cross = rel[..., 0]*direction[..., 1] - rel[..., 1]*direction[..., 0]
+        dot = (rel*direction).sum(-1)
+        return (np.abs(cross) < 1e-6*length) & (dot > -1e-6) & (dot < length**2 + 1e-6)
+
+    # Same way round, and both ends on the run
+    same = ((end - start)*direction).sum(-1) > 0
+    return same & along(start) & along(end)
+
+def test_merge_joins_only_touching_lines():
+    segs = np.array([[0, 0, 1, 0], [1, 0, 2, 0], [3, 0, 4, 0],
+                     [0, 1, 0, 2], [0, 0, 0, 1], [2, 0, 1, 0],
+                     [0, 0, 1, 1], [1, 1, 2, 2], [0, 5, 1, 5]])
+    runs = mergeRuns(segs)
+    assert sorted(map(tuple, runs.tolist())) == sorted([
+        (0, 0, 2, 0), (3, 0, 4, 0), (0, 0, 0, 2), (2, 0, 1, 0), (0, 0, 2, 2), (0, 5, 1, 5)])
+    assert mergeRuns(np.zeros((0, 4))).shape == (0, 4)
+
+@pytest.mark.parametrize('geometry', ['square', 'triangle', 'hex'])
+def test_runs_cover_segments(geometry):
+    c = cloth(geometry)
+    for block in c.blocks.values():
+        for segs in c.stitchSegments(block):
+            segs = np.asarray(segs, dtype=float).reshape(-1, 4)
+            runs = mergeRuns(segs)
+            inside = covered(segs, runs)
+
+            # Each stitch is on exactly one run, and the stitches on a run
+            # add up to its length, so no run bridges a gap
+            assert np.all(inside.sum(axis=1) == 1)
+            lengths = np.hypot(segs[:, 2] - segs[:, 0], segs[:, 3] - segs[:, 1])
+            runLengths = np.hypot(runs[:, 2] - runs[:, 0], runs[:, 3] - runs[:, 1])
+            assert np.allclose(lengths @ inside, runLengths)
+            assert len(runs) <= len(segs)
+
+def pathRuns(path):
+    # Each run is a move then a relative line
+    numbers = r'(-?[\d.e+-]+) (-?[\d.e+-]+)'
+    runs = re.findall(f'M{numbers}l{numbers}', path.get('d'))
+    assert len(runs) == path.get('d').count('M')
+    runs = np.array(runs, dtype=float).reshape(-1, 4)
+    runs[:, 2:] += runs[:, :2]
+    return runs
+
+@pytest.mark.parametrize('geometry', ['square', 'triangle', 'hex'])
+def test_svg_paths(tmp_path, geometry):
+    c = cloth(geometry, str(tmp_path))
+    mode = c.modes['test']
+    os.makedirs(mode.saveFolder)
+    path = c.saveSVG(mode, chunk=7)
+    assert path == os.path.join(mode.saveFolder, 'Frame 1.svg')
+    assert mode.ct == 1
+
+    root = ET.parse(path).getroot()
+    assert root.tag == f'{SVG}svg'
+    assert root.get('width') == str(int(np.ceil(c.drawWidth)))
+    assert root.get('height') == str(int(np.ceil(c.drawHeight)))
+    assert len(root.findall(f'{SVG}rect')) == 1
+
+    paths = root.findall(f'{SVG}path')
+    assert len(paths) == len(c.blocks)
+    for element, block in zip(paths, c.blocks.values()):
+        assert element.get('stroke') == f'#{bytes(block.linergb).hex()}'
+        runs = np.vstack([mergeRuns(segs) for segs in c.stitchSegments(block)])
+        assert np.allclose(pathRuns(element), runs, atol=0.01)
+
+def test_svg_tiled(tmp_path):
+    # Nothing is drawn, so a tiled cloth writes the same file
+    paths = []
+    for tiled in (False, True):
+        c = cloth('square', str(tmp_path), tiled=tiled)
+        paths.append(tmp_path / f'{tiled}.svg')
+        c.writeSVG(str(paths[-1]))
+    assert paths[0].read_bytes() == paths[1].read_bytes()
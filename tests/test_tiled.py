@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Regions rendered on their own, tiled cloths and tile pyramids match a full render
+"""
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import geometries
+import tiles
+
+CLOTHS = [(geometries.squareCloth, {'grid': (37, 29)}, [40, 60]),
+          (geometries.triangleCloth, {'grid': (37, 29)}, [30, 50, 70]),
+          (geometries.hexCloth, {'grid': (37, 29)}, [30, 50, 70])]
+
+BOXES = [(0, 0, 40, 40), (13, 17, 71, 90), (50, 3, 111, 64), (100, 80, 185, 145)]
+
+def build(cls, kwargs, thresh, **options):
+    cloth = cls('test', quant=5, **kwargs, **options)
+    cloth.defineMode('rand', 'test', thresh=thresh, seed=3, save=False)
+    return cloth
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+@pytest.mark.parametrize('cls, kwargs, thresh', CLOTHS)
+def test_region_matches_full_render(cls, kwargs, thresh, backend):
+    full = np.asarray(build(cls, kwargs, thresh, backend=backend).getImage())
+    tiled = build(cls, kwargs, thresh, backend=backend, tiled=True)
+    for x0, y0, x1, y1 in BOXES:
+        x1, y1 = min(x1, full.shape[1]), min(y1, full.shape[0])
+        region = np.asarray(tiled.renderRegion(x0, y0, x1, y1))
+        assert np.array_equal(region, full[y0:y1, x0:x1]), (x0, y0, x1, y1)
+
+@pytest.mark.parametrize('cls, kwargs, thresh', CLOTHS)
+def test_whole_canvas_region(cls, kwargs, thresh):
+    full = np.asarray(build(cls, kwargs, thresh).getImage())
+    tiled = build(cls, kwargs, thresh, tiled=True)
+    region = np.asarray(tiled.renderRegion(0, 0, full.shape[1], full.shape[0]))
+    assert np.array_equal(region, full)
+
+def test_filled_region():
+    fill = ((255, 255, 255), (200, 200, 255))
+    cloth = geometries.squareCloth('test', quant=5, grid=(37, 29))
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=3, fill=fill, save=False)
+    full = np.asarray(cloth.getImage())
+    for x0, y0, x1, y1 in BOXES:
+        assert np.array_equal(np.asarray(cloth.renderRegion(x0, y0, x1, y1)), full[y0:y1, x0:x1])
+
+def test_tiles_cover_canvas(tmp_path):
+    cloth = build(geometries.squareCloth, {'grid': (37, 29)}, [40, 60], tiled=True)
+    full = np.asarray(build(geometries.squareCloth, {'grid': (37, 29)}, [40, 60]).getImage())
+    index = tiles.saveTiles(cloth, str(tmp_path), tileSize=64, fmt='png')
+
+    stitched = np.zeros_like(full)
+    for tile in index['tiles']:
+        x0, y0, x1, y1 = tile['box']
+        with Image.open(tmp_path / tile['file']) as image:
+            stitched[y0:y1, x0:x1] = np.asarray(image.convert('RGB'))
+    assert np.array_equal(stitched, full)
+
+def levelImage(folder, level, size, tileSize):
+    # Stitches the tiles of one pyramid level back together
+    stitched = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    for col, row, (x0, y0, x1, y1) in tiles.tileBoxes(*size, tileSize):
+        with Image.open(folder / str(level) / f'{col}_{row}.png') as image:
+            assert image.size == (x1 - x0, y1 - y0)
+            stitched[y0:y1, x0:x1] = np.asarray(image.convert('RGB'))
+    return stitched
+
+def test_pyramid_layout(tmp_path):
+    cloth = build(geometries.squareCloth, {'grid': (37, 29)}, [40, 60], tiled=True)
+    maxLevel = tiles.savePyramid(cloth, str(tmp_path), name='p', tileSize=64, workers=1)
+
+    # One level per halving of the 185 x 145 canvas, down to a single pixel
+    assert maxLevel == 8
+    root = ET.parse(tmp_path / 'p.dzi').getroot()
+    assert root.get('TileSize') == '64' and root.get('Overlap') == '0' and root.get('Format') == 'png'
+    size = root.find('{http://schemas.microsoft.com/deepzoom/2008}Size')
+    assert (size.get('Width'), size.get('Height')) == ('185', '145')
+
+    folder = tmp_path / 'p_files'
+    assert sorted(os.listdir(folder), key=int) == [str(level) for level in range(maxLevel + 1)]
+    for level in range(maxLevel + 1):
+        scale = 2**(maxLevel - level)
+        width, height = -(-185 // scale), -(-145 // scale)
+        assert len(os.listdir(folder / str(level))) == -(-width // 64) * -(-height // 64)
+
+        # Edge tiles are cut to the level, every other tile is full size
+        assert levelImage(folder, level, (width, height), 64).shape == (height, width, 3)
+    with Image.open(folder / '0' / '0_0.png') as image:
+        assert image.size == (1, 1)
+
+def test_pyramid_matches_full_render(tmp_path):
+    # A 256 x 128 canvas halves evenly at every level
+    kwargs = {'grid': (32, 16), 'quant': 8}
+    cloth = geometries.squareCloth('test', tiled=True, **kwargs)
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=3, save=False)
+    full = geometries.squareCloth('test', **kwargs)
+    full.defineMode('rand', 'test', thresh=[40, 60], seed=3, save=False)
+    image = full.getImage()
+    assert image.size == (256, 128)
+
+    maxLevel = tiles.savePyramid(cloth, str(tmp_path), tileSize=64, workers=1)
+    folder = tmp_path / 'pattern_files'
+    assert np.array_equal(levelImage(folder, maxLevel, image.size, 64), np.asarray(image))
+
+    # Each lower level is the full render halved again
+    for level in range(maxLevel - 1, -1, -1):
+        image = image.resize((-(-image.width // 2), -(-image.height // 2)), Image.BOX)
+        assert np.array_equal(levelImage(folder, level, image.size, 64), np.asarray(image)), level
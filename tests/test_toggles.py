@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Toggling a start state redraws only what changed, and gives the same pixels
+as drawing the toggled pattern from scratch
+"""
+import numpy as np
+import pytest
+
+import geometries
+
+FILL = ((255, 255, 255), (200, 200, 255))
+
+def redraw(cloth, cls, **kwargs):
+    # A fresh cloth drawn straight from the toggled start states
+    block = cloth.blocks['A']
+    starts = {key: np.asarray(getattr(block, key)).tolist() for key, _ in block._sides_()}
+    fresh = cls('fresh', quant=5, grid=block.grid, backend=cloth.backend, **kwargs)
+    fresh.defineMode('pattern', 'fresh', save=False, **starts)
+    return np.asarray(fresh.getImage())
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+def test_square(backend):
+    cloth = geometries.squareCloth('test', quant=5, grid=(30, 20), backend=backend)
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=1, save=False)
+    block = cloth.blocks['A']
+    cloth.toggleRowStart(block, 3)
+    cloth.toggleColStart(block, 0)
+    cloth.toggleColStart(block, 29)
+    assert np.array_equal(np.asarray(cloth.getImage()), redraw(cloth, geometries.squareCloth))
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+def test_square_filled(backend):
+    cloth = geometries.squareCloth('test', quant=5, grid=(30, 20), backend=backend)
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=1, fill=FILL, save=False)
+    block = cloth.blocks['A']
+    cloth.toggleRowStart(block, 5)
+    cloth.toggleColStart(block, 11)
+
+    fresh = geometries.squareCloth('fresh', quant=5, grid=(30, 20), backend=backend)
+    fresh.defineMode('pattern', 'fresh', rowStarts=block.rowStarts.tolist(),
+                     colStarts=block.colStarts.tolist(), fill=FILL, save=False)
+    assert np.array_equal(np.asarray(cloth.getImage()), np.asarray(fresh.getImage()))
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+def test_triangle(backend):
+    cloth = geometries.triangleCloth('test', quant=5, grid=(30, 26), backend=backend)
+    cloth.defineMode('rand', 'test', thresh=[30, 50, 70], seed=1, save=False)
+    block = cloth.blocks['A']
+    cloth.toggleBaseStart(block, 4)
+    cloth.toggleLeftStart(block, 3)
+    cloth.toggleRightStart(block, 7)
+    assert np.array_equal(np.asarray(cloth.getImage()), redraw(cloth, geometries.triangleCloth))
+
+@pytest.mark.parametrize('backend', ['pil', 'numpy'])
+def test_hex(backend):
+    cloth = geometries.hexCloth('test', quant=5, grid=(30, 26), backend=backend)
+    cloth.defineMode('rand', 'test', thresh=[30, 50, 70], seed=1, save=False)
+    block = cloth.blocks['A']
+    cloth.toggleLeftStart(block, 3)
+    cloth.toggleRightStart(block, 6)
+    assert np.array_equal(np.asarray(cloth.getImage()), redraw(cloth, geometries.hexCloth))
+
+def test_toggle_twice_restores():
+    cloth = geometries.squareCloth('test', quant=5, grid=(30, 20))
+    cloth.defineMode('rand', 'test', thresh=[40, 60], seed=1, save=False)
+    before = np.asarray(cloth.getImage()).copy()
+    cloth.toggleRowStart(cloth.blocks['A'], 8)
+    assert not np.array_equal(np.asarray(cloth.getImage()), before)
+    cloth.toggleRowStart(cloth.blocks['A'], 8)
+    assert np.array_equal(np.asarray(cloth.getImage()), before)